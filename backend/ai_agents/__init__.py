@@ -1,21 +1,45 @@
 # Extensible AI agents library with LangChain and MCP
+#
+# Exports are resolved on first attribute access (PEP 562) so that importing the
+# package, or a light submodule such as ai_agents.sessions, does not pull in
+# LangChain, LangGraph, OpenAI and the MCP client.
 
-from .agents import (
-    BaseAgent, 
-    SearchAgent, 
-    ChatAgent, 
-    ImageAgent, 
-    AgentConfig, 
-    AgentResponse,
-    ImageGenerationResult
-)
+import importlib
 
-__all__ = [
-    "BaseAgent",
-    "SearchAgent", 
-    "ChatAgent",
-    "ImageAgent",
-    "AgentConfig",
-    "AgentResponse",
-    "ImageGenerationResult"
-]
+_EXPORTS = {
+    "BaseAgent": ".agents",
+    "SearchAgent": ".agents",
+    "ChatAgent": ".agents",
+    "ImageAgent": ".agents",
+    "CaptionAgent": ".agents",
+    "AgentConfig": ".agents",
+    "AgentResponse": ".agents",
+    "ImageGenerationResult": ".agents",
+    "PhotoCaption": ".agents",
+    "CircuitBreaker": ".resilience",
+    "CircuitOpenError": ".resilience",
+    "HedgePolicy": ".resilience",
+    "ResilienceSettings": ".resilience",
+    "RetryPolicy": ".resilience",
+    "upstreams": ".resilience",
+    "AgentShuttingDown": ".lifecycle",
+    "AgentWork": ".lifecycle",
+    "agent_work": ".lifecycle",
+    "ModelRouter": ".routing",
+    "RoutingSettings": ".routing",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
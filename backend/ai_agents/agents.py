@@ -1,14 +1,29 @@
 # Extensible AI agents with LangChain and MCP support
 
 from typing import Dict, Any, Optional, List
+import json
 import os
 import logging
+import re
+import time
 from dataclasses import dataclass
+import httpx
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from pydantic import BaseModel, Field
 
+from .resilience import (
+    CircuitOpenError,
+    ResilienceSettings,
+    ResilientTransport,
+    find_exception,
+    guard_tool,
+    upstreams,
+)
+from .lifecycle import tracked
+from .routing import ModelRouter, RoutingSettings, parse_ladder
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +33,10 @@ class AgentConfig:
     api_base_url: str = None
     model_name: str = None
     api_key: str = None
+    resilience: ResilienceSettings = None
+    # Cheaper models tried before model_name, cheapest first; model_name is always the top rung
+    model_ladder: List[str] = None
+    routing: RoutingSettings = None
     
     def __post_init__(self):
         # Load from env if not provided
@@ -28,6 +47,16 @@ class AgentConfig:
         if self.api_key is None:
             # LITELLM_AUTH_TOKEN for AI API
             self.api_key = os.getenv("LITELLM_AUTH_TOKEN", "dummy-key")
+        if self.resilience is None:
+            self.resilience = ResilienceSettings.from_env()
+        if self.model_ladder is None:
+            self.model_ladder = parse_ladder(os.getenv("AI_MODEL_LADDER"))
+        if self.routing is None:
+            self.routing = RoutingSettings.from_env()
+    
+    def ladder(self) -> List[str]:
+        # Routing rungs ending with model_name
+        return [model for model in dict.fromkeys(self.model_ladder) if model != self.model_name] + [self.model_name]
 
 
 class AgentResponse(BaseModel):
@@ -46,19 +75,36 @@ class ImageGenerationResult(BaseModel):
     success: bool = Field(description="Whether image generation was successful")
 
 
+class PhotoCaption(BaseModel):
+    # Structured output for photo captioning
+    caption: str = Field(description="One or two sentence description of the photo")
+    alt_text: str = Field(description="Short alt text for screen readers")
+    tags: List[str] = Field(default_factory=list, description="Lowercase keywords")
+
+
 class BaseAgent:
     # Base AI agent with LangChain and MCP support
     
+    # Agents that pick a model per request from config.model_ladder
+    routed = False
+    
     def __init__(self, config: AgentConfig, system_prompt: str = "You are a helpful AI assistant."):
         self.config = config
         self.system_prompt = system_prompt
         
-        # LangChain ChatOpenAI setup
-        self.llm = ChatOpenAI(
-            base_url=config.api_base_url,
-            api_key=config.api_key,
-            model=config.model_name
+        # One breaker per LLM upstream, shared by every agent in the process
+        self.llm_upstream = upstreams.get(f"llm:{config.api_base_url}", config.resilience)
+        
+        # LangChain ChatOpenAI setup; retries are owned by the resilience transport
+        self._http_client = httpx.AsyncClient(
+            transport=ResilientTransport(self.llm_upstream),
+            follow_redirects=True,
         )
+        self._llms: Dict[str, ChatOpenAI] = {}
+        self.llm = self._llm_for(config.model_name)
+        
+        ladder = config.ladder()
+        self.router = ModelRouter(ladder, config.routing) if self.routed and len(ladder) > 1 else None
         
         # MCP client lazy init
         self.mcp_client: Optional[MultiServerMCPClient] = None
@@ -67,33 +113,35 @@ class BaseAgent:
         logger.info(f"Initialized {self.__class__.__name__} with model {config.model_name}")
     
     async def setup_mcp(self, server_configs: Dict[str, Dict[str, Any]]):
-        # Setup MCP servers and load tools
+        # Setup MCP servers and load tools, each server behind its own circuit breaker
         try:
             # Initialize MCP client with server configs (dict of server name -> config)
             logger.debug("Setting up MCP with configs: %s", server_configs)
             self.mcp_client = MultiServerMCPClient(server_configs)
 
-            # Get tools as LangChain tools (this is async!)
-            if self.mcp_client:
-                tools_result = await self.mcp_client.get_tools()
-                logger.info(f"Tools result type: {type(tools_result)}")
-                
-                # Convert to list if it's not already
-                if isinstance(tools_result, list):
-                    self.mcp_tools = tools_result
-                elif hasattr(tools_result, 'values'):
-                    self.mcp_tools = list(tools_result.values())
-                else:
-                    self.mcp_tools = list(tools_result) if tools_result else []
-                    
-                logger.info("MCP setup complete with %s tools", len(self.mcp_tools))
-                if self.mcp_tools:
-                    logger.debug(
-                        "Tool names: %s",
-                        [getattr(tool, "name", "unknown") for tool in self.mcp_tools],
+            tools = []
+            for server_name in server_configs:
+                upstream = upstreams.get(f"mcp:{server_name}", self.config.resilience, hedge=False)
+                try:
+                    # Get tools as LangChain tools (this is async!)
+                    tools_result = await upstream.call(
+                        lambda name=server_name: self.mcp_client.get_tools(server_name=name)
                     )
-            else:
-                self.mcp_tools = []
+                except Exception as e:
+                    logger.error("Failed to load tools from MCP server '%s': %s", server_name, e)
+                    continue
+                tools.extend(guard_tool(tool, upstream) for tool in self._as_tool_list(tools_result))
+
+            self.mcp_tools = tools
+            if not self.mcp_tools:
+                self.mcp_client = None
+
+            logger.info("MCP setup complete with %s tools", len(self.mcp_tools))
+            if self.mcp_tools:
+                logger.debug(
+                    "Tool names: %s",
+                    [getattr(tool, "name", "unknown") for tool in self.mcp_tools],
+                )
         except Exception as e:
             logger.error(f"Failed to setup MCP: {e}")
             import traceback
@@ -101,11 +149,52 @@ class BaseAgent:
             self.mcp_client = None
             self.mcp_tools = []
     
-    async def execute(self, prompt: str, use_tools: bool = True) -> AgentResponse:
-        # Execute agent with LangGraph
+    def _llm_for(self, model: str) -> ChatOpenAI:
+        # One client per model, all sharing the upstream's connection pool and breaker
+        if model not in self._llms:
+            self._llms[model] = ChatOpenAI(
+                base_url=self.config.api_base_url,
+                api_key=self.config.api_key,
+                model=model,
+                max_retries=0,
+                http_async_client=self._http_client,
+            )
+        return self._llms[model]
+    
+    @staticmethod
+    def _as_tool_list(tools_result) -> List[Any]:
+        # Convert to list if it's not already
+        if isinstance(tools_result, list):
+            return tools_result
+        if hasattr(tools_result, 'values'):
+            return list(tools_result.values())
+        return list(tools_result) if tools_result else []
+    
+    @staticmethod
+    def _history_messages(history: Optional[List[Dict[str, str]]]) -> List[BaseMessage]:
+        # Convert stored {"role", "content"} turns into LangChain messages
+        message_types = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+        return [
+            message_types[turn["role"]](content=turn["content"])
+            for turn in history or []
+            if turn.get("role") in message_types
+        ]
+    
+    @tracked
+    async def execute(
+        self,
+        prompt: str,
+        use_tools: bool = True,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> AgentResponse:
+        # Execute agent with LangGraph; `history` holds earlier turns of the conversation
         try:
+            # Fail fast while the LLM upstream is known to be down
+            self.llm_upstream.breaker.check()
+            
             messages = [
                 SystemMessage(content=self.system_prompt),
+                *self._history_messages(history),
                 HumanMessage(content=prompt)
             ]
             
@@ -123,12 +212,7 @@ class BaseAgent:
                 )
                 
                 # Execute the agent with system prompt + user message
-                result = await agent.ainvoke({
-                    "messages": [
-                        SystemMessage(content=self.system_prompt),
-                        HumanMessage(content=prompt)
-                    ]
-                })
+                result = await agent.ainvoke({"messages": messages})
                 
                 # Extract the final response
                 response_messages = result.get("messages", [])
@@ -164,6 +248,8 @@ class BaseAgent:
                         "message_count": len(response_messages)
                     }
                 )
+            elif self.router is not None:
+                return await self._execute_routed(messages, prompt, history)
             else:
                 # LLM without tools
                 logger.debug(
@@ -183,6 +269,15 @@ class BaseAgent:
                 )
             
         except Exception as e:
+            circuit_error = find_exception(e, CircuitOpenError)
+            if circuit_error is not None:
+                logger.warning(f"Agent call rejected: {circuit_error}")
+                return AgentResponse(
+                    success=False,
+                    content="",
+                    metadata={"circuit_open": circuit_error.upstream},
+                    error=str(circuit_error)
+                )
             logger.error(f"Error executing agent: {e}")
             import traceback
             traceback.print_exc()
@@ -192,6 +287,74 @@ class BaseAgent:
                 error=str(e)
             )
     
+    async def _execute_routed(
+        self,
+        messages: List[BaseMessage],
+        prompt: str,
+        history: Optional[List[Dict[str, str]]],
+    ) -> AgentResponse:
+        # Start on the rung the router picks and climb while answers look unsure or calls fail
+        router = self.router
+        decision = router.route(prompt, history)
+        top = len(router.ladder) - 1
+        attempts: List[Dict[str, Any]] = []
+        started = time.monotonic()
+        tier = decision.tier
+        while True:
+            model = router.ladder[tier]
+            call_started = time.monotonic()
+            try:
+                response = await self._llm_for(model).ainvoke(messages)
+            except Exception as e:
+                if tier == top or find_exception(e, CircuitOpenError) is not None:
+                    raise
+                logger.warning("Model %s failed (%s); escalating", model, e)
+                latency_ms = (time.monotonic() - call_started) * 1000
+                attempts.append({"model": model, "latency_ms": round(latency_ms, 1), "error": str(e)})
+                tier += 1
+                continue
+            latency_ms = (time.monotonic() - call_started) * 1000
+            router.observe(model, latency_ms)
+            confident, doubt = router.assess(response.content, response.response_metadata.get("finish_reason"))
+            attempts.append({"model": model, "latency_ms": round(latency_ms, 1), "confident": confident})
+            if doubt:
+                attempts[-1]["doubt"] = doubt
+            if confident or tier == top or not router.settings.escalate:
+                break
+            logger.info("Escalating from %s: %s", model, doubt)
+            tier += 1
+        
+        routing = router.summary(decision, attempts, (time.monotonic() - started) * 1000)
+        return AgentResponse(
+            success=True,
+            content=response.content,
+            metadata={
+                "model": model,
+                "tools_available": 0,
+                "tools_used": False,
+                "routing": routing,
+            }
+        )
+    
+    @tracked
+    async def summarize_history(self, previous_summary: str, turns: List[Dict[str, str]]) -> str:
+        # Fold older conversation turns into a short rolling summary
+        transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+        response = await self.llm.ainvoke([
+            SystemMessage(content=(
+                "Summarize the conversation so far in at most 5 sentences. "
+                "Keep names, facts, decisions and open questions; drop pleasantries."
+            )),
+            HumanMessage(content=f"Existing summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"),
+        ])
+        return response.content
+    
+    async def aclose(self) -> None:
+        # Release the LLM connection pool and drop MCP tools (their sessions are opened per call)
+        self.mcp_client = None
+        self.mcp_tools = []
+        await self._http_client.aclose()
+    
     def get_capabilities(self) -> List[str]:
         # Get agent capabilities
         capabilities = ["text_generation", "conversation"]
@@ -225,31 +388,68 @@ Cite sources from your search results."""
             server_configs = {
                 "web-search": {
                     "transport": "streamable_http",
-                    "url": "https://mcp.codexhub.ai/web/mcp",
+                    "url": os.getenv("CODEXHUB_MCP_WEB_URL", "https://mcp.codexhub.ai/web/mcp"),
                     "headers": {"x-team-key": mcp_token}
                 }
             }
             await self.setup_mcp(server_configs)
-            self._mcp_setup_done = True
+            # Retry on the next call if the server was unreachable; the breaker keeps that cheap
+            self._mcp_setup_done = bool(self.mcp_tools)
             logger.info("Web search MCP configured")
         else:
             logger.warning("CODEXHUB_MCP_AUTH_TOKEN not found, web search disabled")
     
-    async def execute(self, prompt: str, use_tools: bool = True) -> AgentResponse:
+    @tracked
+    async def execute(
+        self,
+        prompt: str,
+        use_tools: bool = True,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> AgentResponse:
         # Ensure MCP is setup before execution
         await self.setup_web_search_mcp()
-        return await super().execute(prompt, use_tools)
+        return await super().execute(prompt, use_tools, history)
 
 
 class ChatAgent(BaseAgent):
     # General chat and assistance agent
     
+    routed = True
+    
     def __init__(self, config: AgentConfig):
         system_prompt = "Friendly conversational AI. Natural conversations, explanations, analysis. Helpful, harmless, honest."
         
         super().__init__(config, system_prompt)
 
 
+class CaptionAgent(BaseAgent):
+    # Vision agent that captions and tags portfolio photos
+    
+    def __init__(self, config: AgentConfig):
+        system_prompt = """You caption photographs for a photography portfolio.
+For every photo, in the order given, return an object with:
+- "caption": one or two sentences describing the subject, setting and mood
+- "alt_text": alt text for screen readers, under 125 characters
+- "tags": 3 to 8 lowercase keywords
+Respond with a JSON array only, one object per photo."""
+        
+        super().__init__(config, system_prompt)
+    
+    @tracked
+    async def caption_images(self, images: List[str]) -> List[PhotoCaption]:
+        # Caption several images (data URIs or URLs) in one request; raises ValueError on a malformed reply
+        self.llm_upstream.breaker.check()
+        content: List[Dict[str, Any]] = [{"type": "text", "text": f"Caption these {len(images)} photos."}]
+        for index, image in enumerate(images, 1):
+            content.append({"type": "text", "text": f"Photo {index}:"})
+            content.append({"type": "image_url", "image_url": {"url": image}})
+        response = await self.llm.ainvoke([
+            SystemMessage(content=self.system_prompt),
+            HumanMessage(content=content),
+        ])
+        return parse_caption_output(response.content, len(images))
+
+
 class ImageAgent(BaseAgent):
     # Image generation agent with MCP support
     
@@ -264,6 +464,9 @@ Provide responses in a clear, structured format."""
         
         # Store setup flag
         self._mcp_setup_done = False
+        # Graph over return_direct copies of the image tools, built on first use
+        self._image_graph = None
+        self._image_graph_tools = None
     
     async def setup_image_mcp(self):
         # Setup image generation MCP with auth token
@@ -275,23 +478,42 @@ Provide responses in a clear, structured format."""
             server_configs = {
                 "image-generation": {
                     "transport": "streamable_http",
-                    "url": "https://mcp.codexhub.ai/image/mcp",
+                    "url": os.getenv("CODEXHUB_MCP_IMAGE_URL", "https://mcp.codexhub.ai/image/mcp"),
                     "headers": {"x-team-key": mcp_token}
                 }
             }
             await self.setup_mcp(server_configs)
-            self._mcp_setup_done = True
+            # Retry on the next call if the server was unreachable; the breaker keeps that cheap
+            self._mcp_setup_done = bool(self.mcp_tools)
             logger.info("Image generation MCP configured")
         else:
             logger.warning("CODEXHUB_MCP_AUTH_TOKEN not found, image generation disabled")
     
-    async def execute(self, prompt: str, use_tools: bool = True) -> AgentResponse:
+    @tracked
+    async def execute(
+        self,
+        prompt: str,
+        use_tools: bool = True,
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> AgentResponse:
         # Ensure MCP is setup before execution
         await self.setup_image_mcp()
-        return await super().execute(prompt, use_tools)
+        return await super().execute(prompt, use_tools, history)
+    
+    def _direct_tool_graph(self):
+        # Tools marked return_direct end the LangGraph run at the ToolMessage,
+        # so no extra LLM turn is spent turning the tool output into prose
+        if self._image_graph is None or self._image_graph_tools is not self.mcp_tools:
+            from langgraph.prebuilt import create_react_agent
+            
+            direct_tools = [tool.model_copy(update={"return_direct": True}) for tool in self.mcp_tools]
+            self._image_graph = create_react_agent(self.llm, direct_tools)
+            self._image_graph_tools = self.mcp_tools
+        return self._image_graph
     
+    @tracked
     async def generate_image_structured(self, prompt: str) -> ImageGenerationResult:
-        # Generate image with structured output
+        # Generate image and read the URL straight from the tool result
         await self.setup_image_mcp()
         
         if not self.mcp_tools:
@@ -302,40 +524,127 @@ Provide responses in a clear, structured format."""
                 success=False
             )
         
-        # Use structured output with Pydantic
-        llm_with_structure = self.llm.with_structured_output(ImageGenerationResult)
-        
-        response = await self.execute(prompt, use_tools=True)
-        
-        # Verify tools were actually used
-        tools_used = response.metadata.get("tools_used", False)
+        try:
+            self.llm_upstream.breaker.check()
+            result = await self._direct_tool_graph().ainvoke({
+                "messages": [
+                    SystemMessage(content=self.system_prompt),
+                    HumanMessage(content=prompt)
+                ]
+            })
+        except Exception as e:
+            logger.error(f"Image generation failed: {e}")
+            return ImageGenerationResult(
+                image_url="",
+                description=f"Image generation failed: {e}",
+                source="none",
+                success=False
+            )
         
-        if response.success and tools_used:
-            # Parse the response to extract structured data
-            import re
-            urls = re.findall(r'https?://[^\s\)]+', response.content)
-            
-            # Validate that it's a real Google Cloud Storage URL, not fabricated
-            if urls and 'storage.googleapis.com' in urls[0]:
-                # Extract description from markdown alt text
-                description = prompt
-                if '![' in response.content and '](' in response.content:
-                    try:
-                        description = response.content.split('![')[1].split(']')[0]
-                    except:
-                        pass
-                
+        tool_messages = [msg for msg in result.get("messages", []) if isinstance(msg, ToolMessage)]
+        for message in reversed(tool_messages):
+            if getattr(message, "status", "success") == "error":
                 return ImageGenerationResult(
-                    image_url=urls[0],
-                    description=description,
-                    source="CodexHub Image MCP (Google Cloud Storage)",
-                    success=True
+                    image_url="",
+                    description=f"Image generation failed: {_tool_message_text(message)}",
+                    source="none",
+                    success=False
                 )
+            parsed = parse_image_tool_output(message, prompt)
+            if parsed is not None:
+                return parsed
         
-        # If tools weren't used, this is a fabricated response
+        # Without a tool result any URL would be fabricated by the model
         return ImageGenerationResult(
             image_url="",
-            description=f"Image generation failed. MCP tools were not invoked. Tools available: {len(self.mcp_tools)}, Tools used: {tools_used}",
+            description=f"Image generation failed. MCP tools were not invoked. Tools available: {len(self.mcp_tools)}, Tool results: {len(tool_messages)}",
             source="none",
             success=False
         )
+
+
+_URL_PATTERN = re.compile(r"https?://[^\s\"'<>()\[\]]+")
+_URL_KEYS = ("image_url", "imageUrl", "url", "uri", "image")
+
+
+def _tool_message_text(message: ToolMessage) -> str:
+    # ToolMessage content is either a string or a list of content blocks
+    content = message.content
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content or []:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and isinstance(block.get("text"), str):
+            parts.append(block["text"])
+    return "\n".join(parts)
+
+
+def _find_url(value: Any) -> Optional[str]:
+    # Depth-first search of a decoded JSON payload for an image URL
+    if isinstance(value, dict):
+        for key in _URL_KEYS:
+            candidate = value.get(key)
+            if isinstance(candidate, str) and _URL_PATTERN.fullmatch(candidate):
+                return candidate
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            found = _find_url(item)
+            if found:
+                return found
+    return None
+
+
+def parse_image_tool_output(message: ToolMessage, prompt: str) -> Optional[ImageGenerationResult]:
+    # Build the structured result from an image tool's raw output (JSON or plain text)
+    text = _tool_message_text(message)
+    payload: Any = None
+    try:
+        payload = json.loads(text)
+    except (TypeError, ValueError):
+        pass
+    
+    image_url = _find_url(payload) or _find_url(message.artifact)
+    if image_url is None:
+        match = _URL_PATTERN.search(text)
+        image_url = match.group(0).rstrip(".,;") if match else None
+    if not image_url:
+        return None
+    
+    description = prompt
+    if isinstance(payload, dict):
+        description = payload.get("description") or payload.get("revised_prompt") or payload.get("prompt") or prompt
+    
+    source = "CodexHub Image MCP"
+    if "storage.googleapis.com" in image_url:
+        source += " (Google Cloud Storage)"
+    return ImageGenerationResult(
+        image_url=image_url,
+        description=description,
+        source=source,
+        success=True
+    )
+
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def parse_caption_output(content: Any, expected: int) -> List[PhotoCaption]:
+    # Read the model's JSON array (a bare object is accepted for a single photo)
+    text = content if isinstance(content, str) else "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block) for block in content or []
+    )
+    try:
+        payload = json.loads(_CODE_FENCE.sub("", text.strip()))
+    except ValueError as exc:
+        raise ValueError(f"Caption reply is not JSON: {exc}") from exc
+    if isinstance(payload, dict):
+        payload = payload.get("photos", [payload])
+    if not isinstance(payload, list) or len(payload) != expected:
+        raise ValueError(f"Expected {expected} captions, got {len(payload) if isinstance(payload, list) else 'none'}")
+    captions = [PhotoCaption.model_validate(item) for item in payload]
+    for caption in captions:
+        caption.tags = list(dict.fromkeys(tag.strip().lower() for tag in caption.tags if tag.strip()))
+    return captions
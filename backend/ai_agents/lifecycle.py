@@ -0,0 +1,105 @@
+# Agent call tracking for graceful shutdown: stop taking new calls, wait for running ones, cancel stragglers
+
+import asyncio
+import functools
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class AgentShuttingDown(RuntimeError):
+    # Raised when an agent call starts after shutdown began
+
+    def __init__(self, kind: str):
+        super().__init__(f"Not starting {kind}: the server is shutting down")
+        self.kind = kind
+
+
+class AgentWork:
+    # Process-wide registry of agent calls in flight, keyed by the task running them
+
+    def __init__(self):
+        self._active: Dict[asyncio.Task, str] = {}
+        self._accepting = True
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.completed = 0
+
+    @property
+    def accepting(self) -> bool:
+        return self._accepting
+
+    def open(self) -> None:
+        # Accept calls again (app startup; the registry outlives one lifespan in tests)
+        self._accepting = True
+        self.completed = 0
+        if not self._active:
+            # A fresh event binds to the current loop on first wait
+            self._idle = asyncio.Event()
+            self._idle.set()
+
+    def close(self) -> None:
+        self._accepting = False
+
+    def in_flight(self) -> Dict[str, int]:
+        return dict(Counter(self._active.values()))
+
+    @asynccontextmanager
+    async def track(self, kind: str) -> AsyncIterator[None]:
+        task = asyncio.current_task()
+        if task is None or task in self._active:
+            # Nested call (e.g. SearchAgent.execute -> BaseAgent.execute) is already counted
+            yield
+            return
+        if not self._accepting:
+            raise AgentShuttingDown(kind)
+        self._active[task] = kind
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            del self._active[task]
+            self.completed += 1
+            if not self._active:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> Dict[str, Any]:
+        # Stop intake, wait up to `timeout` for running calls, then cancel what is left
+        self.close()
+        started = time.monotonic()
+        completed_before = self.completed
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+        finished = self.completed - completed_before
+        cancelled = self.in_flight()
+        tasks = list(self._active)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.warning("Cancelled agent calls still running at shutdown: %s", cancelled)
+            # Give cancelled calls a moment to unwind their HTTP requests
+            await asyncio.wait(tasks, timeout=1.0)
+        return {
+            "completed": finished,
+            "cancelled": cancelled,
+            "waited_seconds": round(time.monotonic() - started, 3),
+        }
+
+
+agent_work = AgentWork()
+
+
+def tracked(method):
+    # Count an agent coroutine method as in-flight work under "<Class>.<method>"
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        async with agent_work.track(f"{type(self).__name__}.{method.__name__}"):
+            return await method(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,445 @@
+# Resilience layer for LLM and MCP upstreams: jittered retries, hedging and circuit breakers
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Statuses worth retrying: the upstream is overloaded or briefly unavailable
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    # Raised without touching the network while an upstream's breaker is open
+
+    def __init__(self, upstream: str, retry_after: float):
+        super().__init__(f"Circuit open for upstream '{upstream}', retry in {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class UpstreamStatusError(Exception):
+    # An upstream answered with a retryable HTTP status; carries the body so it can be replayed
+
+    def __init__(self, status_code: int, headers: httpx.Headers, content: bytes):
+        super().__init__(f"Upstream returned HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+def iter_exception_chain(exc: BaseException) -> Iterator[BaseException]:
+    # Walk an exception, its causes/contexts and any exception-group members
+    seen = set()
+    stack = [exc]
+    while stack:
+        current = stack.pop()
+        if current is None or id(current) in seen:
+            continue
+        seen.add(id(current))
+        yield current
+        stack.extend(getattr(current, "exceptions", ()) or ())
+        stack.append(current.__cause__)
+        stack.append(current.__context__)
+
+
+def find_exception(exc: BaseException, exc_type: type) -> Optional[BaseException]:
+    # First exception of the given type anywhere in the chain
+    for item in iter_exception_chain(exc):
+        if isinstance(item, exc_type):
+            return item
+    return None
+
+
+def is_retryable(exc: BaseException, idempotent: bool = True) -> bool:
+    # Connection failures are always safe to retry; timeouts and 5xx only for idempotent calls
+    for item in iter_exception_chain(exc):
+        if isinstance(item, CircuitOpenError):
+            return False
+        if isinstance(item, (httpx.ConnectError, httpx.ConnectTimeout, ConnectionRefusedError)):
+            return True
+        if isinstance(item, httpx.HTTPStatusError):
+            status = item.response.status_code
+        else:
+            status = getattr(item, "status_code", None)
+        if isinstance(status, int):
+            if status not in RETRYABLE_STATUS_CODES:
+                return False
+            return idempotent or status in (429, 503)
+        if idempotent and isinstance(
+            item,
+            (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError, asyncio.TimeoutError, ConnectionError),
+        ):
+            return True
+    return False
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    # Failures that say something about upstream health (and therefore count toward the breaker)
+    return is_retryable(exc, idempotent=True)
+
+
+@dataclass
+class RetryPolicy:
+    # Exponential backoff with full jitter
+    max_attempts: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+
+    def backoff(self, retry_number: int) -> float:
+        cap = min(self.max_delay, self.base_delay * (2 ** retry_number))
+        return random.uniform(0, cap)
+
+
+class LatencyTracker:
+    # Rolling window of successful call latencies
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+
+@dataclass
+class HedgePolicy:
+    # Fire a duplicate request once the first has been outstanding longer than the latency percentile
+    percentile: float = 95.0
+    min_samples: int = 20
+    max_hedges: int = 1
+    min_delay: float = 0.05
+
+    def delay(self, latency: LatencyTracker) -> Optional[float]:
+        if len(latency) < self.min_samples:
+            return None
+        value = latency.percentile(self.percentile)
+        return None if value is None else max(self.min_delay, value)
+
+
+class CircuitBreaker:
+    # Classic closed/open/half-open breaker; open fails fast until the recovery timeout elapses
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (self._clock() - self._opened_at))
+
+    def check(self) -> None:
+        # Fail fast without reserving a half-open probe slot
+        if self.state == self.OPEN:
+            self.total_rejected += 1
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._half_open_calls >= self.half_open_max_calls):
+            self.total_rejected += 1
+            raise CircuitOpenError(self.name, self.retry_after())
+        if state == self.HALF_OPEN:
+            self._half_open_calls += 1
+
+    def record_success(self) -> None:
+        if self._state != self.CLOSED:
+            logger.info("Circuit for upstream '%s' closed", self.name)
+        self._state = self.CLOSED
+        self._failures = 0
+        self._half_open_calls = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self.total_failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning("Circuit for upstream '%s' opened after %s failures", self.name, self._failures)
+            self._state = self.OPEN
+            self._opened_at = self._clock()
+            self._half_open_calls = 0
+
+    def release(self) -> None:
+        # A call was cancelled before it could report an outcome
+        if self._state == self.HALF_OPEN and self._half_open_calls:
+            self._half_open_calls -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "total_failures": self.total_failures,
+            "total_rejected": self.total_rejected,
+            "retry_after": round(self.retry_after(), 3),
+        }
+
+
+class Upstream:
+    # A named dependency guarded by one breaker, a retry policy and optional hedging
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        retry: Optional[RetryPolicy] = None,
+        hedge: Optional[HedgePolicy] = None,
+    ):
+        self.name = name
+        self.breaker = breaker
+        self.retry = retry or RetryPolicy()
+        self.hedge = hedge
+        self.latency = LatencyTracker()
+        self.retries = 0
+        self.hedges = 0
+
+    async def call(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        *,
+        idempotent: bool = True,
+        discard: Optional[Callable[[T], Awaitable[None]]] = None,
+    ) -> T:
+        retry_number = 0
+        while True:
+            try:
+                return await self._attempt(operation, idempotent, discard)
+            except Exception as exc:
+                if retry_number + 1 >= self.retry.max_attempts or not is_retryable(exc, idempotent):
+                    raise
+                delay = self.retry.backoff(retry_number)
+                retry_number += 1
+                self.retries += 1
+                logger.warning(
+                    "Upstream '%s' call failed (%s), retry %s/%s in %.2fs",
+                    self.name, exc, retry_number, self.retry.max_attempts - 1, delay,
+                )
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, operation, idempotent, discard):
+        self.breaker.before_call()
+        started = time.monotonic()
+        try:
+            if idempotent and self.hedge is not None:
+                result = await self._hedged(operation, discard)
+            else:
+                result = await operation()
+        except Exception as exc:
+            if is_upstream_failure(exc):
+                self.breaker.record_failure()
+            else:
+                # The upstream answered (e.g. a 4xx); that is not a health problem
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, operation, discard):
+        delay = self.hedge.delay(self.latency)
+        if delay is None:
+            return await operation()
+
+        tasks = [asyncio.ensure_future(operation())]
+        winner = None
+        try:
+            while True:
+                pending = [task for task in tasks if not task.done()]
+                if not pending:
+                    # Every attempt finished and none succeeded
+                    raise tasks[-1].exception()
+                can_hedge = len(tasks) <= self.hedge.max_hedges
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    self.hedges += 1
+                    logger.debug("Hedging request to upstream '%s' after %.3fs", self.name, delay)
+                    tasks.append(asyncio.ensure_future(operation()))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        return task.result()
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = self.breaker.snapshot()
+        p50 = self.latency.percentile(50)
+        p95 = self.latency.percentile(95)
+        data.update({
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "latency_p50": None if p50 is None else round(p50, 4),
+            "latency_p95": None if p95 is None else round(p95, 4),
+        })
+        return data
+
+
+@dataclass
+class ResilienceSettings:
+    # Env-driven defaults shared by every upstream created through the registry
+    retry_attempts: int = 3
+    retry_base_delay: float = 0.25
+    retry_max_delay: float = 4.0
+    hedge_percentile: Optional[float] = None
+    breaker_failure_threshold: int = 5
+    breaker_recovery_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "ResilienceSettings":
+        hedge = os.getenv("AI_HEDGE_PERCENTILE")
+        return cls(
+            retry_attempts=int(os.getenv("AI_RETRY_ATTEMPTS", "3")),
+            retry_base_delay=float(os.getenv("AI_RETRY_BASE_DELAY", "0.25")),
+            retry_max_delay=float(os.getenv("AI_RETRY_MAX_DELAY", "4.0")),
+            hedge_percentile=float(hedge) if hedge else None,
+            breaker_failure_threshold=int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5")),
+            breaker_recovery_timeout=float(os.getenv("AI_BREAKER_RECOVERY_SECONDS", "30")),
+        )
+
+
+class UpstreamRegistry:
+    # Process-wide upstreams keyed by name so every agent shares one breaker per dependency
+
+    def __init__(self):
+        self._upstreams: Dict[str, Upstream] = {}
+
+    def get(self, name: str, settings: Optional[ResilienceSettings] = None, hedge: bool = True) -> Upstream:
+        upstream = self._upstreams.get(name)
+        if upstream is None:
+            settings = settings or ResilienceSettings.from_env()
+            hedge_policy = None
+            if hedge and settings.hedge_percentile:
+                hedge_policy = HedgePolicy(percentile=settings.hedge_percentile)
+            upstream = Upstream(
+                name,
+                CircuitBreaker(
+                    name,
+                    failure_threshold=settings.breaker_failure_threshold,
+                    recovery_timeout=settings.breaker_recovery_timeout,
+                ),
+                RetryPolicy(
+                    max_attempts=settings.retry_attempts,
+                    base_delay=settings.retry_base_delay,
+                    max_delay=settings.retry_max_delay,
+                ),
+                hedge_policy,
+            )
+            self._upstreams[name] = upstream
+        return upstream
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: upstream.snapshot() for name, upstream in self._upstreams.items()}
+
+    def clear(self) -> None:
+        self._upstreams.clear()
+
+
+upstreams = UpstreamRegistry()
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    # httpx transport that routes every request through an Upstream (used for the LLM client)
+
+    def __init__(self, upstream: Upstream, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.upstream = upstream
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+
+        async def send() -> httpx.Response:
+            response = await self._transport.handle_async_request(request)
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                content = await response.aread()
+                await response.aclose()
+                raise UpstreamStatusError(response.status_code, response.headers, content)
+            return response
+
+        async def discard(response: httpx.Response) -> None:
+            await response.aclose()
+
+        try:
+            return await self.upstream.call(send, idempotent=True, discard=discard)
+        except UpstreamStatusError as exc:
+            # Retries exhausted: hand the last upstream answer to the client library unchanged
+            headers = [
+                (key, value) for key, value in exc.headers.multi_items()
+                if key.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+            ]
+            return httpx.Response(exc.status_code, headers=headers, content=exc.content, request=request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def guard_tool(tool: Any, upstream: Upstream) -> Any:
+    # Route a LangChain tool's coroutine through the MCP server's upstream (no hedging: tools have side effects)
+    coroutine = getattr(tool, "coroutine", None)
+    if coroutine is None:
+        return tool
+
+    async def guarded(*args, **kwargs):
+        return await upstream.call(lambda: coroutine(*args, **kwargs), idempotent=False)
+
+    tool.coroutine = guarded
+    return tool
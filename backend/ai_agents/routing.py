@@ -0,0 +1,125 @@
+# Model ladder routing: cheap models for simple turns, escalation when the answer looks unsure
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Requests that usually need the stronger model regardless of length
+COMPLEX_PATTERN = re.compile(
+    r"```|\b(explain why|step[- ]by[- ]step|analy[sz]e|compare|contrast|prove|derive|debug|"
+    r"refactor|implement|write (?:a|an|the) (?:function|script|program|essay|story|plan)|"
+    r"pros and cons|trade-?offs?|in detail|outline|translate)\b",
+    re.IGNORECASE,
+)
+
+# Phrases a model uses when it isn't confident in its answer
+HEDGE_PATTERN = re.compile(
+    r"\b(i'?m not (?:sure|certain)|i am not (?:sure|certain)|i don'?t know|i do not know|"
+    r"i can(?:no|')t (?:answer|help|determine)|unable to (?:answer|determine)|"
+    r"i'?m unable to|not enough information|beyond my (?:knowledge|capabilities))\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class RoutingSettings:
+    # Env-driven thresholds for picking a rung of the model ladder
+    simple_chars: int = 280
+    complex_chars: int = 2000
+    long_history_turns: int = 8
+    escalate: bool = True
+    latency_smoothing: float = 0.2
+    baseline_latency_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "RoutingSettings":
+        baseline = os.getenv("AI_ROUTER_BASELINE_MS")
+        return cls(
+            simple_chars=int(os.getenv("AI_ROUTER_SIMPLE_CHARS", "280")),
+            complex_chars=int(os.getenv("AI_ROUTER_COMPLEX_CHARS", "2000")),
+            long_history_turns=int(os.getenv("AI_ROUTER_LONG_HISTORY_TURNS", "8")),
+            escalate=os.getenv("AI_ROUTER_ESCALATE", "true").lower() not in ("0", "false", "no"),
+            baseline_latency_ms=float(baseline) if baseline else None,
+        )
+
+
+def parse_ladder(value: Optional[str]) -> List[str]:
+    # "flash-lite, flash, pro" -> ["flash-lite", "flash", "pro"], cheapest first
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+@dataclass
+class RouteDecision:
+    tier: int
+    reason: str
+    score: int = 0
+
+
+@dataclass
+class ModelRouter:
+    # Picks a starting rung from the prompt, judges answers, and tracks per-model latency
+    ladder: List[str]
+    settings: RoutingSettings = field(default_factory=RoutingSettings)
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def top_model(self) -> str:
+        return self.ladder[-1]
+
+    def route(self, prompt: str, history: Optional[List[Dict[str, str]]] = None) -> RouteDecision:
+        # Each signal moves the request one rung up; the ladder's top model caps it
+        score, reasons = 0, []
+        length = len(prompt)
+        if length > self.settings.simple_chars:
+            score += 2 if length > self.settings.complex_chars else 1
+            reasons.append(f"prompt {length} chars")
+        if COMPLEX_PATTERN.search(prompt):
+            score += 1
+            reasons.append("complex request")
+        turns = sum(1 for turn in history or [] if turn.get("role") in ("user", "assistant"))
+        if turns >= self.settings.long_history_turns:
+            score += 1
+            reasons.append(f"{turns} history turns")
+        tier = min(score, len(self.ladder) - 1)
+        return RouteDecision(tier=tier, reason=", ".join(reasons) or "simple prompt", score=score)
+
+    def assess(self, content: str, finish_reason: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        # (confident, why not) for an answer from a lower rung
+        if not (content or "").strip():
+            return False, "empty answer"
+        if finish_reason == "length":
+            return False, "answer truncated"
+        if HEDGE_PATTERN.search(content):
+            return False, "hedged answer"
+        return True, None
+
+    def observe(self, model: str, latency_ms: float) -> None:
+        # Exponentially weighted latency per model, used to estimate what routing saved
+        previous = self.latency_ms.get(model)
+        alpha = self.settings.latency_smoothing
+        self.latency_ms[model] = latency_ms if previous is None else previous + alpha * (latency_ms - previous)
+
+    def summary(self, decision: RouteDecision, attempts: List[Dict[str, Any]], total_ms: float) -> Dict[str, Any]:
+        # The metadata block recorded on every routed response
+        # Until the top model has answered here, fall back to the configured estimate
+        baseline = self.latency_ms.get(self.top_model, self.settings.baseline_latency_ms)
+        final = attempts[-1]["model"] if attempts else self.ladder[decision.tier]
+        if baseline is None:
+            savings = None
+        elif final == self.top_model and len(attempts) <= 1:
+            savings = 0.0
+        else:
+            # Negative when a cheap attempt was wasted before escalating to the top model
+            savings = round(baseline - total_ms, 1)
+        return {
+            "model": final,
+            "initial_model": self.ladder[decision.tier],
+            "reason": decision.reason,
+            "escalated": len(attempts) > 1,
+            "attempts": attempts,
+            "latency_ms": round(total_ms, 1),
+            "baseline_model": self.top_model,
+            "baseline_latency_ms": round(baseline, 1) if baseline is not None else None,
+            "estimated_savings_ms": savings,
+        }
@@ -0,0 +1,282 @@
+# Conversation sessions: server-side chat history bounded by a token budget
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace as dataclass_replace
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (previous_summary, dropped_messages) -> new summary
+Summarizer = Callable[[str, List[Dict[str, str]]], Awaitable[str]]
+
+# Rough per-message framing cost (role, separators) on top of the text itself
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting and needs no tokenizer
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def trim_to_budget(
+    messages: List[Dict[str, str]], budget: int
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    # Keep the newest messages that fit the budget; returns (kept, dropped) in original order
+    kept: List[Dict[str, str]] = []
+    used = 0
+    for message in reversed(messages):
+        cost = message_tokens(message)
+        if kept and used + cost > budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept, messages[: len(messages) - len(kept)]
+
+
+@dataclass
+class ConversationSession:
+    # Stored history for one session id
+    id: str
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    summary: str = ""
+    version: int = 0
+    updatedAt: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "messages": self.messages,
+            "summary": self.summary,
+            "version": self.version,
+            "updatedAt": self.updatedAt,
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "ConversationSession":
+        return cls(
+            id=doc["id"],
+            messages=list(doc.get("messages") or []),
+            summary=doc.get("summary") or "",
+            version=doc.get("version", 0),
+            updatedAt=doc.get("updatedAt") or datetime.now(timezone.utc),
+        )
+
+
+class SessionStore(ABC):
+    # Storage backend interface; `replace` is optimistic on `version`
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[ConversationSession]:
+        ...
+
+    @abstractmethod
+    async def append(self, session_id: str, messages: List[Dict[str, str]]) -> ConversationSession:
+        ...
+
+    @abstractmethod
+    async def replace(self, session: ConversationSession, expected_version: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> bool:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    # Per-process LRU; least recently used sessions are evicted past `max_sessions`
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+
+    @staticmethod
+    def _copy(session: ConversationSession) -> ConversationSession:
+        # Callers get snapshots so a slow compaction never mutates the live session
+        return dataclass_replace(session, messages=list(session.messages))
+
+    def _touch(self, session: ConversationSession) -> None:
+        self._sessions[session.id] = session
+        self._sessions.move_to_end(session.id)
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            logger.debug("Evicted chat session %s", evicted)
+
+    async def get(self, session_id: str) -> Optional[ConversationSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        return self._copy(session)
+
+    async def append(self, session_id: str, messages: List[Dict[str, str]]) -> ConversationSession:
+        session = self._sessions.get(session_id) or ConversationSession(id=session_id)
+        session.messages.extend(messages)
+        session.version += 1
+        session.updatedAt = datetime.now(timezone.utc)
+        self._touch(session)
+        return self._copy(session)
+
+    async def replace(self, session: ConversationSession, expected_version: int) -> bool:
+        current = self._sessions.get(session.id)
+        if current is None or current.version != expected_version:
+            return False
+        session = self._copy(session)
+        session.version = expected_version + 1
+        session.updatedAt = datetime.now(timezone.utc)
+        self._touch(session)
+        return True
+
+    async def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+
+class MongoSessionStore(SessionStore):
+    # Shared across workers; appends are atomic $push, compaction is version-checked
+
+    def __init__(self, collection, ttl_seconds: Optional[int] = None):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("id", unique=True)
+        if self.ttl_seconds:
+            await self.collection.create_index("updatedAt", expireAfterSeconds=self.ttl_seconds)
+
+    async def get(self, session_id: str) -> Optional[ConversationSession]:
+        doc = await self.collection.find_one({"id": session_id}, {"_id": 0})
+        return ConversationSession.from_document(doc) if doc else None
+
+    async def append(self, session_id: str, messages: List[Dict[str, str]]) -> ConversationSession:
+        from pymongo import ReturnDocument
+
+        doc = await self.collection.find_one_and_update(
+            {"id": session_id},
+            {
+                "$push": {"messages": {"$each": messages}},
+                "$inc": {"version": 1},
+                "$set": {"updatedAt": datetime.now(timezone.utc)},
+                "$setOnInsert": {"summary": ""},
+            },
+            upsert=True,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        return ConversationSession.from_document(doc)
+
+    async def replace(self, session: ConversationSession, expected_version: int) -> bool:
+        result = await self.collection.update_one(
+            {"id": session.id, "version": expected_version},
+            {"$set": {
+                "messages": session.messages,
+                "summary": session.summary,
+                "version": expected_version + 1,
+                "updatedAt": datetime.now(timezone.utc),
+            }},
+        )
+        return result.modified_count == 1
+
+    async def delete(self, session_id: str) -> bool:
+        result = await self.collection.delete_one({"id": session_id})
+        return result.deleted_count == 1
+
+
+class SessionManager:
+    # Builds bounded prompt history and compacts stored history past the token budget
+
+    def __init__(self, store: SessionStore, token_budget: int = 3000, summarize: bool = True):
+        self.store = store
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @classmethod
+    def from_env(cls, db=None) -> "SessionManager":
+        backend = os.getenv("SESSION_BACKEND", "memory").lower()
+        if backend == "mongo" and db is not None:
+            ttl = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+            store: SessionStore = MongoSessionStore(db.chat_sessions, ttl_seconds=ttl or None)
+        else:
+            store = InMemorySessionStore(max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "1000")))
+        return cls(
+            store,
+            token_budget=int(os.getenv("SESSION_TOKEN_BUDGET", "3000")),
+            summarize=os.getenv("SESSION_SUMMARIZE", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def history(self, session_id: str) -> List[Dict[str, str]]:
+        # Prompt-ready history: rolling summary first, then the newest turns that fit the budget
+        session = await self.store.get(session_id)
+        if session is None:
+            return []
+        budget = self.token_budget
+        prefix: List[Dict[str, str]] = []
+        if session.summary:
+            summary = {"role": "system", "content": f"Summary of the earlier conversation: {session.summary}"}
+            prefix.append(summary)
+            budget -= message_tokens(summary)
+        kept, _ = trim_to_budget(session.messages, max(budget, 0))
+        return prefix + kept
+
+    async def record_turn(self, session_id: str, user_message: str, assistant_message: str) -> bool:
+        # Append one exchange; returns True when stored history now exceeds the budget
+        session = await self.store.append(session_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_message},
+        ])
+        used = sum(message_tokens(message) for message in session.messages)
+        return used > self.token_budget
+
+    async def compact(self, session_id: str, summarizer: Optional[Summarizer] = None) -> bool:
+        # Fold (or drop) turns that no longer fit the budget; safe to run after the response is sent
+        lock = self._lock(session_id)
+        try:
+            async with lock:
+                return await self._compact(session_id, summarizer)
+        finally:
+            if not lock.locked():
+                self._locks.pop(session_id, None)
+
+    async def _compact(self, session_id: str, summarizer: Optional[Summarizer]) -> bool:
+        session = await self.store.get(session_id)
+        if session is None:
+            return False
+        # Leave room for the summary so the next prompt still fits
+        kept, dropped = trim_to_budget(session.messages, self.token_budget * 3 // 4)
+        if not dropped:
+            return False
+        expected_version = session.version
+        summary = session.summary
+        if self.summarize and summarizer is not None:
+            try:
+                summary = await summarizer(session.summary, dropped)
+            except Exception as exc:
+                logger.warning("Session %s summarization failed, dropping turns: %s", session_id, exc)
+        session.messages = kept
+        session.summary = summary
+        replaced = await self.store.replace(session, expected_version)
+        if not replaced:
+            logger.info("Session %s changed during compaction; will retry next turn", session_id)
+        return replaced
+
+    async def get(self, session_id: str) -> Optional[ConversationSession]:
+        return await self.store.get(session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        self._locks.pop(session_id, None)
+        return await self.store.delete(session_id)
@@ -0,0 +1,75 @@
+"""Compare LLM round trips per generated image: legacy text scraping vs. direct tool parsing.
+
+The legacy path runs the full ReAct loop (tool call, then a second LLM call
+that writes the URL into prose) and regex-scans the reply. The structured path
+stops at the tool result. Both run against local fake LLM/MCP servers with a
+fixed per-request LLM latency, so the wall-time difference is the saved round trip.
+
+    python benchmarks/bench_image_structured.py --images 20 --llm-latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+for path in (BACKEND_DIR, BACKEND_DIR / "tests"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from ai_agents import AgentConfig, ImageAgent  # noqa: E402
+from ai_agents.resilience import ResilienceSettings, upstreams  # noqa: E402
+from fakes import FakeLLMServer, FakeMCPServer  # noqa: E402
+
+GCS_URL = re.compile(r"https://storage\.googleapis\.com/[^\s\)\]]+")
+
+
+async def legacy_generate(agent: ImageAgent, prompt: str) -> str:
+    response = await agent.execute(prompt, use_tools=True)
+    match = GCS_URL.search(response.content or "")
+    return match.group(0) if match else ""
+
+
+async def structured_generate(agent: ImageAgent, prompt: str) -> str:
+    result = await agent.generate_image_structured(prompt)
+    return result.image_url if result.success else ""
+
+
+async def run(label, generate, llm: FakeLLMServer, images: int) -> None:
+    upstreams.clear()
+    config = AgentConfig(api_base_url=llm.url, api_key="sk-bench", model_name="fake", resilience=ResilienceSettings())
+    agent = ImageAgent(config)
+    await agent.setup_image_mcp()
+
+    llm_requests_before = len(llm.requests)
+    started = time.perf_counter()
+    urls = [await generate(agent, f"benchmark image {index}") for index in range(images)]
+    elapsed = time.perf_counter() - started
+
+    llm_requests = len(llm.requests) - llm_requests_before
+    ok = sum(1 for url in urls if url)
+    print(
+        f"{label:<12} images={images} ok={ok} llm_calls/image={llm_requests / images:.2f} "
+        f"total={elapsed:.2f}s per_image={elapsed / images * 1000:.0f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake LLM request")
+    args = parser.parse_args()
+
+    with FakeLLMServer(delay=args.llm_latency) as llm, FakeMCPServer() as mcp:
+        os.environ["CODEXHUB_MCP_AUTH_TOKEN"] = "sk-bench"
+        os.environ["CODEXHUB_MCP_IMAGE_URL"] = mcp.mcp_url
+        await run("legacy", legacy_generate, llm, args.images)
+        await run("structured", structured_generate, llm, args.images)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""Measure photo search against downloading the gallery and filtering client-side.
+
+Seeds a synthetic collection (default 100k photos) and times, per query:
+
+* "download": what a client had to do before: fetch every photo, ``imageData``
+  included, and match title/description in Python;
+* "search": ``PhotoSearch.search``, one page of light fields by relevance.
+
+With ``--mongo-url`` the search uses the weighted text index on a real mongod
+(the collection is dropped afterwards). Without it the run uses the in-memory
+stand-in, which has no ``$text``, so it measures the regex fallback; use
+``--photos 10000`` or so there, because mongomock is slow at 100k documents.
+
+    python benchmarks/bench_search.py --mongo-url mongodb://localhost:27017 --photos 100000
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from photo_search import PhotoSearch  # noqa: E402
+from server import photo_summary_reader  # noqa: E402
+
+WORDS = (
+    "harbour dawn fog pier bride groom studio portrait golden hour coast mountain forest "
+    "city night neon rain autumn snow desert market street window candid family garden"
+).split()
+QUERIES = ["harbour", "golden hour", "bride studio", "neon rain city", "nonexistentword"]
+
+
+def make_docs(count: int, image_bytes: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_bytes)).decode()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": " ".join(rng.sample(WORDS, 3)).title(),
+            "category": ("portrait", "wedding", "landscape", "commercial")[index % 4],
+            "imageData": image,
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "tags": rng.sample(WORDS, 2),
+            "featured": index % 50 == 0,
+            "order": 0,
+            "rank": f"{index:08d}",
+        }
+        for index in range(count)
+    ]
+
+
+async def download(collection, query: str) -> int:
+    terms = query.lower().split()
+    docs = await collection.find({}, {"_id": 0}).to_list(None)
+    return sum(1 for doc in docs if any(term in f"{doc['title']} {doc['description']}".lower() for term in terms))
+
+
+async def search(engine: PhotoSearch, query: str) -> int:
+    total, _ = await engine.search(query, limit=20)
+    return total
+
+
+async def timed(fn, *args, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--photos", type=int, default=100_000)
+    parser.add_argument("--image-bytes", type=int, default=1024, help="payload size of imageData before base64")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mongo-url", help="use a real mongod (text index) instead of the in-memory stand-in")
+    parser.add_argument("--skip-download", action="store_true", help="only time the search endpoint")
+    args = parser.parse_args()
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongo_url)
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        client = AsyncMongoMockClient()
+    db_name = f"bench_search_{uuid.uuid4().hex[:8]}"
+    collection = client[db_name]["photos"]
+    try:
+        started = time.perf_counter()
+        docs = make_docs(args.photos, args.image_bytes)
+        for start in range(0, len(docs), 5000):
+            await collection.insert_many(docs[start:start + 5000])
+        engine = PhotoSearch(collection, photo_summary_reader.projection)
+        await engine.ensure_indexes()
+        print(f"seeded {args.photos} photos in {time.perf_counter() - started:.1f}s")
+
+        await engine.search(QUERIES[0])
+        print(f"search backend: {'text index' if engine.text_supported else 'regex fallback'}")
+        for query in QUERIES:
+            matches = await search(engine, query)
+            quick = await timed(search, engine, query, repeat=args.repeat)
+            line = f"q={query!r:<20} matches={matches:<7} search={quick * 1000:9.1f}ms"
+            if not args.skip_download:
+                slow = await timed(download, collection, query, repeat=args.repeat)
+                line += f" download={slow * 1000:9.1f}ms speedup={slow / quick:6.1f}x"
+            print(line)
+    finally:
+        if args.mongo_url:
+            await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
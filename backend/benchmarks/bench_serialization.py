@@ -0,0 +1,91 @@
+"""Measure GET /api/photos encoding cost: validated models vs. the fast read path.
+
+"legacy" reproduces the old endpoint: ``Photo(**doc)`` per document, then
+FastAPI's ``serialize_response`` re-validates against ``List[Photo]`` and the
+result is encoded by ``JSONResponse``. "fast" is ``ModelReader.read_all``
+plus ``FastJSONResponse``. Database I/O is excluded; only the CPU work per request is timed.
+
+    python benchmarks/bench_serialization.py --photos 1000 5000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from serialization import FastJSONResponse, ModelReader  # noqa: E402
+from server import Photo  # noqa: E402
+
+READER = ModelReader(Photo)
+
+
+def make_docs(count: int, image_bytes: int) -> List[dict]:
+    # Shaped like documents motor returns: naive UTC datetimes, millisecond precision
+    started = datetime(2024, 1, 1)
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_bytes)).decode()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Photo {index}",
+            "category": ("portrait", "wedding", "landscape", "commercial")[index % 4],
+            "imageData": image,
+            "description": "Golden hour session on the coast " * 3,
+            "featured": index % 10 == 0,
+            "order": index,
+            "createdAt": started + timedelta(minutes=index),
+        }
+        for index in range(count)
+    ]
+
+
+async def legacy(field, docs) -> bytes:
+    content = await serialize_response(field=field, response_content=[Photo(**doc) for doc in docs])
+    return JSONResponse(content).body
+
+
+async def fast(field, docs) -> bytes:
+    return FastJSONResponse(READER.read_all(docs)).body
+
+
+async def measure(fn, field, docs, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn(field, docs)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--photos", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--image-bytes", type=int, default=256, help="payload size of imageData before base64")
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    field = create_response_field(name="response", type_=List[Photo], mode="serialization")
+    for count in args.photos:
+        docs = make_docs(count, args.image_bytes)
+        assert len(await legacy(field, docs)) > 0 and len(await fast(field, docs)) > 0
+        slow = await measure(legacy, field, docs, args.repeat)
+        quick = await measure(fast, field, docs, args.repeat)
+        print(f"photos={count:<6} legacy={slow * 1000:8.2f}ms fast={quick * 1000:8.2f}ms speedup={slow / quick:5.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
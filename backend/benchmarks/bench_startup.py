@@ -0,0 +1,97 @@
+"""Startup import-time benchmark for ``server`` with a regression threshold.
+
+Runs ``python -X importtime -c "import server"`` in fresh interpreters, reports
+the median cumulative import time and the slowest top-level imports, and fails
+(exit 1) when
+
+* any module of the agent stack (LangChain, LangGraph, OpenAI, MCP) is imported
+  at startup; they must load lazily on first agent use, or
+* the median exceeds ``--max-ms``, or the saved baseline by more than ``--tolerance``.
+
+    python benchmarks/bench_startup.py                 # compare with the baseline
+    python benchmarks/bench_startup.py --save-baseline # record this machine's numbers
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "baselines" / "startup.json"
+
+HEAVY_MODULES = ("langchain_openai", "langchain_core", "langchain_mcp_adapters", "langgraph", "openai", "mcp")
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float], List[str]]:
+    # Returns (cumulative ms for `module`, top-level package -> cumulative ms, every imported module)
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    packages: Dict[str, float] = {}
+    modules: List[str] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not cumulative.isdigit():
+            continue
+        ms = int(cumulative) / 1000
+        modules.append(name)
+        if name == module:
+            total = ms
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0.0), ms)
+    return total, packages, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--max-ms", type=float, default=None, help="absolute ceiling for the median")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    import_profile(args.module)  # warm the filesystem cache
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    median = statistics.median(total for total, _, _ in runs)
+    _, packages, modules = runs[-1]
+
+    print(f"import {args.module}: median {median:.0f}ms over {args.runs} runs")
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {name:<28} {ms:8.1f}ms")
+
+    failures = []
+    eager = sorted({name.split(".")[0] for name in modules if name.split(".")[0] in HEAVY_MODULES})
+    if eager:
+        failures.append(f"agent stack imported at startup: {', '.join(eager)}")
+
+    if args.save_baseline:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE.write_text(json.dumps({"module": args.module, "median_ms": round(median, 1)}, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINE}")
+    elif BASELINE.exists():
+        baseline = json.loads(BASELINE.read_text())["median_ms"]
+        limit = baseline * (1 + args.tolerance)
+        print(f"baseline {baseline:.0f}ms, limit {limit:.0f}ms (+{args.tolerance:.0%})")
+        if median > limit:
+            failures.append(f"median {median:.0f}ms exceeds baseline limit {limit:.0f}ms")
+    if args.max_ms is not None and median > args.max_ms:
+        failures.append(f"median {median:.0f}ms exceeds --max-ms {args.max_ms:.0f}ms")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""Self-contained load test for the API: throughput and latency percentiles per workload.
+
+Starts the app in a uvicorn subprocess against a local mongod (``--mongo-url``)
+or an in-memory MongoDB stand-in (mongomock-motor, the default), with the fake
+OpenAI-compatible LLM and fake MCP servers from ``tests/fakes.py`` standing in
+for LiteLLM and CodexHub. Seeds a gallery, then runs scripted workloads:
+
+    gallery_reads     GET /api/photos
+    category_filters  GET /api/photos?category=...
+    bulk_uploads      POST /api/photos with base64 image payloads
+    chat_burst        POST /api/chat
+    search_burst      POST /api/search (fake LLM + fake web-search MCP tool)
+
+Results can be saved as a baseline and later runs compared against it; the
+script exits 1 when p95 latency or throughput regresses past ``--tolerance``.
+Baselines are machine-specific: record one on the machine that compares.
+
+    python benchmarks/loadtest.py --save-baseline
+    python benchmarks/loadtest.py --compare
+    python benchmarks/loadtest.py --only gallery_reads category_filters --scale 3
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+for path in (BACKEND_DIR, BACKEND_DIR / "tests"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from fakes import FakeLLMServer, FakeMCPServer, _free_port  # noqa: E402
+
+BASELINE = Path(__file__).resolve().parent / "baselines" / "loadtest.json"
+CATEGORIES = ("portrait", "wedding", "landscape", "commercial")
+
+
+def _image_payload(size: int) -> str:
+    return "data:image/jpeg;base64," + base64.b64encode(os.urandom(size)).decode()
+
+
+def _svg_payload(index: int) -> str:
+    # Seeded photos use SVG data URIs like the sample data, which compress well
+    svg = f'<svg xmlns="http://www.w3.org/2000/svg" width="800" height="600"><rect width="800" height="600" fill="#{index % 0xffffff:06x}"/></svg>'
+    return "data:image/svg+xml;base64," + base64.b64encode(svg.encode()).decode()
+
+
+@dataclass
+class Workload:
+    name: str
+    requests: int
+    concurrency: int
+    send: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def workloads(upload_bytes: int) -> Dict[str, Workload]:
+    async def gallery(client, index):
+        return await client.get("/api/photos")
+
+    async def category(client, index):
+        return await client.get("/api/photos", params={"category": random.choice(CATEGORIES)})
+
+    async def upload(client, index):
+        return await client.post("/api/photos", json={
+            "title": f"Upload {index}",
+            "category": random.choice(CATEGORIES),
+            "imageData": _image_payload(upload_bytes),
+            "order": 10_000 + index,
+        })
+
+    async def chat(client, index):
+        return await client.post("/api/chat", json={"message": f"Suggest a shot list for session {index}"})
+
+    async def search(client, index):
+        return await client.post("/api/search", json={"query": f"golden hour tips {index}"})
+
+    return {
+        "gallery_reads": Workload("gallery_reads", 2000, 32, gallery),
+        "category_filters": Workload("category_filters", 2000, 32, category),
+        "bulk_uploads": Workload("bulk_uploads", 200, 8, upload),
+        "chat_burst": Workload("chat_burst", 100, 16, chat),
+        "search_burst": Workload("search_burst", 50, 8, search),
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def run_workload(base_url: str, workload: Workload, warmup: int = 0) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(workload.requests))
+    limits = httpx.Limits(max_connections=workload.concurrency, max_keepalive_connections=workload.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        # Unmeasured: opens connections and pays one-off costs such as the lazy agent import
+        await asyncio.gather(*(workload.send(client, -1 - index) for index in range(warmup)))
+
+        async def worker():
+            nonlocal errors
+            for index in counter:
+                started = time.perf_counter()
+                try:
+                    response = await workload.send(client, index)
+                    body = response.json()
+                    # Agent endpoints report failures in the body with a 200
+                    ok = response.status_code < 400 and not (isinstance(body, dict) and body.get("success") is False)
+                except (httpx.HTTPError, ValueError):
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += 0 if ok else 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(workload.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def seed(base_url: str, photos: int, testimonials: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        gate = asyncio.Semaphore(16)
+
+        async def post(path, body):
+            async with gate:
+                (await client.post(path, json=body)).raise_for_status()
+
+        await asyncio.gather(*(
+            post("/api/photos", {
+                "title": f"Seed {index}",
+                "category": CATEGORIES[index % len(CATEGORIES)],
+                "imageData": _svg_payload(index),
+                "description": "Seeded for load testing",
+                "featured": index % 12 == 0,
+                "order": index,
+            })
+            for index in range(photos)
+        ))
+        await asyncio.gather(*(
+            post("/api/testimonials", {"clientName": f"Client {index}", "testimonialText": "Wonderful session.", "rating": 5})
+            for index in range(testimonials)
+        ))
+
+
+def start_app(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--serve", "--port", str(port)],
+        cwd=BACKEND_DIR, env={**os.environ, **env},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("API server did not become ready")
+
+
+def serve(port: int) -> None:
+    # Child process: run the real app, with mongomock standing in for mongod when asked
+    import uvicorn
+
+    import server
+
+    # Request-level INFO logs would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    if os.environ.get("LOADTEST_IN_MEMORY") == "1":
+        from mongomock_motor import AsyncMongoMockClient
+
+        client = AsyncMongoMockClient()
+        server.AsyncIOMotorClient = lambda url, **kwargs: client
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms vs baseline {previous['p95_ms']}ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s vs baseline {previous['rps']} req/s")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors vs baseline {previous['errors']}")
+    return regressions
+
+
+def main() -> int:
+    catalog = workloads(upload_bytes=0)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(catalog), help="run only these workloads")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every workload's request count")
+    parser.add_argument("--mongo-url", help="use a real mongod instead of the in-memory stand-in")
+    parser.add_argument("--db-name", default="loadtest")
+    parser.add_argument("--seed-photos", type=int, default=300)
+    parser.add_argument("--seed-testimonials", type=int, default=20)
+    parser.add_argument("--upload-bytes", type=int, default=48_000, help="image size for bulk uploads")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each workload")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM seconds per completion")
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="compare with the saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return 0
+
+    logging.basicConfig(level=logging.WARNING)
+    for name in ("mcp", "httpx", "uvicorn"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    selected = workloads(args.upload_bytes)
+    names = args.only or list(selected)
+    port = _free_port()
+
+    with FakeLLMServer(delay=args.llm_latency) as llm, FakeMCPServer() as mcp:
+        env = {
+            "MONGO_URL": args.mongo_url or "mongodb://in-memory",
+            "DB_NAME": args.db_name,
+            "LOADTEST_IN_MEMORY": "0" if args.mongo_url else "1",
+            "LITELLM_BASE_URL": llm.url,
+            "LITELLM_AUTH_TOKEN": "sk-loadtest",
+            "AI_MODEL_NAME": "fake",
+            "CODEXHUB_MCP_AUTH_TOKEN": "sk-loadtest",
+            "CODEXHUB_MCP_WEB_URL": mcp.mcp_url,
+            "CODEXHUB_MCP_IMAGE_URL": mcp.mcp_url,
+            "JOB_WORKERS": "0",
+            # Bursts come from one address; measure throughput, not the limiter
+            "RATE_LIMIT_ENABLED": "false",
+        }
+        if args.mongo_url:
+            # Start from an empty database so runs are comparable; before the app starts, which creates its indexes
+            from pymongo import MongoClient
+
+            MongoClient(args.mongo_url).drop_database(args.db_name)
+        app = start_app(port, env)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            asyncio.run(seed(base_url, args.seed_photos, args.seed_testimonials))
+
+            results: Dict[str, Dict[str, float]] = {}
+            print(f"{'workload':<18}{'reqs':>7}{'err':>5}{'req/s':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+            for name in names:
+                workload = selected[name]
+                workload.requests = max(1, int(workload.requests * args.scale))
+                stats = asyncio.run(run_workload(base_url, workload, args.warmup))
+                results[name] = stats
+                print(f"{name:<18}{stats['requests']:>7}{stats['errors']:>5}{stats['rps']:>9}"
+                      f"{stats['p50_ms']:>9}{stats['p90_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['max_ms']:>9}")
+        finally:
+            app.terminate()
+            app.wait(timeout=10)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+    # Numbers are only comparable between runs with the same settings
+    settings = {
+        "scale": args.scale,
+        "seed_photos": args.seed_photos,
+        "upload_bytes": args.upload_bytes,
+        "llm_latency": args.llm_latency,
+        "mongo": "mongod" if args.mongo_url else "in-memory",
+    }
+    if args.save_baseline:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        saved = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        saved.pop("_settings", None)
+        BASELINE.write_text(json.dumps({"_settings": settings, **saved, **results}, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINE}")
+    if args.compare:
+        if not BASELINE.exists():
+            print("No baseline saved yet; run with --save-baseline first")
+            return 1
+        baseline = json.loads(BASELINE.read_text())
+        if baseline.get("_settings", settings) != settings:
+            print(f"WARNING: baseline was recorded with {baseline['_settings']}, this run used {settings}")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
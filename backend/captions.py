@@ -0,0 +1,213 @@
+"""Batch captioning and tagging of the photo library with a vision model.
+
+``CaptionPipeline.run`` walks photos that have no caption yet (``captionHash``
+is unset; ``update_photo`` clears it when the image changes) in ``id`` order,
+one page at a time. For every photo it:
+
+* skips it when ``captionHash`` already matches the image's content hash;
+* reuses a stored result from ``caption_cache`` for an image it has seen before;
+* otherwise sends it to the caption agent, several images per request
+  (``batch_size``) with at most ``concurrency`` requests in flight. A batch
+  whose reply can't be matched to its images is retried one image at a time.
+
+Results fill ``altText``, merge into ``tags`` and become the ``description``
+only where that is still empty. Progress is checkpointed in ``caption_runs``
+after every page, so a run that is interrupted resumes after the last finished
+page when started again with the same run id. Photos whose request failed keep
+no ``captionHash`` and are picked up by the next run.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from placeholders import parse_data_uri
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+_PHOTO_FIELDS = {"_id": 0, "id": 1, "imageData": 1, "description": 1, "tags": 1, "captionHash": 1}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def content_hash(image_data: str) -> str:
+    # Hash of the image bytes, so re-encoding the same data URI doesn't count as a change
+    try:
+        parsed = parse_data_uri(image_data)
+    except ValueError:
+        parsed = None
+    data = parsed[1] if parsed is not None else image_data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+class CaptionPipeline:
+    def __init__(
+        self,
+        db,
+        get_agent: Callable[[], Any],
+        batch_size: int = 4,
+        concurrency: int = 2,
+        page_size: int = 32,
+        on_change: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.photos = db.photos
+        self.cache = db.caption_cache
+        self.runs = db.caption_runs
+        self._get_agent = get_agent
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.page_size = max(self.batch_size, page_size)
+        self.on_change = on_change
+
+    @classmethod
+    def from_env(cls, db, get_agent: Callable[[], Any], on_change=None) -> "CaptionPipeline":
+        return cls(
+            db,
+            get_agent,
+            batch_size=int(os.getenv("CAPTION_BATCH_SIZE", "4")),
+            concurrency=int(os.getenv("CAPTION_CONCURRENCY", "2")),
+            page_size=int(os.getenv("CAPTION_PAGE_SIZE", "32")),
+            on_change=on_change,
+        )
+
+    async def ensure_indexes(self) -> None:
+        await self.cache.create_index("hash", unique=True)
+        await self.runs.create_index("id", unique=True)
+
+    async def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return await self.runs.find_one({"id": run_id}, {"_id": 0})
+
+    async def run(self, run_id: Optional[str] = None, force: bool = False, limit: Optional[int] = None) -> Dict[str, Any]:
+        # Caption pending photos (every photo with `force`, bypassing the cache); resumes `run_id` if it exists
+        run_id = run_id or str(uuid.uuid4())
+        state = await self.get_run(run_id)
+        if state is None:
+            state = {
+                "id": run_id,
+                "status": RUNNING,
+                "force": force,
+                "lastId": None,
+                "captioned": 0,
+                "cached": 0,
+                "skipped": 0,
+                "failed": 0,
+                "createdAt": _now(),
+                "updatedAt": _now(),
+                "finishedAt": None,
+                "error": None,
+            }
+            await self.runs.insert_one(dict(state))
+        elif state["status"] == COMPLETED:
+            return state
+        else:
+            force = state.get("force", force)
+            logger.info("Resuming caption run %s after photo %s", run_id, state["lastId"])
+        await self.runs.update_one({"id": run_id}, {"$set": {"status": RUNNING, "error": None, "updatedAt": _now()}})
+
+        changed = False
+        try:
+            gate = asyncio.Semaphore(self.concurrency)
+            seen = 0
+            while limit is None or seen < limit:
+                query: Dict[str, Any] = {} if force else {"captionHash": None}
+                if state["lastId"] is not None:
+                    query["id"] = {"$gt": state["lastId"]}
+                size = self.page_size if limit is None else min(self.page_size, limit - seen)
+                page = await self.photos.find(query, _PHOTO_FIELDS).sort("id", 1).limit(size).to_list(size)
+                if not page:
+                    break
+                seen += len(page)
+                counts = await self._caption_page(page, force, gate)
+                changed = changed or bool(counts["captioned"] or counts["cached"])
+                state["lastId"] = page[-1]["id"]
+                for key, value in counts.items():
+                    state[key] += value
+                await self.runs.update_one({"id": run_id}, {"$set": {
+                    "lastId": state["lastId"], **{key: state[key] for key in counts}, "updatedAt": _now(),
+                }})
+        except Exception as exc:
+            await self.runs.update_one({"id": run_id}, {"$set": {"status": FAILED, "error": str(exc), "updatedAt": _now()}})
+            raise
+        finally:
+            if changed and self.on_change is not None:
+                await self.on_change()
+
+        now = _now()
+        await self.runs.update_one({"id": run_id}, {"$set": {"status": COMPLETED, "finishedAt": now, "updatedAt": now}})
+        logger.info(
+            "Caption run %s: %s captioned, %s from cache, %s unchanged, %s failed",
+            run_id, state["captioned"], state["cached"], state["skipped"], state["failed"],
+        )
+        return await self.get_run(run_id)
+
+    async def _caption_page(self, page: List[Dict[str, Any]], force: bool, gate: asyncio.Semaphore) -> Dict[str, int]:
+        counts = {"captioned": 0, "cached": 0, "skipped": 0, "failed": 0}
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        for photo in page:
+            digest = content_hash(photo.get("imageData") or "")
+            if not force and photo.get("captionHash") == digest:
+                counts["skipped"] += 1
+                continue
+            # Identical images in one page are captioned once
+            pending.setdefault(digest, []).append(photo)
+
+        if not force and pending:
+            async for hit in self.cache.find({"hash": {"$in": list(pending)}}, {"_id": 0}):
+                for photo in pending.pop(hit["hash"]):
+                    await self._apply(photo, hit["hash"], hit["result"])
+                    counts["cached"] += 1
+
+        digests = list(pending)
+        batches = [digests[start:start + self.batch_size] for start in range(0, len(digests), self.batch_size)]
+
+        async def run_batch(batch: List[str]) -> None:
+            async with gate:
+                results = await self._describe([pending[digest][0]["imageData"] for digest in batch])
+            for digest, result in zip(batch, results):
+                if result is None:
+                    counts["failed"] += len(pending[digest])
+                    continue
+                await self.cache.update_one(
+                    {"hash": digest}, {"$set": {"hash": digest, "result": result, "createdAt": _now()}}, upsert=True
+                )
+                for photo in pending[digest]:
+                    await self._apply(photo, digest, result)
+                    counts["captioned"] += 1
+
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return counts
+
+    async def _describe(self, images: List[str]) -> List[Optional[Dict[str, Any]]]:
+        # One result (or None on failure) per image
+        agent = self._get_agent()
+        try:
+            return [caption.model_dump() for caption in await agent.caption_images(images)]
+        except ValueError as exc:
+            if len(images) == 1:
+                logger.warning("Caption reply unusable: %s", exc)
+                return [None]
+            logger.info("Batched caption reply unusable (%s); captioning one image per request", exc)
+        except Exception:
+            logger.exception("Caption request for %d images failed", len(images))
+            return [None] * len(images)
+        results = []
+        for image in images:
+            results.extend(await self._describe([image]))
+        return results
+
+    async def _apply(self, photo: Dict[str, Any], digest: str, result: Dict[str, Any]) -> None:
+        tags = list(dict.fromkeys([*(photo.get("tags") or []), *result.get("tags", [])]))
+        update: Dict[str, Any] = {"altText": result.get("alt_text", ""), "tags": tags, "captionHash": digest}
+        if not (photo.get("description") or "").strip():
+            update["description"] = result.get("caption", "")
+        await self.photos.update_one({"id": photo["id"]}, {"$set": update})
@@ -0,0 +1,144 @@
+"""Maintenance commands for the portfolio backend.
+
+    python cli.py snapshot --out ./snapshot --base-url https://cdn.example.com
+    python cli.py backfill-placeholders
+    python cli.py captions --limit 200
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from mongo import MongoSettings
+
+ROOT_DIR = Path(__file__).parent
+
+app = typer.Typer(help="Portfolio backend maintenance commands.", no_args_is_help=True)
+
+
+@app.callback()
+def main():
+    """Portfolio backend maintenance commands."""
+
+
+def _database():
+    load_dotenv(ROOT_DIR / ".env")
+    mongo_url = os.getenv("MONGO_URL")
+    db_name = os.getenv("DB_NAME")
+    if not mongo_url or not db_name:
+        raise typer.BadParameter("MONGO_URL and DB_NAME must be set (environment or backend/.env)")
+    client = AsyncIOMotorClient(mongo_url, **MongoSettings.from_env().client_kwargs())
+    return client, client[db_name]
+
+
+@app.command()
+def snapshot(
+    out: Optional[Path] = typer.Option(None, help="Output directory (default: $SNAPSHOT_DIR)"),
+    base_url: Optional[str] = typer.Option(None, help="URL prefix for files in the manifest (default: $SNAPSHOT_BASE_URL)"),
+    section: Optional[List[str]] = typer.Option(None, help="Rebuild only these sections: photos, testimonials, about"),
+):
+    """Export photos, testimonials and about content as static, content-hashed files."""
+    from server import _load_public_content
+    from snapshots import SECTIONS, SnapshotBuilder
+
+    root = out or (Path(os.environ["SNAPSHOT_DIR"]) if os.getenv("SNAPSHOT_DIR") else None)
+    if root is None:
+        raise typer.BadParameter("Pass --out or set SNAPSHOT_DIR")
+    unknown = set(section or ()) - set(SECTIONS)
+    if unknown:
+        raise typer.BadParameter(f"Unknown section(s): {', '.join(sorted(unknown))}")
+
+    async def run():
+        client, db = _database()
+        try:
+            builder = SnapshotBuilder(
+                lambda name: _load_public_content(db, name),
+                root,
+                base_url=base_url if base_url is not None else os.getenv("SNAPSHOT_BASE_URL", ""),
+                keep_versions=int(os.getenv("SNAPSHOT_KEEP_VERSIONS", "5")),
+            )
+            return await builder.build(sections=section or SECTIONS)
+        finally:
+            client.close()
+
+    manifest = asyncio.run(run())
+    typer.echo(f"Snapshot {manifest['version']} written to {root}")
+    for route, url in manifest["routes"].items():
+        typer.echo(f"  {route} -> {url}")
+
+
+@app.command()
+def backfill_placeholders(
+    force: bool = typer.Option(False, help="Recompute photos that already have size/placeholder fields"),
+    batch_size: int = typer.Option(50, min=1, help="Photos read per batch"),
+):
+    """Compute intrinsic size and blurred placeholder for existing photos."""
+    from invalidation import POLL, ContentWatcher
+    from placeholders import describe_image
+
+    async def run():
+        client, db = _database()
+        try:
+            query = {} if force else {"width": {"$exists": False}}
+            updated = 0
+            # Read ids first: imageData is large, so load it a batch at a time
+            ids = [doc["id"] async for doc in db.photos.find(query, {"_id": 0, "id": 1})]
+            for start in range(0, len(ids), batch_size):
+                batch = db.photos.find({"id": {"$in": ids[start:start + batch_size]}}, {"_id": 0, "id": 1, "imageData": 1})
+                async for photo in batch:
+                    fields = await asyncio.to_thread(describe_image, photo.get("imageData") or "")
+                    await db.photos.update_one({"id": photo["id"]}, {"$set": fields})
+                    updated += 1
+                typer.echo(f"  {updated}/{len(ids)} photos")
+            if updated:
+                # Let running servers drop cached photo listings
+                await ContentWatcher(db, mode=POLL).bump("photos")
+            return updated
+        finally:
+            client.close()
+
+    typer.echo(f"Updated {asyncio.run(run())} photos")
+
+
+@app.command()
+def captions(
+    force: bool = typer.Option(False, help="Re-caption every photo, ignoring cached results"),
+    limit: Optional[int] = typer.Option(None, min=1, help="Stop after this many photos"),
+    resume: Optional[str] = typer.Option(None, help="Run id of an interrupted run to continue"),
+):
+    """Caption and tag photos with the vision model (see CAPTION_* settings)."""
+    from ai_agents.agents import AgentConfig, CaptionAgent
+    from captions import CaptionPipeline
+    from invalidation import POLL, ContentWatcher
+
+    async def run():
+        client, db = _database()
+        try:
+            config = AgentConfig()
+            if os.getenv("CAPTION_MODEL_NAME"):
+                config.model_name = os.environ["CAPTION_MODEL_NAME"]
+            agent = CaptionAgent(config)
+
+            async def changed():
+                await ContentWatcher(db, mode=POLL).bump("photos")
+
+            pipeline = CaptionPipeline.from_env(db, lambda: agent, on_change=changed)
+            await pipeline.ensure_indexes()
+            return await pipeline.run(run_id=resume, force=force, limit=limit)
+        finally:
+            client.close()
+
+    summary = asyncio.run(run())
+    typer.echo(
+        f"Run {summary['id']}: {summary['captioned']} captioned, {summary['cached']} from cache, "
+        f"{summary['skipped']} unchanged, {summary['failed']} failed"
+    )
+
+
+if __name__ == "__main__":
+    app()
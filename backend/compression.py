@@ -0,0 +1,226 @@
+"""Negotiated response compression (zstd, brotli, gzip).
+
+``CompressionMiddleware`` picks an encoding from ``Accept-Encoding``, skips
+small or already-encoded responses and compresses streaming bodies chunk by
+chunk, flushing each chunk so streamed output is not held back. zstd and
+brotli are used when their optional packages (``zstandard``, ``brotli``) are
+installed; gzip is always available.
+"""
+
+import gzip
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        # wbits=31 writes the gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class Codec:
+    # `level` is for per-request compression; `static_level` for bodies compressed once and cached
+
+    def __init__(self, name: str, level: int, static_level: int):
+        self.name = name
+        self.level = level
+        self.static_level = static_level
+
+    def compress(self, data: bytes, static: bool = False) -> bytes:
+        level = self.static_level if static else self.level
+        if self.name == "gzip":
+            return gzip.compress(data, compresslevel=level, mtime=0)
+        if self.name == "zstd":
+            return zstandard.ZstdCompressor(level=level).compress(data)
+        return brotli.compress(data, quality=level)
+
+    def stream(self):
+        if self.name == "gzip":
+            return _GzipStream(self.level)
+        if self.name == "zstd":
+            return _ZstdStream(self.level)
+        return _BrotliStream(self.level)
+
+
+def available_codecs() -> Dict[str, Codec]:
+    # Server preference order: best ratio/speed first
+    codecs: Dict[str, Codec] = {}
+    if zstandard is not None:
+        codecs["zstd"] = Codec("zstd", level=3, static_level=19)
+    if brotli is not None:
+        codecs["br"] = Codec("br", level=4, static_level=11)
+    codecs["gzip"] = Codec("gzip", level=6, static_level=9)
+    return codecs
+
+
+def _parse_accept_encoding(header: str) -> List[Tuple[str, float]]:
+    accepted = []
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted.append((name, quality))
+    return accepted
+
+
+def negotiate(header: Optional[str], supported: Sequence[str]) -> Optional[str]:
+    # Highest client q-value wins; ties go to the server's order in `supported`
+    if not header:
+        return None
+    qualities = dict(_parse_accept_encoding(header))
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for name in supported:
+        quality = qualities.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, codecs: Optional[Dict[str, Codec]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.codecs = codecs if codecs is not None else available_codecs()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), list(self.codecs))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self.codecs[encoding], self.minimum_size, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, codec: Codec, minimum_size: int, send: Send):
+        self.codec = codec
+        self.minimum_size = minimum_size
+        self._send = send
+        self._start: Optional[Message] = None
+        self._passthrough = False
+        self._stream = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self._start = message
+            self._passthrough = "content-encoding" in headers or not is_compressible(headers.get("content-type"))
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._passthrough:
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._stream is None and not more_body:
+            # Whole body in one message
+            if len(body) < self.minimum_size:
+                await self._flush_start()
+                await self._send(message)
+                return
+            compressed = self.codec.compress(body)
+            self._set_encoding(len(compressed))
+            await self._flush_start()
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self._stream is None:
+            # Streaming response: the final size is unknown
+            self._stream = self.codec.stream()
+            self._set_encoding(None)
+            await self._flush_start()
+
+        chunk = self._stream.compress(body) if body else b""
+        if not more_body:
+            chunk += self._stream.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _set_encoding(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=list(self._start["headers"]))
+        headers["Content-Encoding"] = self.codec.name
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        self._start["headers"] = headers.raw
+
+    async def _flush_start(self) -> None:
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self._send(start)
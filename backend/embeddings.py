@@ -0,0 +1,281 @@
+"""Vector index over photo captions for "more like this" and semantic search.
+
+Each photo is embedded from its caption text: title, description, alt text,
+tags and category. The description and alt text written by the caption
+pipeline describe what is in the image, so they carry its visual content.
+Vectors are stored in ``photo_embeddings`` next to a hash of the text and the
+model that produced them, so only photos whose text changed are embedded
+again. Every worker keeps the vectors in memory and answers queries with a
+NumPy dot product over the normalized matrix, or with ``hnswlib`` when
+``EMBEDDINGS_INDEX=hnsw`` and the package is installed.
+
+Photo writes (local, or from other workers through ``ContentWatcher``) mark
+the index dirty; it re-syncs after a short debounce, or on the next query.
+
+Two embedders are available: ``RemoteEmbedder`` calls the LiteLLM
+``/embeddings`` endpoint with ``EMBEDDING_MODEL_NAME``; without that setting
+``HashingEmbedder`` hashes word and word-pair features locally, which needs no
+network but only matches shared vocabulary.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+
+try:
+    import hnswlib
+except ImportError:  # pragma: no cover - optional dependency
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ("title", "description", "altText", "tags", "category")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def photo_text(photo: Dict[str, Any]) -> str:
+    parts = []
+    for field in TEXT_FIELDS:
+        value = photo.get(field)
+        if isinstance(value, list):
+            value = " ".join(value)
+        if value:
+            parts.append(str(value))
+    return ". ".join(parts)
+
+
+class HashingEmbedder:
+    # Signed feature hashing of words and adjacent word pairs, log-scaled and L2-normalized
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            features = Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+            for feature, count in features.items():
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+                sign = 1.0 if digest[4] & 1 else -1.0
+                matrix[row, bucket] += sign * (1.0 + math.log(count))
+        return _normalize(matrix)
+
+
+class RemoteEmbedder:
+    # OpenAI-compatible /embeddings endpoint behind the LLM upstream's resilience layer
+
+    def __init__(self, base_url: str, api_key: str, model: str, batch_size: int = 64):
+        import httpx
+
+        from ai_agents.resilience import ResilienceSettings, ResilientTransport, upstreams
+
+        self.name = model
+        self.model = model
+        self.batch_size = batch_size
+        upstream = upstreams.get(f"llm:{base_url}", ResilienceSettings.from_env())
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"},
+            transport=ResilientTransport(upstream),
+            timeout=60.0,
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["RemoteEmbedder"]:
+        model = os.getenv("EMBEDDING_MODEL_NAME")
+        if not model:
+            return None
+        return cls(
+            os.getenv("LITELLM_BASE_URL", "https://litellm-docker-545630944929.us-central1.run.app"),
+            os.getenv("LITELLM_AUTH_TOKEN", "dummy-key"),
+            model,
+        )
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            response = await self._client.post(
+                "/embeddings", json={"model": self.model, "input": list(texts[start:start + self.batch_size])}
+            )
+            response.raise_for_status()
+            data = sorted(response.json()["data"], key=lambda item: item["index"])
+            rows.extend(item["embedding"] for item in data)
+        return _normalize(np.asarray(rows, dtype=np.float32))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class EmbeddingIndex:
+    def __init__(
+        self,
+        db,
+        embedder,
+        index_kind: str = "numpy",
+        debounce: float = 1.0,
+        batch_size: int = 64,
+    ):
+        self.photos = db.photos
+        self.store = db.photo_embeddings
+        self.embedder = embedder
+        self.index_kind = index_kind
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self._vectors: Dict[str, Tuple[str, np.ndarray]] = {}
+        self._ids: List[str] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._hnsw = None
+        self._dirty = True
+        self._lock = asyncio.Lock()
+        self._pending: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, db) -> "EmbeddingIndex":
+        embedder = RemoteEmbedder.from_env() or HashingEmbedder(int(os.getenv("EMBEDDING_DIMENSIONS", "512")))
+        return cls(
+            db,
+            embedder,
+            index_kind=os.getenv("EMBEDDINGS_INDEX", "numpy").lower(),
+            debounce=float(os.getenv("EMBEDDINGS_DEBOUNCE_SECONDS", "1.0")),
+        )
+
+    async def ensure_indexes(self) -> None:
+        await self.store.create_index("id", unique=True)
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._sync_later())
+
+    async def _sync_later(self) -> None:
+        await asyncio.sleep(self.debounce)
+        try:
+            await self.sync()
+        except Exception:
+            logger.exception("Embedding index sync failed")
+
+    async def stop(self) -> None:
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+            await asyncio.gather(self._pending, return_exceptions=True)
+        close = getattr(self.embedder, "close", None)
+        if close is not None:
+            await close()
+
+    async def sync(self) -> int:
+        # Embed photos whose text changed, drop deleted ones, refresh the in-memory index; returns vectors embedded
+        async with self._lock:
+            self._dirty = False
+            photos = await self.photos.find({}, {"_id": 0, "id": 1, **{field: 1 for field in TEXT_FIELDS}}).to_list(None)
+            wanted = {}
+            for photo in photos:
+                text = photo_text(photo)
+                digest = hashlib.sha256(f"{self.embedder.name}\n{text}".encode()).hexdigest()
+                wanted[photo["id"]] = (digest, text)
+
+            stored = {
+                doc["id"]: doc["textHash"]
+                async for doc in self.store.find({}, {"_id": 0, "id": 1, "textHash": 1})
+            }
+            stale = [photo_id for photo_id, (digest, _) in wanted.items() if stored.get(photo_id) != digest]
+            for start in range(0, len(stale), self.batch_size):
+                batch = stale[start:start + self.batch_size]
+                vectors = await self.embedder.embed([wanted[photo_id][1] for photo_id in batch])
+                now = datetime.now(timezone.utc)
+                await self.store.bulk_write([
+                    UpdateOne(
+                        {"id": photo_id},
+                        {"$set": {
+                            "id": photo_id,
+                            "textHash": wanted[photo_id][0],
+                            "model": self.embedder.name,
+                            "vector": vector.tolist(),
+                            "updatedAt": now,
+                        }},
+                        upsert=True,
+                    )
+                    for photo_id, vector in zip(batch, vectors)
+                ], ordered=False)
+            removed = [photo_id for photo_id in stored if photo_id not in wanted]
+            if removed:
+                await self.store.delete_many({"id": {"$in": removed}})
+
+            # Load only vectors this worker doesn't hold yet (new, changed, or embedded by another worker)
+            missing = [photo_id for photo_id, (digest, _) in wanted.items()
+                       if self._vectors.get(photo_id, (None,))[0] != digest]
+            if missing:
+                async for doc in self.store.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "textHash": 1, "vector": 1}):
+                    if doc["textHash"] == wanted[doc["id"]][0]:
+                        self._vectors[doc["id"]] = (doc["textHash"], np.asarray(doc["vector"], dtype=np.float32))
+            for photo_id in [photo_id for photo_id in self._vectors if photo_id not in wanted]:
+                del self._vectors[photo_id]
+            if missing or removed or len(self._ids) != len(self._vectors):
+                self._rebuild()
+            if stale:
+                logger.info("Embedded %d photos with %s", len(stale), self.embedder.name)
+            return len(stale)
+
+    def _rebuild(self) -> None:
+        self._ids = list(self._vectors)
+        if not self._ids:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._hnsw = None
+            return
+        self._matrix = np.vstack([self._vectors[photo_id][1] for photo_id in self._ids])
+        self._hnsw = None
+        if self.index_kind == "hnsw" and hnswlib is not None:
+            index = hnswlib.Index(space="ip", dim=self._matrix.shape[1])
+            index.init_index(max_elements=len(self._ids), ef_construction=200, M=16)
+            index.add_items(self._matrix, np.arange(len(self._ids)))
+            self._hnsw = index
+
+    async def _fresh(self) -> None:
+        if self._dirty:
+            await self.sync()
+
+    async def similar(self, photo_id: str, limit: int = 8) -> Optional[List[Tuple[str, float]]]:
+        # (photo id, cosine similarity) of the nearest photos, None for an unknown photo
+        await self._fresh()
+        entry = self._vectors.get(photo_id)
+        if entry is None:
+            return None
+        return [(other, score) for other, score in self._nearest(entry[1], limit + 1) if other != photo_id][:limit]
+
+    async def search(self, text: str, limit: int = 20) -> List[Tuple[str, float]]:
+        await self._fresh()
+        if not self._ids:
+            return []
+        query = (await self.embedder.embed([text]))[0]
+        return self._nearest(query, limit)
+
+    def _nearest(self, vector: np.ndarray, limit: int) -> List[Tuple[str, float]]:
+        count = min(limit, len(self._ids))
+        if count == 0:
+            return []
+        if self._hnsw is not None:
+            self._hnsw.set_ef(max(50, count * 2))
+            labels, distances = self._hnsw.knn_query(vector, k=count)
+            return [(self._ids[label], float(1.0 - distance)) for label, distance in zip(labels[0], distances[0])]
+        scores = self._matrix @ vector
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[index], float(scores[index])) for index in top]
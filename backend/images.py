@@ -0,0 +1,142 @@
+"""Image generation service backed by one warm, shared ImageAgent.
+
+Results are cached by normalized prompt, in process and (optionally) in the
+``image_cache`` collection so other workers and restarts reuse them.
+Concurrent requests for the same prompt share a single generation.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?,;:]+$")
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Case, whitespace and trailing punctuation don't change what gets generated
+    return _TRAILING_PUNCTUATION.sub("", " ".join(prompt.lower().split()))
+
+
+class ImageService:
+    def __init__(
+        self,
+        get_agent: Callable[[], Any],
+        cache_collection=None,
+        cache_size: int = 256,
+        max_concurrency: int = 4,
+    ):
+        self._get_agent = get_agent
+        self.cache_collection = cache_collection
+        self.cache_size = cache_size
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def from_env(cls, get_agent: Callable[[], Any], db=None) -> "ImageService":
+        return cls(
+            get_agent,
+            cache_collection=db.image_cache if db is not None else None,
+            cache_size=int(os.getenv("IMAGE_CACHE_SIZE", "256")),
+            max_concurrency=int(os.getenv("IMAGE_MAX_CONCURRENCY", "4")),
+        )
+
+    async def ensure_indexes(self) -> None:
+        if self.cache_collection is not None:
+            await self.cache_collection.create_index("key", unique=True)
+
+    async def warm(self) -> None:
+        # Create the agent and open its MCP tool list ahead of the first request
+        agent = self._get_agent()
+        await agent.setup_image_mcp()
+        logger.info("Image agent warmed with %s tools", len(agent.mcp_tools))
+
+    async def generate(self, prompt: str, use_cache: bool = True) -> Tuple[Dict[str, Any], bool]:
+        # Returns (ImageGenerationResult as a dict, served_from_cache)
+        key = normalize_prompt(prompt)
+        if use_cache:
+            cached = await self._cache_get(key)
+            if cached is not None:
+                return cached, True
+
+            while (pending := self._inflight.get(key)) is not None:
+                try:
+                    return await asyncio.shield(pending), True
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    # The leading request was cancelled; take over (or follow whoever did)
+
+        future = asyncio.get_running_loop().create_future()
+        if use_cache:
+            self._inflight[key] = future
+        try:
+            async with self._semaphore:
+                result = await self._get_agent().generate_image_structured(prompt)
+            data = result.model_dump()
+            if data.get("success"):
+                await self._cache_put(key, prompt, data)
+            future.set_result(data)
+            return data, False
+        except Exception as exc:
+            future.set_exception(exc)
+            # Nobody else may be waiting; retrieve the exception so it isn't logged as unhandled
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                # Cancelled (client disconnect, shutdown): release waiters instead of leaving them blocked
+                future.cancel()
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def generate_many(
+        self, requests: List[Tuple[str, bool]], concurrency: int
+    ) -> List[Tuple[Optional[Dict[str, Any]], bool, Optional[str]]]:
+        # Generate (prompt, use_cache) pairs with at most `concurrency` in flight; returns (result, cached, error) each
+        gate = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(prompt: str, use_cache: bool):
+            async with gate:
+                try:
+                    result, cached = await self.generate(prompt, use_cache=use_cache)
+                    return result, cached, None
+                except Exception as exc:
+                    logger.exception("Batch image generation failed for prompt %r", prompt)
+                    return None, False, str(exc)
+
+        return await asyncio.gather(*(run(prompt, use_cache) for prompt, use_cache in requests))
+
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self._memory.get(key)
+        if cached is not None:
+            self._memory.move_to_end(key)
+            return cached
+        if self.cache_collection is None:
+            return None
+        doc = await self.cache_collection.find_one({"key": key}, {"_id": 0, "result": 1})
+        if doc is None:
+            return None
+        self._remember(key, doc["result"])
+        return doc["result"]
+
+    async def _cache_put(self, key: str, prompt: str, result: Dict[str, Any]) -> None:
+        self._remember(key, result)
+        if self.cache_collection is not None:
+            await self.cache_collection.update_one(
+                {"key": key},
+                {"$set": {"key": key, "prompt": prompt, "result": result, "createdAt": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.cache_size:
+            self._memory.popitem(last=False)
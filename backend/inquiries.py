@@ -0,0 +1,173 @@
+"""Contact inquiry inbox: status changes and incremental sync for the admin UI.
+
+Every write to an inquiry (creation or a status change) stamps it with the
+next value of a counter in ``counters`` as ``version`` and sets
+``updatedAt``. A client that remembers the highest ``version`` it has seen
+asks for ``since=<version>`` and gets only the inquiries created or changed
+after it, oldest change first. ``changes`` can also wait for the next change
+(long polling): writes on this worker wake waiters immediately, and writes on
+other workers are noticed by re-querying every ``poll_interval`` seconds.
+
+A version is taken before its document is written, so writes can commit out
+of order. Each version is therefore reserved in the counter's ``pending``
+list until its write finishes, and readers only see versions below the
+lowest one still pending: a client can never move its cursor past a write
+that is about to land. Reservations older than ``lease`` seconds (a worker
+that died mid-write) are dropped so they don't hold readers back forever.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("new", "contacted", "closed")
+
+COUNTER_ID = "contact_inquiries"
+
+
+class InquiryInbox:
+    def __init__(
+        self, db, projection: Optional[Dict[str, Any]] = None, poll_interval: float = 2.0, lease: float = 30.0
+    ):
+        self.collection = db.contact_inquiries
+        self.counters = db.counters
+        self.projection = projection or {"_id": 0}
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._changed = asyncio.Event()
+        self._closing = False
+
+    async def ensure_indexes(self) -> None:
+        await self._backfill_versions()
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index("version")
+        await self.collection.create_index([("status", 1), ("submittedAt", -1)])
+
+    async def _backfill_versions(self) -> None:
+        # Inquiries stored before versioning get versions in submission order
+        legacy = await self.collection.find(
+            {"version": None}, {"_id": 0, "id": 1, "submittedAt": 1}
+        ).sort("submittedAt", 1).to_list(None)
+        if not legacy:
+            return
+        counter = await self.counters.find_one_and_update(
+            {"_id": COUNTER_ID}, {"$inc": {"seq": len(legacy)}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        first = counter["seq"] - len(legacy) + 1
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"id": doc["id"]},
+                {"$set": {"version": first + offset, "updatedAt": doc.get("submittedAt") or datetime.now(timezone.utc)}},
+            )
+            for offset, doc in enumerate(legacy)
+        ], ordered=False)
+        logger.info("Assigned versions to %d existing inquiries", len(legacy))
+
+    async def _reserve(self) -> int:
+        # Take the next version and mark it pending in one write; retried when another writer got there first
+        while True:
+            counter = await self.counters.find_one({"_id": COUNTER_ID}) or {}
+            version = counter.get("seq", 0) + 1
+            try:
+                result = await self.counters.update_one(
+                    {"_id": COUNTER_ID, "seq": counter.get("seq")},
+                    {"$set": {"seq": version}, "$push": {"pending": {"v": version, "at": time.time()}}},
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                continue
+            if result.modified_count or result.upserted_id is not None:
+                return version
+
+    async def _release(self, version: int) -> None:
+        await self.counters.update_one({"_id": COUNTER_ID}, {"$pull": {"pending": {"v": version}}})
+        self.notify()
+
+    async def current_version(self) -> int:
+        # Highest version with every write at or below it finished
+        counter = await self.counters.find_one({"_id": COUNTER_ID})
+        if not counter:
+            return 0
+        pending = counter.get("pending") or []
+        cutoff = time.time() - self.lease
+        live = [entry["v"] for entry in pending if entry["at"] >= cutoff]
+        if len(live) < len(pending):
+            logger.warning("Dropping %d abandoned inquiry version reservations", len(pending) - len(live))
+            await self.counters.update_one({"_id": COUNTER_ID}, {"$pull": {"pending": {"at": {"$lt": cutoff}}}})
+        return min(live) - 1 if live else counter["seq"]
+
+    @asynccontextmanager
+    async def stamp(self, inquiry: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        # Version a new inquiry; insert it inside the block, readers see it once the block exits
+        version = await self._reserve()
+        inquiry["version"] = version
+        inquiry["updatedAt"] = inquiry.get("submittedAt") or datetime.now(timezone.utc)
+        try:
+            yield inquiry
+        finally:
+            await self._release(version)
+
+    def notify(self) -> None:
+        # Wake long-polls on this worker after an inquiry was written
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def set_status(self, inquiry_id: str, status: str) -> Optional[Dict[str, Any]]:
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status '{status}'")
+        version = await self._reserve()
+        try:
+            return await self.collection.find_one_and_update(
+                {"id": inquiry_id},
+                {"$set": {"status": status, "version": version, "updatedAt": datetime.now(timezone.utc)}},
+                projection=self.projection,
+                return_document=ReturnDocument.AFTER,
+            )
+        finally:
+            await self._release(version)
+
+    async def list(self, status: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        # Newest submissions first, optionally for one status
+        query = {"status": status} if status else {}
+        return await self.collection.find(query, self.projection).sort("submittedAt", -1).limit(limit).to_list(limit)
+
+    async def changes(
+        self, since: int, status: Optional[str] = None, limit: int = 1000, wait: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        # Inquiries written after version `since`, oldest change first; waits up to `wait` seconds for one.
+        # Nothing at or above a pending version is returned, so the caller's next `since` never skips one
+        query: Dict[str, Any] = {}
+        if status:
+            query["status"] = status
+        deadline = time.monotonic() + wait
+        while True:
+            changed = self._changed
+            docs = []
+            committed = await self.current_version()
+            if committed > since:
+                query["version"] = {"$gt": since, "$lte": committed}
+                docs = await self.collection.find(query, self.projection).sort("version", 1).limit(limit).to_list(limit)
+            remaining = deadline - time.monotonic()
+            if docs or remaining <= 0 or self._closing:
+                return docs
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(self.poll_interval, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    def close(self) -> None:
+        # End long-polls and streams so shutdown doesn't wait on them
+        self._closing = True
+        self.notify()
+
+    @property
+    def closing(self) -> bool:
+        return self._closing
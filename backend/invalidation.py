@@ -0,0 +1,163 @@
+"""Cross-worker cache invalidation for the public content collections.
+
+Each worker keeps its own in-process caches, so a write handled by one worker
+must reach the others. ``ContentWatcher`` follows a MongoDB change stream on
+the watched collections and calls its subscribers with the collection name for
+every change. Change streams need a replica set; on a standalone mongod (or any
+server that rejects ``$changeStream``) it polls a per-collection version
+document in ``cache_versions`` instead, which writers bump through ``bump``.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ("photos", "testimonials", "about")
+
+AUTO = "auto"
+CHANGE_STREAM = "changestream"
+POLL = "poll"
+OFF = "off"
+
+Subscriber = Callable[[str], None]
+
+
+class ContentWatcher:
+    def __init__(
+        self,
+        db,
+        collections: Iterable[str] = WATCHED_COLLECTIONS,
+        mode: str = AUTO,
+        poll_interval: float = 2.0,
+        version_collection: str = "cache_versions",
+    ):
+        self.db = db
+        self.collections = tuple(collections)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.versions = db[version_collection]
+        self.active_mode: Optional[str] = None
+        self._subscribers: List[Subscriber] = []
+        self._seen: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+
+    @classmethod
+    def from_env(cls, db) -> "ContentWatcher":
+        return cls(
+            db,
+            mode=os.getenv("CACHE_INVALIDATION", AUTO).lower(),
+            poll_interval=float(os.getenv("CACHE_POLL_INTERVAL", "2.0")),
+        )
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    def _broadcast(self, *collections: str) -> None:
+        for collection in collections:
+            for subscriber in self._subscribers:
+                try:
+                    subscriber(collection)
+                except Exception:
+                    logger.exception("Cache invalidation subscriber failed for %s", collection)
+
+    async def bump(self, collection: str) -> None:
+        # Record a write for workers that poll; change-stream workers see the write itself
+        if self.mode == OFF:
+            return
+        doc = await self.versions.find_one_and_update(
+            {"_id": collection},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is not None and doc["version"] == self._seen.get(collection, 0) + 1:
+            # Our own write, already invalidated locally; don't invalidate again on the next poll
+            self._seen[collection] = doc["version"]
+
+    async def start(self) -> None:
+        if self.mode == OFF:
+            return
+        if self.mode == POLL:
+            await self._load_versions()
+            self.active_mode = POLL
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        if self.mode in (AUTO, CHANGE_STREAM):
+            try:
+                await self._watch()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if self.mode == CHANGE_STREAM:
+                    logger.error("Change stream unavailable and polling disabled: %s", exc)
+                    return
+                logger.info("Change streams unavailable (%s); polling %s", exc, self.versions.name)
+            await self._load_versions()
+            self.active_mode = POLL
+        await self._poll()
+
+    async def _watch(self) -> None:
+        pipeline = [{"$match": {"ns.coll": {"$in": list(self.collections)}}}]
+        failures = 0
+        while True:
+            try:
+                async with self.db.watch(pipeline, resume_after=self._resume_token) as stream:
+                    if self.active_mode != CHANGE_STREAM:
+                        logger.info("Watching %s for cache invalidation", ", ".join(self.collections))
+                    if failures:
+                        # Changes may have been missed while the stream was down
+                        self._broadcast(*self.collections)
+                    self.active_mode = CHANGE_STREAM
+                    failures = 0
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        collection = change.get("ns", {}).get("coll")
+                        if collection:
+                            self._broadcast(collection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if self.active_mode != CHANGE_STREAM:
+                    # Never opened: let the caller fall back to polling
+                    raise
+                failures += 1
+                if failures > 1:
+                    # Resuming failed too (e.g. the oplog rolled past our token): start fresh
+                    self._resume_token = None
+                delay = random.uniform(0, min(30.0, 0.5 * 2 ** failures))
+                logger.warning("Change stream interrupted (%s); reopening in %.1fs", exc, delay)
+                await asyncio.sleep(delay)
+
+    async def _load_versions(self) -> None:
+        async for doc in self.versions.find({"_id": {"$in": list(self.collections)}}):
+            self._seen[doc["_id"]] = doc.get("version", 0)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                changed = []
+                async for doc in self.versions.find({"_id": {"$in": list(self.collections)}}):
+                    version = doc.get("version", 0)
+                    if version != self._seen.get(doc["_id"], 0):
+                        self._seen[doc["_id"]] = version
+                        changed.append(doc["_id"])
+                if changed:
+                    self._broadcast(*changed)
+            except Exception:
+                logger.exception("Cache version poll failed")
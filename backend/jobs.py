@@ -0,0 +1,257 @@
+"""Background job queue for long-running agent work, persisted in MongoDB.
+
+Jobs live in the ``jobs`` collection. Workers claim them atomically with a
+lease that is renewed while the job runs; a job whose lease expires (for
+example because its server was restarted) is claimed again by the next free
+worker, so queued and in-flight work survives restarts.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    def __init__(
+        self,
+        collection,
+        handlers: Dict[str, JobHandler],
+        workers: int = 2,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 1.0,
+        max_attempts: int = 3,
+        retry_base_delay: float = 2.0,
+    ):
+        self.collection = collection
+        self.handlers = handlers
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._worker_tasks = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested = set()
+        self._stopping = False
+
+    @classmethod
+    def from_env(cls, collection, handlers: Dict[str, JobHandler]) -> "JobQueue":
+        return cls(
+            collection,
+            handlers,
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "60")),
+            poll_interval=float(os.getenv("JOB_POLL_INTERVAL", "1.0")),
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        )
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("status", 1), ("runAfter", 1), ("createdAt", 1)])
+        await self.collection.create_index([("status", 1), ("leaseExpiresAt", 1)])
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        now = _now()
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "maxAttempts": max_attempts or self.max_attempts,
+            "result": None,
+            "error": None,
+            "createdAt": now,
+            "updatedAt": now,
+            "runAfter": now,
+            "startedAt": None,
+            "finishedAt": None,
+            "leaseExpiresAt": None,
+            "workerId": None,
+        }
+        await self.collection.insert_one(dict(job))
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": job_id}, {"_id": 0})
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        now = _now()
+        job = await self.collection.find_one_and_update(
+            {"id": job_id, "status": {"$in": [QUEUED, RUNNING]}},
+            {"$set": {"status": CANCELLED, "finishedAt": now, "updatedAt": now, "leaseExpiresAt": None}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return await self.get(job_id)
+        job.pop("_id", None)
+        self._cancel_local(job_id)
+        # Jobs running on other workers notice at their next lease renewal
+        return job
+
+    def _cancel_local(self, job_id: str) -> None:
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancel_requested.add(job_id)
+            task.cancel()
+
+    async def start(self) -> None:
+        self._stopping = False
+        for index in range(self.workers):
+            self._worker_tasks.append(asyncio.create_task(self._worker_loop(index)))
+        if self.workers:
+            logger.info("Job queue started with %s workers (%s)", self.workers, self.worker_id)
+
+    async def stop(self, timeout: float = 10.0) -> int:
+        # Let running jobs finish up to `timeout`; unfinished ones keep their lease and are re-claimed later.
+        # Returns the number of workers that had to be cancelled
+        self._stopping = True
+        self._wakeup.set()
+        pending = set()
+        if self._worker_tasks:
+            done, pending = await asyncio.wait(self._worker_tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._worker_tasks = []
+        return len(pending)
+
+    async def _worker_loop(self, index: int) -> None:
+        while not self._stopping:
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Job worker %s failed to claim a job", index)
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = _now()
+        job = await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "runAfter": {"$lte": now}},
+                # Lease expired: the worker that held it died or was restarted
+                {"status": RUNNING, "leaseExpiresAt": {"$lte": now}},
+            ]},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "workerId": self.worker_id,
+                    "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds),
+                    "startedAt": now,
+                    "updatedAt": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("createdAt", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is not None:
+            job.pop("_id", None)
+        return job
+
+    def _owned(self, job_id: str) -> Dict[str, Any]:
+        return {"id": job_id, "workerId": self.worker_id, "status": RUNNING}
+
+    async def _renew_lease(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            result = await self.collection.update_one(
+                self._owned(job_id),
+                {"$set": {"leaseExpiresAt": _now() + timedelta(seconds=self.lease_seconds)}},
+            )
+            if result.matched_count == 0:
+                # Cancelled (or re-claimed elsewhere) while we were running it
+                self._cancel_local(job_id)
+                return
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        if job["attempts"] > job["maxAttempts"]:
+            await self._finish(job_id, {"status": FAILED, "error": "Lease expired too many times"})
+            return
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await self._finish(job_id, {"status": FAILED, "error": f"No handler for job kind '{job['kind']}'"})
+            return
+
+        task = asyncio.create_task(handler(job["payload"]))
+        self._running[job_id] = task
+        lease = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job_id not in self._cancel_requested:
+                # The worker itself is shutting down; the lease lets another worker pick the job up
+                raise
+            self._cancel_requested.discard(job_id)
+            logger.info("Job %s cancelled", job_id)
+            return
+        except Exception as exc:
+            await self._handle_failure(job, exc)
+            return
+        finally:
+            lease.cancel()
+            self._running.pop(job_id, None)
+
+        await self._finish(job_id, {"status": SUCCEEDED, "result": result, "error": None})
+
+    async def _handle_failure(self, job: Dict[str, Any], exc: Exception) -> None:
+        job_id = job["id"]
+        error = str(exc) or exc.__class__.__name__
+        if job["attempts"] < job["maxAttempts"]:
+            delay = random.uniform(0, self.retry_base_delay * (2 ** (job["attempts"] - 1)))
+            logger.warning("Job %s attempt %s failed (%s); retrying in %.1fs", job_id, job["attempts"], error, delay)
+            now = _now()
+            await self.collection.update_one(
+                self._owned(job_id),
+                {"$set": {
+                    "status": QUEUED,
+                    "error": error,
+                    "runAfter": now + timedelta(seconds=delay),
+                    "leaseExpiresAt": None,
+                    "workerId": None,
+                    "updatedAt": now,
+                }},
+            )
+            return
+        logger.error("Job %s failed after %s attempts: %s", job_id, job["attempts"], error)
+        await self._finish(job_id, {"status": FAILED, "error": error})
+
+    async def _finish(self, job_id: str, fields: Dict[str, Any]) -> None:
+        now = _now()
+        fields.update({"finishedAt": now, "updatedAt": now, "leaseExpiresAt": None})
+        await self.collection.update_one(self._owned(job_id), {"$set": fields})
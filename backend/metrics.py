@@ -0,0 +1,93 @@
+"""Process-wide counters, histograms and gauges, served by ``GET /api/metrics``.
+
+Components record into the shared ``metrics`` registry by name
+(``metrics.inc("status_buffer.flushed", 20)``,
+``metrics.observe("status_buffer.flush_seconds", 0.004)``) or register a
+gauge: a callable sampled when the snapshot is taken. Histograms keep a
+rolling window of recent observations for percentiles plus all-time count and
+sum. Values are per worker process.
+"""
+
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+class Histogram:
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        def rounded(value):
+            return None if value is None else round(value, 6)
+
+        return {
+            "count": self.count,
+            "sum": rounded(self.total),
+            "mean": rounded(self.total / self.count) if self.count else None,
+            "p50": rounded(self.percentile(50)),
+            "p95": rounded(self.percentile(95)),
+            "max": rounded(self.max),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def gauge(self, name: str, read: Callable[[], Any]) -> None:
+        # Replaces an earlier gauge of the same name (e.g. after an app restart in tests)
+        self._gauges[name] = read
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def histogram(self, name: str) -> Optional[Histogram]:
+        return self._histograms.get(name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        gauges = {}
+        for name, read in sorted(self._gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception as exc:  # pragma: no cover - defensive
+                gauges[name] = f"error: {exc}"
+        return {
+            "counters": dict(sorted(self._counters.items())),
+            "histograms": {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())},
+            "gauges": gauges,
+        }
+
+    def clear(self) -> None:
+        self._counters.clear()
+        self._histograms.clear()
+        self._gauges.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,167 @@
+"""MongoDB client settings from the environment, and connection pool metrics.
+
+``MongoSettings.from_env`` reads pool size, timeouts, wire compression and the
+read preference for public read endpoints; ``client_kwargs`` turns them into
+``AsyncIOMotorClient`` options, leaving anything unset at the driver default.
+Uncached public reads (photo search, semantic and similar-photo search) use
+``public_database``, which may route to secondaries; writes, admin reads and
+anything that feeds the response cache or static snapshots always go to the
+primary, since those are rebuilt right after a write and kept until the next.
+
+``PoolMetrics`` is a driver event listener that records connection pool
+activity in ``metrics`` under ``mongo.pool.*``: connections created and
+closed, checkouts, checkout failures and wait time, pool clears, and gauges
+for connections open and in use.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from pymongo import ReadPreference, monitoring
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
+
+from metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+@dataclass
+class MongoSettings:
+    max_pool_size: Optional[int] = None
+    min_pool_size: Optional[int] = None
+    max_idle_time_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: Optional[int] = None
+    connect_timeout_ms: Optional[int] = None
+    socket_timeout_ms: Optional[int] = None
+    # Comma-separated, in order of preference: zstd, snappy, zlib
+    compressors: Optional[str] = None
+    zlib_level: Optional[int] = None
+    public_read_preference: str = "primary"
+    # At least 90 when set (a driver requirement); -1 means no limit
+    public_max_staleness: int = -1
+
+    @classmethod
+    def from_env(cls) -> "MongoSettings":
+        return cls(
+            max_pool_size=_env_int("MONGO_MAX_POOL_SIZE"),
+            min_pool_size=_env_int("MONGO_MIN_POOL_SIZE"),
+            max_idle_time_ms=_env_int("MONGO_MAX_IDLE_TIME_MS"),
+            wait_queue_timeout_ms=_env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+            server_selection_timeout_ms=_env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS"),
+            connect_timeout_ms=_env_int("MONGO_CONNECT_TIMEOUT_MS"),
+            socket_timeout_ms=_env_int("MONGO_SOCKET_TIMEOUT_MS"),
+            compressors=os.getenv("MONGO_COMPRESSORS") or None,
+            zlib_level=_env_int("MONGO_ZLIB_LEVEL"),
+            public_read_preference=os.getenv("MONGO_PUBLIC_READ_PREFERENCE", "primary"),
+            public_max_staleness=int(os.getenv("MONGO_PUBLIC_MAX_STALENESS_SECONDS", "-1")),
+        )
+
+    def client_kwargs(self) -> Dict[str, Any]:
+        # Only options that were set, so the connection string and driver defaults still apply otherwise
+        options = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "compressors": self.compressors,
+            "zlibCompressionLevel": self.zlib_level,
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+    def public_read_pref(self):
+        # Raises ValueError on an unknown mode name
+        mode = read_pref_mode_from_name(self.public_read_preference)
+        return make_read_preference(mode, None, self.public_max_staleness)
+
+
+def public_database(db, settings: MongoSettings):
+    # The same database with the public read preference; `db` itself when that is the primary
+    read_pref = settings.public_read_pref()
+    if read_pref == ReadPreference.PRIMARY:
+        return db
+    logger.info("Public reads use read preference %s", read_pref.name)
+    return db.with_options(read_preference=read_pref)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    # Callbacks run synchronously on the driver's threads, so checkout start times are thread-local
+
+    def __init__(self, metrics: Optional[Metrics] = None, max_pool_size: Optional[int] = None):
+        self.metrics = metrics or default_metrics
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.metrics.gauge("mongo.pool.open", lambda: self.open)
+        self.metrics.gauge("mongo.pool.in_use", lambda: self.in_use)
+        # maxPoolSize is per server; the driver default is 100
+        self.metrics.gauge("mongo.pool.max_size", lambda: max_pool_size or 100)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.metrics.inc("mongo.pool.cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+        self.metrics.inc("mongo.pool.created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+        self.metrics.inc("mongo.pool.closed")
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait()
+        self.metrics.inc("mongo.pool.checkout_failures")
+        self.metrics.inc(f"mongo.pool.checkout_failures.{event.reason}")
+
+    def connection_checked_out(self, event):
+        self._observe_wait()
+        with self._lock:
+            self.in_use += 1
+        self.metrics.inc("mongo.pool.checkouts")
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def _observe_wait(self) -> None:
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self.metrics.observe("mongo.pool.checkout_seconds", time.monotonic() - started)
+            self._local.started = None
+
+
+def client_options(settings: MongoSettings) -> Dict[str, Any]:
+    # Keyword arguments for AsyncIOMotorClient: settings plus the pool metrics listener
+    options = settings.client_kwargs()
+    options["event_listeners"] = [PoolMetrics(max_pool_size=settings.max_pool_size)]
+    return options
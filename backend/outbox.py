@@ -0,0 +1,392 @@
+"""Transactional outbox for notifications about new contact inquiries.
+
+``NotificationOutbox.add_inquiry`` stores the inquiry and a notification
+record in ``notification_outbox`` together, inside a transaction when the
+server supports one (replica set or mongos). On a standalone server the
+notification is written first and removed again if the inquiry insert fails,
+so a stored inquiry always has its notification (at-least-once delivery).
+The request never waits for delivery.
+
+A dispatcher task per worker claims due records in batches (a claim token and
+a lease, so several workers never send the same record twice) and hands each
+batch to a sink: an SMTP digest, a JSON webhook, or a JSON-lines file for
+local testing. A failed batch is retried with jittered exponential backoff up
+to ``OUTBOX_MAX_ATTEMPTS`` times; records whose lease expires (the worker
+died mid-send) are claimed again. Delivered records are purged by a TTL index
+after ``OUTBOX_RETENTION_DAYS``.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import random
+import smtplib
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from pymongo.errors import OperationFailure
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+DELIVERED = "delivered"
+FAILED = "failed"
+
+CONTACT_INQUIRY = "contact_inquiry"
+
+# Server errors meaning "no transactions here" (standalone mongod, old servers)
+_NO_TRANSACTIONS = {20, 263}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class FileSink:
+    # Appends one JSON line per notification; meant for development and tests
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def send(self, notifications: Sequence[Dict[str, Any]]) -> None:
+        lines = b"".join(dumps(notification) + b"\n" for notification in notifications)
+        await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: bytes) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as handle:
+            handle.write(lines)
+
+
+class WebhookSink:
+    # POSTs {"notifications": [...]} per batch, signed with HMAC-SHA256 when a secret is set
+    name = "webhook"
+
+    def __init__(self, url: str, secret: Optional[str] = None, timeout: float = 10.0):
+        import httpx
+
+        self.url = url
+        self.secret = secret
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, notifications: Sequence[Dict[str, Any]]) -> None:
+        body = dumps({"notifications": list(notifications)})
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            signature = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Signature-SHA256"] = signature
+        response = await self._client.post(self.url, content=body, headers=headers)
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class SmtpSink:
+    # One digest email per batch, sent from a worker thread
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        recipients: List[str],
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    async def send(self, notifications: Sequence[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self._send, self._message(notifications))
+
+    def _message(self, notifications: Sequence[Dict[str, Any]]) -> EmailMessage:
+        inquiries = [notification["payload"] for notification in notifications]
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        if len(inquiries) == 1:
+            message["Subject"] = f"New inquiry from {inquiries[0].get('name', 'someone')}"
+            reply_to = inquiries[0].get("email")
+            if reply_to:
+                message["Reply-To"] = reply_to
+        else:
+            message["Subject"] = f"{len(inquiries)} new inquiries"
+        message.set_content("\n\n".join(
+            f"From: {inquiry.get('name', '')} <{inquiry.get('email', '')}>"
+            + (f"\nPhone: {inquiry['phone']}" if inquiry.get("phone") else "")
+            + f"\nSent: {inquiry.get('submittedAt', '')}\n\n{inquiry.get('message', '')}"
+            for inquiry in inquiries
+        ))
+        return message
+
+    def _send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(message)
+
+
+def sink_from_env():
+    # NOTIFY_SINK selects smtp, webhook or file; unset disables notifications
+    kind = (os.getenv("NOTIFY_SINK") or "").lower()
+    if not kind or kind == "none":
+        return None
+    if kind == "file":
+        return FileSink(os.getenv("NOTIFY_FILE_PATH", "notifications.jsonl"))
+    if kind == "webhook":
+        return WebhookSink(os.environ["NOTIFY_WEBHOOK_URL"], os.getenv("NOTIFY_WEBHOOK_SECRET"))
+    if kind == "smtp":
+        return SmtpSink(
+            os.environ["SMTP_HOST"],
+            int(os.getenv("SMTP_PORT", "587")),
+            sender=os.environ["NOTIFY_EMAIL_FROM"],
+            recipients=[address.strip() for address in os.environ["NOTIFY_EMAIL_TO"].split(",") if address.strip()],
+            username=os.getenv("SMTP_USERNAME"),
+            password=os.getenv("SMTP_PASSWORD"),
+            starttls=os.getenv("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no"),
+        )
+    raise ValueError(f"Unknown NOTIFY_SINK '{kind}'")
+
+
+class NotificationOutbox:
+    def __init__(
+        self,
+        db,
+        sink,
+        batch_size: int = 20,
+        poll_interval: float = 2.0,
+        max_attempts: int = 8,
+        retry_base_delay: float = 5.0,
+        lease_seconds: float = 60.0,
+        retention_days: float = 7.0,
+    ):
+        self.db = db
+        self.collection = db.notification_outbox
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.lease_seconds = lease_seconds
+        self.retention_days = retention_days
+        self.transactions: Optional[bool] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @classmethod
+    def from_env(cls, db) -> "NotificationOutbox":
+        return cls(
+            db,
+            sink_from_env(),
+            batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "20")),
+            poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL", "2.0")),
+            max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")),
+            retry_base_delay=float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "5.0")),
+            retention_days=float(os.getenv("OUTBOX_RETENTION_DAYS", "7")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink is not None
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("status", 1), ("runAfter", 1), ("createdAt", 1)])
+        await self.collection.create_index("claimToken")
+        await self.collection.create_index("purgeAt", expireAfterSeconds=0)
+
+    async def add_inquiry(self, inquiries, inquiry: Dict[str, Any]) -> None:
+        # Insert the inquiry and, with a sink configured, its notification in one unit
+        if not self.enabled:
+            await inquiries.insert_one(inquiry)
+            return
+        now = _now()
+        record = {
+            "id": str(uuid.uuid4()),
+            "kind": CONTACT_INQUIRY,
+            "payload": {key: value for key, value in inquiry.items() if key != "_id"},
+            "status": PENDING,
+            "attempts": 0,
+            "runAfter": now,
+            "createdAt": now,
+            "claimToken": None,
+            "leaseExpiresAt": None,
+            "error": None,
+        }
+        if self.transactions is not False:
+            try:
+                await self._insert_in_transaction(inquiries, inquiry, record)
+                self.transactions = True
+                self._wakeup.set()
+                return
+            except NotImplementedError:
+                self.transactions = False
+            except OperationFailure as exc:
+                if exc.code not in _NO_TRANSACTIONS:
+                    raise
+                logger.info("Transactions unavailable (%s); writing the outbox record first", exc)
+                self.transactions = False
+
+        await self.collection.insert_one(record)
+        try:
+            await inquiries.insert_one(inquiry)
+        except Exception:
+            await self.collection.delete_one({"id": record["id"]})
+            raise
+        self._wakeup.set()
+
+    async def _insert_in_transaction(self, inquiries, inquiry: Dict[str, Any], record: Dict[str, Any]) -> None:
+        async with await self.db.client.start_session() as session:
+            async with session.start_transaction():
+                await inquiries.insert_one(inquiry, session=session)
+                await self.collection.insert_one(record, session=session)
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+            logger.info("Notification dispatcher started (%s sink)", self.sink.name)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        # Let the batch in flight finish; records still leased are re-claimed after a restart
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Notification dispatcher did not stop within %.0fs", timeout)
+            self._task = None
+        close = getattr(self.sink, "close", None)
+        if close is not None:
+            await close()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                sent = await self.dispatch_once()
+            except Exception:
+                logger.exception("Notification dispatch failed")
+                sent = 0
+            if sent:
+                # A full batch suggests more are waiting
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch_once(self) -> int:
+        # Claim and deliver one batch; returns the number of records processed
+        batch = await self._claim()
+        if not batch:
+            return 0
+        ids = [record["id"] for record in batch]
+        try:
+            await self.sink.send([
+                {"id": record["id"], "kind": record["kind"], "payload": record["payload"]} for record in batch
+            ])
+        except Exception as exc:
+            await self._failed(batch, exc)
+            return len(batch)
+        now = _now()
+        await self.collection.update_many(
+            {"id": {"$in": ids}, "claimToken": batch[0]["claimToken"]},
+            {"$set": {
+                "status": DELIVERED,
+                "deliveredAt": now,
+                "purgeAt": now + timedelta(days=self.retention_days),
+                "leaseExpiresAt": None,
+                "error": None,
+            }},
+        )
+        return len(batch)
+
+    async def _claim(self) -> List[Dict[str, Any]]:
+        now = _now()
+        due = {"$or": [
+            {"status": PENDING, "runAfter": {"$lte": now}},
+            # Lease expired: the worker sending it stopped mid-batch
+            {"status": SENDING, "leaseExpiresAt": {"$lte": now}},
+        ]}
+        candidates = await self.collection.find(due, {"_id": 0, "id": 1}).sort("createdAt", 1).limit(self.batch_size).to_list(self.batch_size)
+        if not candidates:
+            return []
+        token = uuid.uuid4().hex
+        await self.collection.update_many(
+            {"id": {"$in": [candidate["id"] for candidate in candidates]}, **due},
+            {
+                "$set": {
+                    "status": SENDING,
+                    "claimToken": token,
+                    "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+        return await self.collection.find({"claimToken": token}, {"_id": 0}).to_list(self.batch_size)
+
+    async def _failed(self, batch: List[Dict[str, Any]], exc: Exception) -> None:
+        error = str(exc) or exc.__class__.__name__
+        now = _now()
+        token = batch[0]["claimToken"]
+        give_up = [record["id"] for record in batch if record["attempts"] >= self.max_attempts]
+        retry = [record for record in batch if record["attempts"] < self.max_attempts]
+        if give_up:
+            logger.error("Giving up on %d notifications after %d attempts: %s", len(give_up), self.max_attempts, error)
+            await self.collection.update_many(
+                {"id": {"$in": give_up}, "claimToken": token},
+                {"$set": {"status": FAILED, "error": error, "leaseExpiresAt": None}},
+            )
+        if retry:
+            attempts = max(record["attempts"] for record in retry)
+            delay = random.uniform(0, self.retry_base_delay * (2 ** (attempts - 1)))
+            logger.warning("Notification batch failed (%s); retrying %d in %.1fs", error, len(retry), delay)
+            await self.collection.update_many(
+                {"id": {"$in": [record["id"] for record in retry]}, "claimToken": token},
+                {"$set": {
+                    "status": PENDING,
+                    "error": error,
+                    "runAfter": now + timedelta(seconds=delay),
+                    "leaseExpiresAt": None,
+                    "claimToken": None,
+                }},
+            )
+
+    async def stats(self) -> Dict[str, Any]:
+        counts = {PENDING: 0, SENDING: 0, DELIVERED: 0, FAILED: 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            if row["_id"] in counts:
+                counts[row["_id"]] = row["count"]
+        last_failure = await self.collection.find_one(
+            {"error": {"$ne": None}}, {"_id": 0, "error": 1, "attempts": 1, "runAfter": 1}, sort=[("runAfter", -1)]
+        )
+        return {
+            "sink": self.sink.name if self.sink is not None else None,
+            "transactions": self.transactions,
+            "counts": counts,
+            "lastError": last_failure,
+        }
@@ -0,0 +1,108 @@
+"""Relevance-ranked photo search over title, tags and description.
+
+Search uses a weighted MongoDB text index (title 10, tags 5, description 1),
+sorts by ``textScore`` and returns only light fields, never ``imageData``.
+Servers without text search (some MongoDB-compatible services, the in-memory
+test database) get a case-insensitive regex match scored with the same
+weights in Python. The fallback is chosen the first time the server says it
+has no text index or does not support ``$text``; any other error (a failover,
+a timeout) is raised as usual and text search is tried again next time.
+"""
+
+import asyncio
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from ranking import RANK_SORT
+
+logger = logging.getLogger(__name__)
+
+TEXT_INDEX_NAME = "photo_text"
+WEIGHTS = {"title": 10, "tags": 5, "description": 1}
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+# IndexNotFound ("text index required for $text query"), CommandNotSupported, NotImplemented
+_TEXT_UNSUPPORTED_CODES = {27, 115, 238}
+# BadValue, as in "unknown top level operator: $text" from servers without text search
+_BAD_VALUE = 2
+
+
+def _text_unsupported(exc: Exception) -> bool:
+    if isinstance(exc, NotImplementedError):
+        return True
+    if exc.code in _TEXT_UNSUPPORTED_CODES:
+        return True
+    return exc.code == _BAD_VALUE and "$text" in str(exc)
+
+
+class PhotoSearch:
+    def __init__(self, collection, projection: Dict[str, Any]):
+        # `projection` selects the light fields returned for each hit
+        self.collection = collection
+        self.projection = projection
+        self.text_supported = True
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index(
+            [(field, "text") for field in WEIGHTS],
+            weights=WEIGHTS,
+            name=TEXT_INDEX_NAME,
+            default_language="english",
+        )
+
+    async def search(
+        self, text: str, category: Optional[str] = None, skip: int = 0, limit: int = 20
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        # (total matches, one page of hits with a `score` field), best match first
+        if self.text_supported:
+            try:
+                return await self._text_search(text, category, skip, limit)
+            except (OperationFailure, NotImplementedError) as exc:
+                if not _text_unsupported(exc):
+                    raise
+                logger.warning("Text search unavailable (%s); falling back to regex matching", exc)
+                self.text_supported = False
+        return await self._scan_search(text, category, skip, limit)
+
+    async def _text_search(self, text, category, skip, limit):
+        query: Dict[str, Any] = {"$text": {"$search": text}}
+        if category:
+            query["category"] = category
+        score = {"$meta": "textScore"}
+        cursor = (
+            self.collection.find(query, {**self.projection, "score": score})
+            .sort([("score", score), *RANK_SORT])
+            .skip(skip)
+            .limit(limit)
+        )
+        total, hits = await asyncio.gather(self.collection.count_documents(query), cursor.to_list(limit))
+        return total, hits
+
+    async def _scan_search(self, text, category, skip, limit):
+        terms = sorted(set(_TERM.findall(text.lower())))
+        if not terms:
+            return 0, []
+        pattern = "|".join(re.escape(term) for term in terms)
+        query: Dict[str, Any] = {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in WEIGHTS]}
+        if category:
+            query["category"] = category
+        hits = await self.collection.find(query, self.projection).to_list(None)
+        for hit in hits:
+            hit["score"] = _score(hit, terms)
+        hits.sort(key=lambda hit: (-hit["score"], hit.get("order", 0), hit.get("rank", ""), hit.get("id", "")))
+        return len(hits), hits[skip:skip + limit]
+
+
+def _score(doc: Dict[str, Any], terms: List[str]) -> float:
+    score = 0.0
+    for field, weight in WEIGHTS.items():
+        value = doc.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(value)
+        value = value.lower()
+        score += weight * sum(1 for term in terms if term in value)
+    return score
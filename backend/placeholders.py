@@ -0,0 +1,134 @@
+"""Intrinsic size and low-quality placeholder (LQIP) for uploaded photos.
+
+``describe_image`` runs at ingest so gallery listings can reserve the right
+box and paint a blurred preview before the full image arrives. Width and
+height are read from the PNG, JPEG, GIF, WebP or BMP header without decoding
+the image. The placeholder is a tiny JPEG data URI and needs Pillow; without it
+the placeholder is empty. Both are computed only for ``data:`` URIs; photos
+that reference an external URL are left as they are.
+"""
+
+import base64
+import binascii
+import io
+import re
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+    ImageOps = None
+
+# Longest side of the placeholder thumbnail, in pixels
+PLACEHOLDER_SIZE = 16
+
+_DATA_URI = re.compile(r"^data:(?P<mime>[\w.+-]+/[\w.+-]+)(?:;[^,]*?)?;base64,(?P<data>.*)$", re.DOTALL)
+
+# JPEG start-of-frame markers (SOF0-SOF15 minus DHT, JPG and DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def parse_data_uri(value: str) -> Optional[Tuple[str, bytes]]:
+    # (mime type, bytes) for a base64 data URI, None for anything else; ValueError if undecodable
+    match = _DATA_URI.match(value or "")
+    if match is None:
+        return None
+    try:
+        return match.group("mime").lower(), base64.b64decode(match.group("data"), validate=False)
+    except binascii.Error as exc:
+        raise ValueError(f"Invalid base64 image data: {exc}") from exc
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    # (width, height) from the file header, or None for unknown/truncated formats
+    try:
+        if data.startswith(b"\x89PNG\r\n\x1a\n"):
+            return struct.unpack(">II", data[16:24])
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", data[6:10])
+        if data.startswith(b"\xff\xd8"):
+            return _jpeg_size(data)
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _webp_size(data)
+        if data.startswith(b"BM"):
+            width, height = struct.unpack("<ii", data[18:26])
+            return width, abs(height)
+    except struct.error:
+        return None
+    return None
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    position = 2
+    while position + 9 <= len(data):
+        if data[position] != 0xFF:
+            position += 1
+            continue
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte
+            position += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # Standalone markers carry no length
+            position += 2
+            continue
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack(">HH", data[position + 5:position + 9])
+            return width, height
+        (length,) = struct.unpack(">H", data[position + 2:position + 4])
+        position += 2 + length
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        (bits,) = struct.unpack("<I", data[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+def _placeholder(data: bytes) -> Optional[Tuple[str, int, int]]:
+    # (data URI, width, height) with EXIF rotation applied; None without Pillow or for undecodable data
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            width, height = image.size
+            image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=40, optimize=True)
+    except Exception:
+        return None
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"), width, height
+
+
+def describe_image(image_data: str) -> Dict[str, Any]:
+    # Fields stored on the photo document; blocking, so call it off the event loop
+    fields: Dict[str, Any] = {"width": None, "height": None, "placeholder": ""}
+    try:
+        parsed = parse_data_uri(image_data)
+    except ValueError:
+        return fields
+    if parsed is None:
+        return fields
+    mime, data = parsed
+    if mime == "image/svg+xml":
+        return fields
+
+    size = image_size(data)
+    if size is not None:
+        fields["width"], fields["height"] = size
+    preview = _placeholder(data)
+    if preview is not None:
+        fields["placeholder"], fields["width"], fields["height"] = preview
+    return fields
@@ -0,0 +1,217 @@
+"""Fractional rank keys for manually ordered collections (photos, testimonials).
+
+Documents sort by ``(order, rank)``. ``order`` is the integer clients set when
+creating or editing an item; ``rank`` is a base-62 string that orders items
+inside the same ``order`` value. Moving an item computes a key between its new
+neighbours, so a reorder rewrites only the moved document. Keys grow by about
+one character each time the same gap is split; once a key exceeds
+``max_length`` the collection's keys are rewritten evenly spaced in the
+background, preserving the current sequence. Concurrent writers (another
+worker appending or moving at the same moment) can produce equal keys; ``id``
+breaks such ties so the order stays stable until the next rebalance.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# ASCII order, so MongoDB's binary string comparison matches digit order
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+RANK_SORT = [("order", 1), ("rank", 1), ("id", 1)]
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    # A key strictly between `low` and `high` (None = no upper bound); keys never end in "0"
+    if high is not None:
+        shared = 0
+        while shared < len(high) and (low[shared] if shared < len(low) else DIGITS[0]) == high[shared]:
+            shared += 1
+        if shared:
+            return high[:shared] + _midpoint(low[shared:], high[shared:])
+    low_digit = DIGITS.index(low[0]) if low else 0
+    high_digit = DIGITS.index(high[0]) if high is not None else BASE
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    if high is not None and len(high) > 1:
+        return high[:1]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def key_between(low: Optional[str], high: Optional[str]) -> str:
+    if low is not None and high is not None and low >= high:
+        raise ValueError(f"Rank keys out of order: {low!r} >= {high!r}")
+    return _midpoint(low or "", high)
+
+
+def spread_keys(count: int) -> List[str]:
+    # `count` evenly spaced keys, as short as possible
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    step = BASE ** width // (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value, digits = position * step, []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return keys
+
+
+class RankedCollection:
+    def __init__(
+        self,
+        collection,
+        max_length: int = 12,
+        on_rebalance: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.collection = collection
+        self.max_length = max_length
+        self.on_rebalance = on_rebalance
+        self._lock = asyncio.Lock()
+        self._pending: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, collection, on_rebalance: Optional[Callable[[], Awaitable[None]]] = None) -> "RankedCollection":
+        return cls(collection, max_length=int(os.getenv("RANK_MAX_LENGTH", "12")), on_rebalance=on_rebalance)
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index(RANK_SORT)
+        # Documents written before rank keys existed get them once; keyed documents are left alone
+        if await self.collection.find_one({"rank": {"$exists": False}}, {"_id": 1}):
+            await self._assign_missing()
+
+    async def _assign_missing(self) -> None:
+        # Keyless documents go ahead of their bucket's keyed ones, oldest first. The keys are
+        # deterministic and only written where a key is still missing, so workers starting together agree
+        keyless = await self.collection.find(
+            {"rank": {"$exists": False}}, {"_id": 1, "order": 1}
+        ).sort([("order", 1), ("createdAt", 1), ("_id", 1)]).to_list(None)
+        buckets: Dict[Any, List[Dict[str, Any]]] = {}
+        for doc in keyless:
+            buckets.setdefault(doc.get("order", 0), []).append(doc)
+
+        updates = []
+        longest = 0
+        for order, docs in buckets.items():
+            first = await self.collection.find_one(
+                {"order": order, "rank": {"$type": "string"}}, {"_id": 0, "rank": 1}, sort=[("rank", 1)]
+            )
+            if first is None:
+                keys = spread_keys(len(docs))
+            else:
+                keys, high = [], first["rank"]
+                for _ in docs:
+                    high = key_between(None, high)
+                    keys.append(high)
+                keys.reverse()
+            longest = max(longest, *(len(key) for key in keys))
+            updates.extend(
+                UpdateOne({"_id": doc["_id"], "rank": {"$exists": False}}, {"$set": {"rank": key}})
+                for doc, key in zip(docs, keys)
+            )
+        if updates:
+            result = await self.collection.bulk_write(updates, ordered=False)
+            logger.info("Assigned rank keys to %d documents in %s", result.modified_count, self.collection.name)
+            if result.modified_count and self.on_rebalance is not None:
+                await self.on_rebalance()
+        if longest > self.max_length:
+            self.schedule_rebalance()
+
+    async def rank_for_new(self, order: int, exclude: Optional[str] = None) -> str:
+        # Append after the last item with the same `order`
+        query: Dict[str, Any] = {"order": order, "rank": {"$type": "string"}}
+        if exclude is not None:
+            query["id"] = {"$ne": exclude}
+        last = await self.collection.find_one(query, {"_id": 0, "rank": 1}, sort=[("rank", -1)])
+        return key_between(last["rank"] if last else None, None)
+
+    async def move(self, item_id: str, after_id: Optional[str] = None, before_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        # Place the item right after `after_id` (or right before `before_id`); None if it doesn't exist.
+        # Raises LookupError for an unknown neighbour and ValueError for an invalid request.
+        if (after_id is None) == (before_id is None):
+            raise ValueError("Give exactly one of afterId or beforeId")
+        anchor_id = after_id if after_id is not None else before_id
+        if anchor_id == item_id:
+            raise ValueError("An item cannot be moved relative to itself")
+
+        if not await self.collection.find_one({"id": item_id}, {"_id": 1}):
+            return None
+        rebalanced = 0
+        async with self._lock:
+            anchor = await self._position(anchor_id)
+            if anchor is None:
+                raise LookupError(anchor_id)
+            if not isinstance(anchor.get("rank"), str):
+                rebalanced = await self._rebalance()
+                anchor = await self._position(anchor_id)
+
+            # The anchor's actual neighbour inside its order bucket, ignoring the moved item
+            order, rank = anchor["order"], anchor["rank"]
+            query = {"order": order, "id": {"$ne": item_id}, "rank": {"$gt": rank} if after_id else {"$lt": rank}}
+            neighbour = await self.collection.find_one(
+                query, {"_id": 0, "rank": 1}, sort=[("rank", 1 if after_id else -1)]
+            )
+            other = neighbour["rank"] if neighbour else None
+            new_rank = key_between(rank, other) if after_id else key_between(other, rank)
+
+            moved = await self.collection.find_one_and_update(
+                {"id": item_id}, {"$set": {"order": order, "rank": new_rank}}, return_document=True
+            )
+        if rebalanced and self.on_rebalance is not None:
+            await self.on_rebalance()
+        if moved is not None and len(new_rank) > self.max_length:
+            self.schedule_rebalance()
+        return moved
+
+    async def _position(self, item_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": item_id}, {"_id": 0, "order": 1, "rank": 1})
+
+    def schedule_rebalance(self) -> None:
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.create_task(self._rebalance_in_background())
+
+    async def _rebalance_in_background(self) -> None:
+        try:
+            await self.rebalance()
+        except Exception:
+            logger.exception("Rank rebalance of %s failed", self.collection.name)
+
+    async def stop(self) -> None:
+        if self._pending is not None and not self._pending.done():
+            await asyncio.gather(self._pending, return_exceptions=True)
+
+    async def rebalance(self) -> int:
+        # Rewrite every bucket's keys evenly spaced, keeping the current sequence; returns docs changed
+        async with self._lock:
+            changed = await self._rebalance()
+        if changed and self.on_rebalance is not None:
+            await self.on_rebalance()
+        return changed
+
+    async def _rebalance(self) -> int:
+        buckets: Dict[Any, List[Dict[str, Any]]] = {}
+        # Keyless (legacy) documents sort first in their bucket, oldest first
+        cursor = self.collection.find({}, {"_id": 1, "order": 1, "rank": 1}).sort(
+            [("order", 1), ("rank", 1), ("createdAt", 1), ("id", 1)]
+        )
+        async for doc in cursor:
+            buckets.setdefault(doc.get("order", 0), []).append(doc)
+
+        updates = []
+        for docs in buckets.values():
+            for doc, key in zip(docs, spread_keys(len(docs))):
+                if doc.get("rank") != key:
+                    updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"rank": key}}))
+        if updates:
+            await self.collection.bulk_write(updates, ordered=False)
+            logger.info("Rebalanced %d rank keys in %s", len(updates), self.collection.name)
+        return len(updates)
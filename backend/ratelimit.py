@@ -0,0 +1,283 @@
+"""Token-bucket rate limiting and duplicate-submission filtering.
+
+``RateLimiter`` keeps one bucket per client IP and route. A bucket holds up to
+``capacity`` tokens and refills continuously at ``capacity / period`` tokens
+per second; each request takes one, and a request that finds the bucket empty
+is rejected with 429 and a ``Retry-After`` header. Routes opt in through the
+``rate_limit`` dependency and are configured with ``RATE_LIMIT_<ROUTE>``
+("requests/seconds", e.g. ``5/600``). A request may cost more than one token
+(a batch of image prompts takes one per prompt); one that costs more than the
+whole bucket could never succeed and is rejected with 413.
+
+Behind reverse proxies, ``RATE_LIMIT_TRUSTED_PROXIES`` (or
+``RATE_LIMIT_TRUST_PROXY=true`` for one) says how many proxies append to
+``X-Forwarded-For``; the client is the address that many hops from the right.
+Anything further left was sent by the client and can't be trusted.
+
+Buckets live in process memory by default. With several workers, set
+``RATE_LIMIT_BACKEND=mongo`` to keep them in the ``rate_limits`` collection;
+updates are compare-and-set on the previous state, so concurrent workers never
+hand out the same token twice, and idle buckets expire through a TTL index.
+Rejected requests only read their bucket, so a flood costs no writes.
+
+``DuplicateFilter`` rejects a repeated contact form (same email and message,
+ignoring case and whitespace) within ``CONTACT_DUPLICATE_WINDOW_SECONDS``,
+before anything is written to ``contact_inquiries``.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+MEMORY = "memory"
+MONGO = "mongo"
+
+# Compare-and-set retries before a contended Mongo bucket lets the request through
+_MAX_CAS_ATTEMPTS = 5
+
+_SPACE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class Limit:
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit":
+        # "5/600" -> 5 requests per 600 seconds
+        count, _, seconds = value.partition("/")
+        return cls(int(count), float(seconds or 60))
+
+
+DEFAULT_LIMITS = {
+    "contact": Limit(5, 600),
+    "chat": Limit(20, 60),
+    "search": Limit(10, 60),
+    "image": Limit(10, 300),
+    "semantic": Limit(30, 60),
+}
+
+
+def _refill(tokens: float, updated: float, now: float, limit: Limit) -> float:
+    return min(float(limit.capacity), tokens + max(0.0, now - updated) * limit.rate)
+
+
+def _retry_after(tokens: float, cost: float, limit: Limit) -> float:
+    return (cost - tokens) / limit.rate
+
+
+class MemoryBuckets:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float, Limit]] = {}
+
+    async def take(self, key: str, limit: Limit, now: float, cost: float = 1.0) -> Tuple[bool, float]:
+        tokens, updated, _ = self._buckets.get(key, (float(limit.capacity), now, limit))
+        tokens = _refill(tokens, updated, now, limit)
+        if tokens < cost:
+            return False, _retry_after(tokens, cost, limit)
+        if key not in self._buckets and len(self._buckets) >= self.max_keys:
+            self._prune(now)
+        self._buckets[key] = (tokens - cost, now, limit)
+        return True, 0.0
+
+    def _prune(self, now: float) -> None:
+        # Full buckets carry no state worth keeping
+        for key, (tokens, updated, limit) in list(self._buckets.items()):
+            if _refill(tokens, updated, now, limit) >= limit.capacity:
+                del self._buckets[key]
+
+
+class MongoBuckets:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("expiresAt", expireAfterSeconds=0)
+
+    async def take(self, key: str, limit: Limit, now: float, cost: float = 1.0) -> Tuple[bool, float]:
+        expires_at = datetime.fromtimestamp(now + limit.period, timezone.utc)
+        for _ in range(_MAX_CAS_ATTEMPTS):
+            doc = await self.collection.find_one({"_id": key})
+            if doc is None:
+                try:
+                    await self.collection.insert_one(
+                        {"_id": key, "tokens": limit.capacity - cost, "updated": now, "expiresAt": expires_at}
+                    )
+                    return True, 0.0
+                except DuplicateKeyError:
+                    continue
+            tokens = _refill(doc["tokens"], doc["updated"], now, limit)
+            if tokens < cost:
+                return False, _retry_after(tokens, cost, limit)
+            result = await self.collection.update_one(
+                {"_id": key, "tokens": doc["tokens"], "updated": doc["updated"]},
+                {"$set": {"tokens": tokens - cost, "updated": now, "expiresAt": expires_at}},
+            )
+            if result.modified_count:
+                return True, 0.0
+        logger.warning("Rate limit bucket %s is contended; allowing the request", key)
+        return True, 0.0
+
+
+def _trusted_proxies_from_env() -> int:
+    count = os.getenv("RATE_LIMIT_TRUSTED_PROXIES")
+    if count:
+        return int(count)
+    return 1 if os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes") else 0
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        backend,
+        limits: Optional[Dict[str, Limit]] = None,
+        enabled: bool = True,
+        trusted_proxies: int = 0,
+        clock=time.time,
+    ):
+        self.backend = backend
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.enabled = enabled
+        self.trusted_proxies = trusted_proxies
+        self.clock = clock
+        self.rejected: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls, db) -> "RateLimiter":
+        limits = dict(DEFAULT_LIMITS)
+        for route in limits:
+            value = os.getenv(f"RATE_LIMIT_{route.upper()}")
+            if value:
+                limits[route] = Limit.parse(value)
+        kind = os.getenv("RATE_LIMIT_BACKEND", MEMORY).lower()
+        backend = MongoBuckets(db.rate_limits) if kind == MONGO else MemoryBuckets()
+        return cls(
+            backend,
+            limits,
+            enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no"),
+            trusted_proxies=_trusted_proxies_from_env(),
+        )
+
+    async def ensure_indexes(self) -> None:
+        if isinstance(self.backend, MongoBuckets):
+            await self.backend.ensure_indexes()
+
+    def client_ip(self, request: Request) -> str:
+        # Each trusted proxy appends the address it received from, so count hops from the right
+        if self.trusted_proxies:
+            forwarded = request.headers.get("x-forwarded-for")
+            hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()] if forwarded else []
+            if len(hops) >= self.trusted_proxies:
+                return hops[-self.trusted_proxies]
+        return request.client.host if request.client else "unknown"
+
+    async def check(self, request: Request, route: str, cost: float = 1.0) -> None:
+        limit = self.limits.get(route)
+        if not self.enabled or limit is None:
+            return
+        if cost > limit.capacity:
+            # Would never fit, however long the client waits
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+            raise HTTPException(
+                status_code=413, detail=f"Request costs {cost:g} {route} requests; the limit is {limit.capacity}"
+            )
+        key = f"{route}:{self.client_ip(request)}"
+        allowed, retry_after = await self.backend.take(key, limit, self.clock(), cost)
+        if not allowed:
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+
+def rate_limit(route: str):
+    # FastAPI dependency: `dependencies=[Depends(rate_limit("chat"))]`
+    async def dependency(request: Request) -> None:
+        limiter: Optional[RateLimiter] = getattr(request.app.state, "rate_limiter", None)
+        if limiter is not None:
+            await limiter.check(request, route)
+
+    return dependency
+
+
+def submission_fingerprint(email: str, message: str) -> str:
+    normalized = f"{email.strip().lower()}\n{_SPACE.sub(' ', message).strip().lower()}"
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class DuplicateFilter:
+    # Remembers fingerprints for `window` seconds, in memory or in a TTL-indexed collection
+    def __init__(self, window: float = 3600.0, collection=None, max_entries: int = 100_000):
+        self.window = window
+        self.collection = collection
+        self.max_entries = max_entries
+        self._seen: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls, db) -> "DuplicateFilter":
+        shared = os.getenv("RATE_LIMIT_BACKEND", MEMORY).lower() == MONGO
+        return cls(
+            window=float(os.getenv("CONTACT_DUPLICATE_WINDOW_SECONDS", "3600")),
+            collection=db.submission_fingerprints if shared else None,
+        )
+
+    async def ensure_indexes(self) -> None:
+        if self.collection is not None:
+            await self.collection.create_index("expiresAt", expireAfterSeconds=0)
+
+    async def seen(self, fingerprint: str) -> bool:
+        # True when the fingerprint was recorded within the window; records it otherwise
+        if self.window <= 0:
+            return False
+        if self.collection is not None:
+            return await self._seen_shared(fingerprint)
+        now = time.monotonic()
+        async with self._lock:
+            expires = self._seen.get(fingerprint)
+            if expires is not None and expires > now:
+                return True
+            if len(self._seen) >= self.max_entries:
+                self._seen = {key: value for key, value in self._seen.items() if value > now}
+            self._seen[fingerprint] = now + self.window
+            return False
+
+    async def _seen_shared(self, fingerprint: str) -> bool:
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.window)
+        try:
+            await self.collection.insert_one({"_id": fingerprint, "expiresAt": expires_at})
+            return False
+        except DuplicateKeyError:
+            # The TTL monitor runs about once a minute, so an expired entry may still be there
+            result = await self.collection.update_one(
+                {"_id": fingerprint, "expiresAt": {"$lte": now}}, {"$set": {"expiresAt": expires_at}}
+            )
+            return result.modified_count == 0
+
+    async def forget(self, fingerprint: str) -> None:
+        # Undo `seen` when the submission it guarded was not stored after all
+        if self.collection is not None:
+            await self.collection.delete_one({"_id": fingerprint})
+        else:
+            self._seen.pop(fingerprint, None)
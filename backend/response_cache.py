@@ -0,0 +1,146 @@
+"""In-process cache of rendered public responses, stored precompressed.
+
+Entries are grouped by tag (the collection they were read from) and dropped
+together when that collection is written. Each entry keeps its JSON body plus
+one compressed copy per encoding, made the first time a client asks for that
+encoding, so compression is paid once per content change instead of once per
+request. Compression runs in a worker thread, and concurrent requests for the
+same variant share one compression. Bodies larger than ``static_max_bytes``
+(multi-MB galleries of inline images) use the codec's per-request level
+rather than its slow maximum. Cached responses carry ``Content-Encoding``
+themselves and pass through ``CompressionMiddleware`` untouched.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from compression import Codec, available_codecs, negotiate
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, Tuple[Hashable, ...]]
+
+
+class CachedBody:
+    def __init__(
+        self,
+        body: bytes,
+        media_type: str,
+        codecs: Dict[str, Codec],
+        minimum_size: int,
+        static_max_bytes: int = 1024 * 1024,
+    ):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self._codecs = codecs
+        self._compressible = len(body) >= minimum_size
+        self._static = len(body) <= static_max_bytes
+        self._variants: Dict[str, asyncio.Future] = {}
+
+    async def variant(self, encoding: str) -> bytes:
+        # Compressed off the event loop; concurrent requests for the same encoding await one job
+        pending = self._variants.get(encoding)
+        if pending is None:
+            pending = self._variants[encoding] = asyncio.ensure_future(
+                asyncio.to_thread(self._codecs[encoding].compress, self.body, static=self._static)
+            )
+        try:
+            return await asyncio.shield(pending)
+        except Exception:
+            if self._variants.get(encoding) is pending:
+                del self._variants[encoding]
+            raise
+
+    async def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        encoding = negotiate(request.headers.get("accept-encoding"), list(self._codecs)) if self._compressible else None
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(await self.variant(encoding), media_type=self.media_type, headers=headers)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 256,
+        minimum_size: int = 1024,
+        enabled: bool = True,
+        static_max_bytes: int = 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.minimum_size = minimum_size
+        self.static_max_bytes = static_max_bytes
+        self.enabled = enabled
+        self.codecs = available_codecs()
+        self._entries: "OrderedDict[CacheKey, CachedBody]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            max_entries=int(os.getenv("RESPONSE_CACHE_ENTRIES", "256")),
+            minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+            enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+            static_max_bytes=int(os.getenv("RESPONSE_CACHE_STATIC_MAX_BYTES", str(1024 * 1024))),
+        )
+
+    def generation(self, tag: str) -> int:
+        return self._generations.get(tag, 0)
+
+    def get(self, tag: str, *key: Hashable) -> Optional[CachedBody]:
+        entry = self._entries.get((tag, key))
+        if entry is not None:
+            self._entries.move_to_end((tag, key))
+        return entry
+
+    def put(self, tag: str, key: Tuple[Hashable, ...], body: bytes, generation: int,
+            media_type: str = "application/json") -> CachedBody:
+        entry = CachedBody(body, media_type, self.codecs, self.minimum_size, self.static_max_bytes)
+        # A write that landed while the body was being built makes it stale; serve it once, don't keep it
+        if self.enabled and generation == self.generation(tag):
+            self._entries[(tag, key)] = entry
+            self._entries.move_to_end((tag, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            self._generations[tag] = self.generation(tag) + 1
+            for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == tag]:
+                del self._entries[cache_key]
+        logger.debug("Response cache invalidated: %s", ", ".join(tags))
+
+    def clear(self) -> None:
+        self.invalidate(*{tag for tag, _ in self._entries})
+
+    async def respond(
+        self, request: Request, tag: str, build: Callable[[], Awaitable[bytes]], *key: Hashable
+    ) -> Response:
+        if not self.enabled:
+            # Let CompressionMiddleware handle it per request
+            return Response(await build(), media_type="application/json")
+        entry = self.get(tag, *key)
+        if entry is None:
+            self.misses += 1
+            generation = self.generation(tag)
+            entry = self.put(tag, key, await build(), generation)
+        else:
+            self.hits += 1
+        return await entry.response(request)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
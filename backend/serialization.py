@@ -0,0 +1,56 @@
+"""Fast JSON read path for documents loaded from MongoDB.
+
+Documents in the portfolio collections are written by this API, so they already
+match their models. Read endpoints project exactly the model's fields, fill in
+defaults the way ``model_construct`` would (no validation, no model instances)
+and return a ``FastJSONResponse``. Returning a response object directly also
+skips FastAPI's second ``response_model`` validation pass; the decorator's
+``response_model`` still documents the shape in OpenAPI.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def dumps(content: Any) -> bytes:
+    # Datetimes are encoded natively; aware UTC values end in "Z" like Pydantic's encoder
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ModelReader:
+    # Turns trusted documents into response-ready dicts for one model
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        # Inclusion projection: Mongo's _id and any stray keys never leave the database
+        self.projection: Dict[str, int] = {"_id": 0, **{name: 1 for name in self.fields}}
+        self._defaults: Dict[str, Any] = {}
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        for name, field in model.model_fields.items():
+            if field.default_factory is not None:
+                self._factories[name] = field.default_factory
+            elif not field.is_required():
+                self._defaults[name] = field.default
+
+    def read(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        if len(doc) == len(self.fields):
+            return doc
+        # Older documents may predate fields that were added with defaults
+        for name, value in self._defaults.items():
+            doc.setdefault(name, value)
+        for name, factory in self._factories.items():
+            if name not in doc:
+                doc[name] = factory()
+        return doc
+
+    def read_all(self, docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.read(doc) for doc in docs]
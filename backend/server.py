@@ -1,20 +1,48 @@
 """FastAPI server exposing AI agent endpoints."""
 
+import asyncio
+import dataclasses
+import importlib
+import json
 import logging
 import os
+import signal
+import threading
+import time
 import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from starlette.middleware.cors import CORSMiddleware
 
-from ai_agents.agents import AgentConfig, ChatAgent, SearchAgent
+from ai_agents.lifecycle import agent_work
+from ai_agents.sessions import MongoSessionStore, SessionManager
+from captions import CaptionPipeline
+from compression import CompressionMiddleware
+from embeddings import EmbeddingIndex
+from images import ImageService
+from inquiries import STATUSES as INQUIRY_STATUSES, InquiryInbox
+from invalidation import ContentWatcher
+from jobs import JobQueue
+from metrics import metrics
+from mongo import MongoSettings, client_options, public_database
+from outbox import NotificationOutbox
+from photo_search import PhotoSearch
+from placeholders import describe_image
+from ranking import RANK_SORT, RankedCollection
+from ratelimit import DEFAULT_LIMITS, DuplicateFilter, RateLimiter, rate_limit, submission_fingerprint
+from response_cache import ResponseCache
+from serialization import FastJSONResponse, ModelReader, dumps
+from snapshots import SECTIONS as SNAPSHOT_SECTIONS, SnapshotBuilder
+from status_checks import StatusStore
+from write_buffer import BufferClosed, BufferFull, WriteBehindBuffer
 
 
 logging.basicConfig(
@@ -36,10 +64,27 @@ class StatusCheckCreate(BaseModel):
     client_name: str
 
 
+class StatusClient(BaseModel):
+    client_name: str
+    count: int = 0
+    firstSeen: Optional[datetime] = None
+    lastSeen: Optional[datetime] = None
+    lastCheckId: Optional[str] = None
+
+
+class StatusSummary(BaseModel):
+    clientCount: int
+    totalChecks: int
+    retentionSeconds: Optional[float] = None
+    capped: bool = False
+    clients: List[StatusClient]
+
+
 class ChatRequest(BaseModel):
     message: str
     agent_type: str = "chat"
     context: Optional[dict] = None
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -49,6 +94,14 @@ class ChatResponse(BaseModel):
     capabilities: List[str]
     metadata: dict = Field(default_factory=dict)
     error: Optional[str] = None
+    session_id: Optional[str] = None
+
+
+class ChatSession(BaseModel):
+    id: str
+    messages: List[Dict[str, str]] = Field(default_factory=list)
+    summary: str = ""
+    updatedAt: datetime
 
 
 class SearchRequest(BaseModel):
@@ -65,6 +118,47 @@ class SearchResponse(BaseModel):
     error: Optional[str] = None
 
 
+MAX_JOB_ATTEMPTS = 10
+
+
+class JobCreate(BaseModel):
+    kind: str  # chat, search, image
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    maxAttempts: Optional[int] = Field(None, ge=1, le=MAX_JOB_ATTEMPTS)
+
+
+class ChatJobPayload(BaseModel):
+    message: str = Field(..., min_length=1)
+    agent_type: Literal["chat", "search"] = "chat"
+
+
+class SearchJobPayload(BaseModel):
+    query: str = Field(..., min_length=1)
+
+
+class ImageJobPayload(BaseModel):
+    prompt: str = Field(..., min_length=1)
+
+
+# Kinds accepted from POST /api/jobs; "captions" is only enqueued by the server itself
+PUBLIC_JOB_PAYLOADS = {"chat": ChatJobPayload, "search": SearchJobPayload, "image": ImageJobPayload}
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    status: str  # queued, running, succeeded, failed, cancelled
+    attempts: int = 0
+    maxAttempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+
+
 # Photography Models
 class Photo(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -72,8 +166,15 @@ class Photo(BaseModel):
     category: str  # portrait, wedding, landscape, commercial
     imageData: str  # base64 encoded
     description: str = ""
+    tags: List[str] = Field(default_factory=list)
     featured: bool = False
     order: int = 0
+    rank: str = ""  # position within `order`, see ranking.py
+    # Intrinsic size and tiny blurred preview, computed at ingest (see placeholders.py)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: str = ""
+    altText: str = ""
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -82,6 +183,7 @@ class PhotoCreate(BaseModel):
     category: str
     imageData: str
     description: str = ""
+    tags: List[str] = Field(default_factory=list)
     featured: bool = False
     order: int = 0
 
@@ -91,10 +193,54 @@ class PhotoUpdate(BaseModel):
     category: Optional[str] = None
     imageData: Optional[str] = None
     description: Optional[str] = None
+    tags: Optional[List[str]] = None
     featured: Optional[bool] = None
     order: Optional[int] = None
 
 
+class PhotoSummary(BaseModel):
+    # Photo without imageData, as returned by search
+    id: str
+    title: str
+    category: str
+    description: str = ""
+    tags: List[str] = Field(default_factory=list)
+    featured: bool = False
+    order: int = 0
+    rank: str = ""
+    width: Optional[int] = None
+    height: Optional[int] = None
+    placeholder: str = ""
+    score: float = 0.0
+
+
+class PhotoSearchResponse(BaseModel):
+    query: str
+    total: int
+    page: int
+    limit: int
+    results: List[PhotoSummary]
+
+
+class MoveRequest(BaseModel):
+    # Exactly one: place the item right after or right before this neighbour
+    afterId: Optional[str] = None
+    beforeId: Optional[str] = None
+
+
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+    featured: int
+
+
+class PhotoFacets(BaseModel):
+    total: int
+    featured: int
+    categories: List[CategoryFacet]
+    featuredIds: List[str]
+
+
 # Testimonial Models
 class Testimonial(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -102,6 +248,7 @@ class Testimonial(BaseModel):
     testimonialText: str
     rating: int  # 1-5
     order: int = 0
+    rank: str = ""  # position within `order`, see ranking.py
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
@@ -121,6 +268,9 @@ class ContactInquiry(BaseModel):
     message: str
     submittedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     status: str = "new"  # new, contacted, closed
+    updatedAt: Optional[datetime] = None
+    # Increases on every write; clients pass the highest one they have as `since`
+    version: int = 0
 
 
 class ContactInquiryCreate(BaseModel):
@@ -130,6 +280,17 @@ class ContactInquiryCreate(BaseModel):
     message: str
 
 
+class InquiryStatusUpdate(BaseModel):
+    status: str
+
+
+class NotificationStats(BaseModel):
+    sink: Optional[str] = None
+    transactions: Optional[bool] = None
+    counts: Dict[str, int]
+    lastError: Optional[Dict[str, Any]] = None
+
+
 # About Models
 class AboutContent(BaseModel):
     id: str = "about"
@@ -147,6 +308,88 @@ class AboutContentUpdate(BaseModel):
     portraitImage: Optional[str] = None
 
 
+# Image Generation Models
+class ImageGenerateRequest(BaseModel):
+    prompt: str
+    use_cache: bool = True
+    # Optionally save the generated image straight into the photos collection
+    store: bool = False
+    title: Optional[str] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+    featured: bool = False
+    order: int = 0
+
+
+class ImageGenerateResponse(BaseModel):
+    success: bool
+    prompt: str
+    image_url: str = ""
+    description: str = ""
+    source: str = ""
+    cached: bool = False
+    photo: Optional[Photo] = None
+    error: Optional[str] = None
+
+
+# A batch spends one image token per prompt, so it can't be larger than the default image bucket
+MAX_IMAGE_BATCH = DEFAULT_LIMITS["image"].capacity
+
+
+class ImageBatchRequest(BaseModel):
+    items: List[ImageGenerateRequest] = Field(..., max_length=MAX_IMAGE_BATCH)
+    concurrency: int = 4
+
+
+class ImageBatchResponse(BaseModel):
+    results: List[ImageGenerateResponse]
+    succeeded: int
+    failed: int
+
+
+# Caption Models
+class CaptionRunRequest(BaseModel):
+    # Re-caption every photo, ignoring cached results
+    force: bool = False
+    limit: Optional[int] = Field(default=None, ge=1)
+
+
+class CaptionRun(BaseModel):
+    id: str
+    status: str
+    force: bool
+    lastId: Optional[str] = None
+    captioned: int
+    cached: int
+    skipped: int
+    failed: int
+    createdAt: datetime
+    updatedAt: datetime
+    finishedAt: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+# Snapshot Models
+class SnapshotRequest(BaseModel):
+    # Re-render every section instead of only the ones changed since the last build
+    full: bool = False
+
+
+class SnapshotSummary(BaseModel):
+    version: str
+    createdAt: datetime
+    routes: Dict[str, str]
+
+
+# Read paths for trusted documents (see serialization.py)
+status_reader = ModelReader(StatusCheck)
+photo_reader = ModelReader(Photo)
+photo_summary_reader = ModelReader(PhotoSummary)
+testimonial_reader = ModelReader(Testimonial)
+inquiry_reader = ModelReader(ContactInquiry)
+about_reader = ModelReader(AboutContent)
+
+
 def _ensure_db(request: Request):
     try:
         return request.app.state.db
@@ -154,29 +397,175 @@ def _ensure_db(request: Request):
         raise HTTPException(status_code=503, detail="Database not ready") from exc
 
 
-def _get_agent_cache(request: Request) -> Dict[str, object]:
-    if not hasattr(request.app.state, "agent_cache"):
-        request.app.state.agent_cache = {}
-    return request.app.state.agent_cache
+def _public_db(request: Request):
+    # Uncached public reads may be served from secondaries (MONGO_PUBLIC_READ_PREFERENCE). Anything that builds a
+    # response cache entry reads the primary: the cache is rebuilt right after a write and then kept until the
+    # next one, so an entry built from a lagging secondary would keep serving the old content
+    _ensure_db(request)
+    return request.app.state.public_db
+
+
+async def _content_changed(request: Request, *collections: str) -> None:
+    await _publish_change(request.app, *collections)
+
+
+async def _publish_change(app: FastAPI, *collections: str) -> None:
+    # Drop this worker's cached responses now; other workers hear it from the content watcher
+    app.state.response_cache.invalidate(*collections)
+    if "photos" in collections:
+        app.state.embeddings.mark_dirty()
+    if app.state.snapshots is not None:
+        app.state.snapshots.mark_dirty(*collections)
+    for collection in collections:
+        await app.state.content_watcher.bump(collection)
 
 
 async def _get_or_create_agent(request: Request, agent_type: str):
-    cache = _get_agent_cache(request)
+    return _agent_from_state(request.app, agent_type)
+
+
+def _agent_from_state(app: FastAPI, agent_type: str):
+    if not hasattr(app.state, "agent_cache"):
+        app.state.agent_cache = {}
+    if not agent_work.accepting:
+        raise HTTPException(status_code=503, detail="Server is shutting down", headers={"Retry-After": "5"})
+    cache = app.state.agent_cache
     if agent_type in cache:
         return cache[agent_type]
 
-    config: AgentConfig = request.app.state.agent_config
+    # LangChain/LangGraph/MCP are imported on first agent use, not at server start
+    from ai_agents.agents import AgentConfig, CaptionAgent, ChatAgent, ImageAgent, SearchAgent
+
+    if getattr(app.state, "agent_config", None) is None:
+        app.state.agent_config = AgentConfig()
+    config = app.state.agent_config
 
     if agent_type == "search":
         cache[agent_type] = SearchAgent(config)
     elif agent_type == "chat":
         cache[agent_type] = ChatAgent(config)
+    elif agent_type == "image":
+        cache[agent_type] = ImageAgent(config)
+    elif agent_type == "caption":
+        # Captioning needs a vision-capable model, which may differ from the chat model
+        vision_model = os.getenv("CAPTION_MODEL_NAME") or config.model_name
+        cache[agent_type] = CaptionAgent(dataclasses.replace(config, model_name=vision_model))
     else:
         raise HTTPException(status_code=400, detail=f"Unknown agent type '{agent_type}'")
 
     return cache[agent_type]
 
 
+def _job_handlers(app: FastAPI):
+    # Job kinds map onto the same agents the synchronous endpoints use
+
+    async def run_chat(payload: Dict[str, Any]) -> Dict[str, Any]:
+        agent = _agent_from_state(app, payload.get("agent_type", "chat"))
+        response = await agent.execute(payload["message"])
+        if not response.success:
+            raise RuntimeError(response.error or "Agent execution failed")
+        return response.model_dump()
+
+    async def run_search(payload: Dict[str, Any]) -> Dict[str, Any]:
+        agent = _agent_from_state(app, "search")
+        response = await agent.execute(
+            f"Search for information about: {payload['query']}. "
+            "Provide a comprehensive summary with key findings.",
+            use_tools=True,
+        )
+        if not response.success:
+            raise RuntimeError(response.error or "Search failed")
+        return response.model_dump()
+
+    async def run_image(payload: Dict[str, Any]) -> Dict[str, Any]:
+        result, cached = await app.state.images.generate(payload["prompt"])
+        if not result["success"]:
+            raise RuntimeError(result["description"])
+        return {**result, "cached": cached}
+
+    async def run_captions(payload: Dict[str, Any]) -> Dict[str, Any]:
+        # A retried job resumes its run from the last checkpoint
+        return await app.state.captions.run(
+            run_id=payload["runId"], force=payload.get("force", False), limit=payload.get("limit")
+        )
+
+    return {"chat": run_chat, "search": run_search, "image": run_image, "captions": run_captions}
+
+
+def _embeddings_changed(app: FastAPI, collection: str) -> None:
+    # Another worker wrote photos
+    if collection == "photos":
+        app.state.embeddings.mark_dirty()
+
+
+async def _drain(app: FastAPI, seconds: float) -> Dict[str, Any]:
+    # Stop intake, let agent calls, jobs and buffered writes finish within one deadline, then close pools
+    deadline = time.monotonic() + seconds
+
+    def remaining() -> float:
+        return max(0.0, deadline - time.monotonic())
+
+    app.state.inbox.close()
+    agents, jobs_cancelled = await asyncio.gather(
+        agent_work.drain(remaining()), app.state.jobs.stop(timeout=remaining())
+    )
+    report: Dict[str, Any] = {"agent_calls": agents, "jobs_cancelled": jobs_cancelled, "status_checks_dropped": 0}
+    if app.state.status_buffer is not None:
+        report["status_checks_dropped"] = await app.state.status_buffer.close(timeout=remaining())
+    await app.state.outbox.stop(timeout=remaining())
+    for agent in list(getattr(app.state, "agent_cache", {}).values()):
+        try:
+            await agent.aclose()
+        except Exception:
+            logger.exception("Closing %s failed", type(agent).__name__)
+    app.state.agent_cache = {}
+
+    dropped = sum(agents["cancelled"].values()) + jobs_cancelled + report["status_checks_dropped"]
+    report["clean"] = dropped == 0
+    if dropped:
+        logger.warning("Shutdown drain dropped work: %s", report)
+    else:
+        logger.info("Shutdown drain finished in %.1fs", seconds - remaining())
+    return report
+
+
+def _start_drain(app: FastAPI) -> "asyncio.Task[Dict[str, Any]]":
+    # One drain per lifespan, whether the signal or lifespan shutdown starts it
+    if app.state.drain_task is None:
+        seconds = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+        app.state.drain_task = asyncio.create_task(_drain(app, seconds))
+    return app.state.drain_task
+
+
+def _drain_on_signal(app: FastAPI) -> Callable[[], None]:
+    # Uvicorn only runs lifespan shutdown once every open request and stream has ended, so the drain starts on
+    # SIGTERM/SIGINT instead: streams and long-polls return, new agent work gets 503, and running agent calls get
+    # their deadline while uvicorn waits for connections. Chains to the handler already installed (uvicorn's);
+    # returns a function that puts it back
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    loop = asyncio.get_running_loop()
+    previous: Dict[int, Any] = {}
+
+    def handle(sig: int, frame) -> None:
+        loop.call_soon_threadsafe(_start_drain, app)
+        handler = previous[sig]
+        if callable(handler):
+            handler(sig, frame)
+        elif handler == signal.SIG_DFL:
+            signal.signal(sig, handler)
+            signal.raise_signal(sig)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous[sig] = signal.signal(sig, handle)
+
+    def restore() -> None:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+    return restore
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     load_dotenv(ROOT_DIR / ".env")
@@ -188,15 +577,89 @@ async def lifespan(app: FastAPI):
         missing = [name for name, value in {"MONGO_URL": mongo_url, "DB_NAME": db_name}.items() if not value]
         raise RuntimeError(f"Missing required environment variables: {', '.join(missing)}")
 
-    client = AsyncIOMotorClient(mongo_url)
+    mongo_settings = MongoSettings.from_env()
+    client = AsyncIOMotorClient(mongo_url, **client_options(mongo_settings))
 
     try:
         app.state.mongo_client = client
         app.state.db = client[db_name]
-        app.state.agent_config = AgentConfig()
+        app.state.public_db = public_database(app.state.db, mongo_settings)
+        app.state.agent_config = None
         app.state.agent_cache = {}
+        app.state.response_cache = ResponseCache.from_env()
+        app.state.content_watcher = ContentWatcher.from_env(app.state.db)
+        app.state.content_watcher.subscribe(app.state.response_cache.invalidate)
+        app.state.embeddings = EmbeddingIndex.from_env(app.state.db)
+        await app.state.embeddings.ensure_indexes()
+        app.state.content_watcher.subscribe(lambda collection: _embeddings_changed(app, collection))
+        await app.state.content_watcher.start()
+        # Built right after content writes, so from the primary: a lagging secondary would publish the old content
+        app.state.snapshots = SnapshotBuilder.from_env(lambda section: _load_public_content(app.state.db, section))
+        app.state.photo_ranks = RankedCollection.from_env(
+            app.state.db.photos, on_rebalance=lambda: _publish_change(app, "photos")
+        )
+        await app.state.photo_ranks.ensure_indexes()
+        app.state.testimonial_ranks = RankedCollection.from_env(
+            app.state.db.testimonials, on_rebalance=lambda: _publish_change(app, "testimonials")
+        )
+        await app.state.testimonial_ranks.ensure_indexes()
+        app.state.photo_search = PhotoSearch(app.state.public_db.photos, photo_summary_reader.projection)
+        await app.state.photo_search.ensure_indexes()
+        app.state.status_store = StatusStore.from_env(app.state.db)
+        await app.state.status_store.ensure_indexes()
+        app.state.status_buffer = None
+        if os.getenv("STATUS_BUFFER_ENABLED", "true").lower() not in ("0", "false", "no"):
+            # Heartbeats are batched into insert_many calls instead of one insert per request
+            app.state.status_buffer = WriteBehindBuffer.from_env(
+                "status_buffer", app.state.status_store.record_many, "STATUS_BUFFER"
+            )
+            await app.state.status_buffer.start()
+        app.state.sessions = SessionManager.from_env(app.state.db)
+        if isinstance(app.state.sessions.store, MongoSessionStore):
+            await app.state.sessions.store.ensure_indexes()
+        app.state.images = ImageService.from_env(lambda: _agent_from_state(app, "image"), app.state.db)
+        await app.state.images.ensure_indexes()
+        if os.getenv("AI_AGENTS_PRELOAD", "false").lower() in ("1", "true", "yes"):
+            # Import the agent stack off the event loop so the first AI request doesn't pay for it
+            asyncio.create_task(asyncio.to_thread(importlib.import_module, "ai_agents.agents"))
+        if os.getenv("IMAGE_AGENT_PREWARM", "false").lower() in ("1", "true", "yes"):
+            asyncio.create_task(app.state.images.warm())
+        app.state.captions = CaptionPipeline.from_env(
+            app.state.db, lambda: _agent_from_state(app, "caption"), on_change=lambda: _publish_change(app, "photos")
+        )
+        await app.state.captions.ensure_indexes()
+        app.state.rate_limiter = RateLimiter.from_env(app.state.db)
+        await app.state.rate_limiter.ensure_indexes()
+        app.state.duplicate_filter = DuplicateFilter.from_env(app.state.db)
+        await app.state.duplicate_filter.ensure_indexes()
+        app.state.inbox = InquiryInbox(
+            app.state.db,
+            inquiry_reader.projection,
+            poll_interval=float(os.getenv("INQUIRY_POLL_INTERVAL", "2.0")),
+            lease=float(os.getenv("INQUIRY_WRITE_LEASE_SECONDS", "30")),
+        )
+        await app.state.inbox.ensure_indexes()
+        app.state.outbox = NotificationOutbox.from_env(app.state.db)
+        await app.state.outbox.ensure_indexes()
+        await app.state.outbox.start()
+        app.state.jobs = JobQueue.from_env(app.state.db.jobs, _job_handlers(app))
+        await app.state.jobs.ensure_indexes()
+        await app.state.jobs.start()
+        agent_work.open()
+        app.state.drain_task = None
+        restore_signals = _drain_on_signal(app)
         logger.info("AI Agents API starting up")
-        yield
+        try:
+            yield
+        finally:
+            restore_signals()
+        app.state.shutdown_report = await _start_drain(app)
+        await app.state.photo_ranks.stop()
+        await app.state.testimonial_ranks.stop()
+        await app.state.content_watcher.stop()
+        await app.state.embeddings.stop()
+        if app.state.snapshots is not None:
+            await app.state.snapshots.stop()
     finally:
         client.close()
         logger.info("AI Agents API shutdown complete")
@@ -218,24 +681,78 @@ async def root():
 
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate, request: Request):
-    db = _ensure_db(request)
+    _ensure_db(request)
     status_obj = StatusCheck(**input.model_dump())
-    await db.status_checks.insert_one(status_obj.model_dump())
+    buffer: Optional[WriteBehindBuffer] = request.app.state.status_buffer
+    if buffer is None:
+        await request.app.state.status_store.record(status_obj.model_dump())
+        return status_obj
+    try:
+        await buffer.put(status_obj.model_dump())
+    except BufferFull as exc:
+        raise HTTPException(
+            status_code=503, detail="Status writes are backed up", headers={"Retry-After": str(int(exc.retry_after))}
+        )
+    except BufferClosed:
+        raise HTTPException(status_code=503, detail="Server is shutting down")
     return status_obj
 
 
+async def _flush_status_buffer(request: Request) -> None:
+    # Reads include checks this worker accepted but hasn't written yet
+    if request.app.state.status_buffer is not None:
+        await request.app.state.status_buffer.flush_pending()
+
+
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks(request: Request):
-    db = _ensure_db(request)
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+async def get_status_checks(
+    request: Request,
+    client_name: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+):
+    # Newest first; older checks expire (or roll off a capped collection), see /status/summary for totals
+    _ensure_db(request)
+    await _flush_status_buffer(request)
+    status_checks = await request.app.state.status_store.recent(status_reader.projection, client_name, limit)
+    return FastJSONResponse(status_reader.read_all(status_checks))
+
+
+@api_router.get("/status/summary", response_model=StatusSummary)
+async def get_status_summary(request: Request):
+    _ensure_db(request)
+    await _flush_status_buffer(request)
+    return StatusSummary(**await request.app.state.status_store.summary())
+
+
+@api_router.get("/metrics")
+async def get_metrics():
+    # Per-process counters, histograms (batch sizes, flush latency) and gauges
+    return metrics.snapshot()
 
 
-@api_router.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(chat_request: ChatRequest, request: Request):
+@api_router.post("/chat", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat"))])
+async def chat_with_agent(chat_request: ChatRequest, request: Request, background_tasks: BackgroundTasks):
     try:
         agent = await _get_or_create_agent(request, chat_request.agent_type)
-        response = await agent.execute(chat_request.message)
+        sessions: SessionManager = request.app.state.sessions
+        session_id = chat_request.session_id
+
+        history = []
+        if chat_request.context:
+            history.append({
+                "role": "system",
+                "content": f"Additional context: {json.dumps(chat_request.context, default=str)}",
+            })
+        if session_id:
+            history.extend(await sessions.history(session_id))
+
+        response = await agent.execute(chat_request.message, history=history)
+
+        if session_id and response.success:
+            needs_compaction = await sessions.record_turn(session_id, chat_request.message, response.content)
+            if needs_compaction:
+                # Summarize after the response is sent so the turn's latency is unaffected
+                background_tasks.add_task(sessions.compact, session_id, agent.summarize_history)
 
         return ChatResponse(
             success=response.success,
@@ -244,6 +761,7 @@ async def chat_with_agent(chat_request: ChatRequest, request: Request):
             capabilities=agent.get_capabilities(),
             metadata=response.metadata,
             error=response.error,
+            session_id=session_id,
         )
     except HTTPException:
         raise
@@ -255,10 +773,26 @@ async def chat_with_agent(chat_request: ChatRequest, request: Request):
             agent_type=chat_request.agent_type,
             capabilities=[],
             error=str(exc),
+            session_id=chat_request.session_id,
         )
 
 
-@api_router.post("/search", response_model=SearchResponse)
+@api_router.get("/sessions/{session_id}", response_model=ChatSession)
+async def get_chat_session(session_id: str, request: Request):
+    session = await request.app.state.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return ChatSession(**session.to_document())
+
+
+@api_router.delete("/sessions/{session_id}")
+async def delete_chat_session(session_id: str, request: Request):
+    if not await request.app.state.sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"success": True, "message": "Session deleted"}
+
+
+@api_router.post("/search", response_model=SearchResponse, dependencies=[Depends(rate_limit("search"))])
 async def search_and_summarize(search_request: SearchRequest, request: Request):
     try:
         search_agent = await _get_or_create_agent(request, "search")
@@ -318,20 +852,308 @@ async def get_agent_capabilities(request: Request):
         return {"success": False, "error": str(exc)}
 
 
+@api_router.get("/agents/upstreams")
+async def get_upstream_health():
+    from ai_agents.resilience import upstreams
+
+    return {"success": True, "upstreams": upstreams.snapshot()}
+
+
+@api_router.post("/jobs", response_model=Job, status_code=202)
+async def create_job(job_request: JobCreate, request: Request):
+    payload_model = PUBLIC_JOB_PAYLOADS.get(job_request.kind)
+    if payload_model is None:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{job_request.kind}'")
+    try:
+        payload = payload_model.model_validate(job_request.payload).model_dump()
+    except ValidationError as exc:
+        # Rejected here rather than failing as a KeyError on every retry
+        problems = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+        raise HTTPException(status_code=400, detail=f"Invalid {job_request.kind} job payload: {problems}") from exc
+    # A queued job runs the same agent call as the synchronous route, so it spends from the same bucket
+    await request.app.state.rate_limiter.check(request, job_request.kind)
+    job = await request.app.state.jobs.enqueue(job_request.kind, payload, job_request.maxAttempts)
+    return Job(**job)
+
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, request: Request):
+    job = await request.app.state.jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return Job(**job)
+
+
+@api_router.post("/jobs/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str, request: Request):
+    job = await request.app.state.jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return Job(**job)
+
+
+# Image Generation Endpoints
+async def _image_response(
+    request: Request, item: ImageGenerateRequest, result: Optional[Dict[str, Any]], cached: bool, error: Optional[str] = None
+) -> ImageGenerateResponse:
+    if result is None:
+        return ImageGenerateResponse(success=False, prompt=item.prompt, error=error)
+
+    response = ImageGenerateResponse(
+        success=result["success"],
+        prompt=item.prompt,
+        image_url=result["image_url"],
+        description=result["description"],
+        source=result["source"],
+        cached=cached,
+        error=None if result["success"] else result["description"],
+    )
+    if item.store and response.success:
+        response.photo = await _insert_photo(request, PhotoCreate(
+            title=item.title or item.prompt[:80],
+            category=item.category,
+            imageData=response.image_url,
+            description=item.description if item.description is not None else response.description,
+            featured=item.featured,
+            order=item.order,
+        ))
+    return response
+
+
+def _validate_image_request(item: ImageGenerateRequest) -> None:
+    if not item.prompt.strip():
+        raise HTTPException(status_code=400, detail="Prompt must not be empty")
+    if item.store and not item.category:
+        raise HTTPException(status_code=400, detail="A category is required to store the image as a photo")
+
+
+@api_router.post("/images/generate", response_model=ImageGenerateResponse, dependencies=[Depends(rate_limit("image"))])
+async def generate_image(image_request: ImageGenerateRequest, request: Request):
+    _ensure_db(request)
+    _validate_image_request(image_request)
+    try:
+        result, cached = await request.app.state.images.generate(
+            image_request.prompt, use_cache=image_request.use_cache
+        )
+    except Exception as exc:  # pragma: no cover - defensive
+        logger.exception("Error in image generation endpoint")
+        return ImageGenerateResponse(success=False, prompt=image_request.prompt, error=str(exc))
+    return await _image_response(request, image_request, result, cached)
+
+
+@api_router.post("/images/generate/batch", response_model=ImageBatchResponse)
+async def generate_images_batch(batch_request: ImageBatchRequest, request: Request):
+    _ensure_db(request)
+    for item in batch_request.items:
+        _validate_image_request(item)
+    # One token per prompt
+    await request.app.state.rate_limiter.check(request, "image", cost=len(batch_request.items))
+
+    max_concurrency = int(os.getenv("IMAGE_BATCH_MAX_CONCURRENCY", "8"))
+    concurrency = max(1, min(batch_request.concurrency, max_concurrency))
+    outcomes = await request.app.state.images.generate_many(
+        [(item.prompt, item.use_cache) for item in batch_request.items], concurrency
+    )
+
+    results = [
+        await _image_response(request, item, result, cached, error)
+        for item, (result, cached, error) in zip(batch_request.items, outcomes)
+    ]
+    succeeded = sum(1 for result in results if result.success)
+    return ImageBatchResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+
+async def _load_public_content(db, section: str) -> Any:
+    # Response content of the public read endpoints, shared with snapshot export
+    if section == "photos":
+        photos = await db.photos.find({}, photo_reader.projection).sort(RANK_SORT).to_list(None)
+        return photo_reader.read_all(photos)
+    if section == "testimonials":
+        testimonials = await db.testimonials.find({}, testimonial_reader.projection).sort(RANK_SORT).to_list(None)
+        return testimonial_reader.read_all(testimonials)
+
+    about = await db.about.find_one({"id": "about"}, about_reader.projection)
+    if not about:
+        # Return default content if none exists
+        return AboutContent(
+            bioText="Professional photographer capturing moments that matter.",
+            photographerName="Your Name",
+            tagline="Capturing Life's Beautiful Moments",
+            portraitImage=""
+        ).model_dump()
+    return about_reader.read(about)
+
+
+# Snapshot Endpoints
+def _snapshot_builder(request: Request) -> SnapshotBuilder:
+    builder = request.app.state.snapshots
+    if builder is None:
+        raise HTTPException(status_code=503, detail="Snapshot export is not configured (set SNAPSHOT_DIR)")
+    return builder
+
+
+@api_router.post("/admin/snapshots", response_model=SnapshotSummary)
+async def build_snapshot(snapshot_request: SnapshotRequest, request: Request):
+    _ensure_db(request)
+    builder = _snapshot_builder(request)
+    manifest = await builder.build(sections=SNAPSHOT_SECTIONS if snapshot_request.full else None)
+    return SnapshotSummary(**manifest)
+
+
+@api_router.get("/admin/snapshots/latest", response_model=SnapshotSummary)
+async def get_latest_snapshot(request: Request):
+    manifest = await asyncio.to_thread(_snapshot_builder(request).latest)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="No snapshot has been built yet")
+    return SnapshotSummary(**manifest)
+
+
 # Photography Endpoints
+# One pass over the collection for the gallery filters: per-category counts, featured ids and totals
+PHOTO_FACETS_PIPELINE = [
+    {"$facet": {
+        "categories": [
+            {"$group": {
+                "_id": "$category",
+                "count": {"$sum": 1},
+                "featured": {"$sum": {"$cond": ["$featured", 1, 0]}},
+            }},
+            {"$sort": {"count": -1, "_id": 1}},
+        ],
+        "featured": [
+            {"$match": {"featured": True}},
+            {"$sort": dict(RANK_SORT)},
+            {"$project": {"_id": 0, "id": 1}},
+        ],
+        "totals": [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "featured": {"$sum": {"$cond": ["$featured", 1, 0]}},
+            }},
+        ],
+    }},
+]
+
+
+@api_router.get("/photos/facets", response_model=PhotoFacets)
+async def get_photo_facets(request: Request):
+    db = _ensure_db(request)
+
+    async def build() -> bytes:
+        result = await db.photos.aggregate(PHOTO_FACETS_PIPELINE).to_list(1)
+        facets = result[0] if result else {}
+        totals = (facets.get("totals") or [{}])[0]
+        return dumps({
+            "total": totals.get("total", 0),
+            "featured": totals.get("featured", 0),
+            "categories": [
+                {"category": group["_id"], "count": group["count"], "featured": group["featured"]}
+                for group in facets.get("categories", [])
+                if group["_id"] is not None
+            ],
+            "featuredIds": [photo["id"] for photo in facets.get("featured", []) if "id" in photo],
+        })
+
+    # Tagged "photos" so every photo write drops it along with the gallery lists
+    return await request.app.state.response_cache.respond(request, "photos", build, "facets")
+
+
+@api_router.get("/photos/search", response_model=PhotoSearchResponse)
+async def search_photos(
+    request: Request,
+    q: str = Query(..., max_length=200),
+    category: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+):
+    _ensure_db(request)
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    total, hits = await request.app.state.photo_search.search(q, category, skip=(page - 1) * limit, limit=limit)
+    return FastJSONResponse({
+        "query": q,
+        "total": total,
+        "page": page,
+        "limit": limit,
+        "results": photo_summary_reader.read_all(hits),
+    })
+
+
+@api_router.post("/photos/captions", response_model=Job, status_code=202)
+async def start_caption_run(caption_request: CaptionRunRequest, request: Request):
+    _ensure_db(request)
+    payload = {"runId": str(uuid.uuid4()), **caption_request.model_dump()}
+    return await request.app.state.jobs.enqueue("captions", payload)
+
+
+@api_router.get("/photos/captions/{run_id}", response_model=CaptionRun)
+async def get_caption_run(run_id: str, request: Request):
+    _ensure_db(request)
+    run = await request.app.state.captions.get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Caption run not found")
+    return run
+
+
+@api_router.get("/photos/semantic", response_model=List[PhotoSummary], dependencies=[Depends(rate_limit("semantic"))])
+async def semantic_search_photos(
+    request: Request,
+    q: str = Query(..., max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+):
+    db = _public_db(request)
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query must not be empty")
+    scored = await request.app.state.embeddings.search(q, limit)
+    return FastJSONResponse(await _photo_summaries(db, scored))
+
+
+@api_router.get(
+    "/photos/{photo_id}/similar", response_model=List[PhotoSummary], dependencies=[Depends(rate_limit("semantic"))]
+)
+async def get_similar_photos(photo_id: str, request: Request, limit: int = Query(8, ge=1, le=50)):
+    db = _public_db(request)
+    scored = await request.app.state.embeddings.similar(photo_id, limit)
+    if scored is None:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    return FastJSONResponse(await _photo_summaries(db, scored))
+
+
+async def _photo_summaries(db, scored: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+    # Light photo fields for (id, score) pairs, in the given order
+    docs = await db.photos.find({"id": {"$in": [photo_id for photo_id, _ in scored]}}, photo_summary_reader.projection).to_list(None)
+    by_id = {doc["id"]: doc for doc in docs}
+    return [
+        {**photo_summary_reader.read(by_id[photo_id]), "score": round(score, 4)}
+        for photo_id, score in scored
+        if photo_id in by_id
+    ]
+
+
 @api_router.get("/photos", response_model=List[Photo])
 async def get_photos(request: Request, category: Optional[str] = None):
     db = _ensure_db(request)
-    query = {"category": category} if category else {}
-    photos = await db.photos.find(query).sort("order", 1).to_list(1000)
-    return [Photo(**photo) for photo in photos]
+
+    async def build() -> bytes:
+        query = {"category": category} if category else {}
+        photos = await db.photos.find(query, photo_reader.projection).sort(RANK_SORT).to_list(1000)
+        return dumps(photo_reader.read_all(photos))
+
+    return await request.app.state.response_cache.respond(request, "photos", build, "list", category)
 
 
 @api_router.post("/photos", response_model=Photo)
 async def create_photo(photo: PhotoCreate, request: Request):
+    return await _insert_photo(request, photo)
+
+
+async def _insert_photo(request: Request, photo: PhotoCreate) -> Photo:
     db = _ensure_db(request)
-    photo_obj = Photo(**photo.model_dump())
+    photo_obj = Photo(**photo.model_dump(), **await asyncio.to_thread(describe_image, photo.imageData))
+    photo_obj.rank = await request.app.state.photo_ranks.rank_for_new(photo_obj.order)
     await db.photos.insert_one(photo_obj.model_dump())
+    await _content_changed(request, "photos")
     return photo_obj
 
 
@@ -343,6 +1165,17 @@ async def update_photo(photo_id: str, photo_update: PhotoUpdate, request: Reques
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
+    if "imageData" in update_data:
+        update_data.update(await asyncio.to_thread(describe_image, update_data["imageData"]))
+        # New image: the next caption run describes it again
+        update_data["captionHash"] = None
+
+    if "order" in update_data:
+        current = await db.photos.find_one({"id": photo_id}, {"_id": 0, "order": 1})
+        if current is not None and current.get("order") != update_data["order"]:
+            # Moving to another order value: append after the items already there
+            update_data["rank"] = await request.app.state.photo_ranks.rank_for_new(update_data["order"], exclude=photo_id)
+
     result = await db.photos.find_one_and_update(
         {"id": photo_id},
         {"$set": update_data},
@@ -352,6 +1185,7 @@ async def update_photo(photo_id: str, photo_update: PhotoUpdate, request: Reques
     if not result:
         raise HTTPException(status_code=404, detail="Photo not found")
 
+    await _content_changed(request, "photos")
     return Photo(**result)
 
 
@@ -363,57 +1197,169 @@ async def delete_photo(photo_id: str, request: Request):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Photo not found")
 
+    await _content_changed(request, "photos")
     return {"success": True, "message": "Photo deleted"}
 
 
+@api_router.post("/photos/{photo_id}/move", response_model=Photo)
+async def move_photo(photo_id: str, move_request: MoveRequest, request: Request):
+    _ensure_db(request)
+    moved = await _move(request.app.state.photo_ranks, photo_id, move_request, "Photo")
+    await _content_changed(request, "photos")
+    return photo_reader.read(moved)
+
+
+async def _move(ranks: RankedCollection, item_id: str, move_request: MoveRequest, label: str) -> Dict[str, Any]:
+    try:
+        moved = await ranks.move(item_id, after_id=move_request.afterId, before_id=move_request.beforeId)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except LookupError:
+        raise HTTPException(status_code=404, detail=f"Neighbouring {label.lower()} not found")
+    if moved is None:
+        raise HTTPException(status_code=404, detail=f"{label} not found")
+    moved.pop("_id", None)
+    return moved
+
+
 # Testimonial Endpoints
 @api_router.get("/testimonials", response_model=List[Testimonial])
 async def get_testimonials(request: Request):
     db = _ensure_db(request)
-    testimonials = await db.testimonials.find().sort("order", 1).to_list(1000)
-    return [Testimonial(**testimonial) for testimonial in testimonials]
+
+    async def build() -> bytes:
+        return dumps(await _load_public_content(db, "testimonials"))
+
+    return await request.app.state.response_cache.respond(request, "testimonials", build)
 
 
 @api_router.post("/testimonials", response_model=Testimonial)
 async def create_testimonial(testimonial: TestimonialCreate, request: Request):
     db = _ensure_db(request)
     testimonial_obj = Testimonial(**testimonial.model_dump())
+    testimonial_obj.rank = await request.app.state.testimonial_ranks.rank_for_new(testimonial_obj.order)
     await db.testimonials.insert_one(testimonial_obj.model_dump())
+    await _content_changed(request, "testimonials")
     return testimonial_obj
 
 
+@api_router.post("/testimonials/{testimonial_id}/move", response_model=Testimonial)
+async def move_testimonial(testimonial_id: str, move_request: MoveRequest, request: Request):
+    _ensure_db(request)
+    moved = await _move(request.app.state.testimonial_ranks, testimonial_id, move_request, "Testimonial")
+    await _content_changed(request, "testimonials")
+    return testimonial_reader.read(moved)
+
+
 # Contact Endpoints
-@api_router.post("/contact", response_model=ContactInquiry)
+@api_router.post("/contact", response_model=ContactInquiry, dependencies=[Depends(rate_limit("contact"))])
 async def submit_contact_inquiry(inquiry: ContactInquiryCreate, request: Request):
     db = _ensure_db(request)
-    inquiry_obj = ContactInquiry(**inquiry.model_dump())
-    await db.contact_inquiries.insert_one(inquiry_obj.model_dump())
-    return inquiry_obj
+    # Resubmitting the same email and message is rejected before anything is stored
+    duplicates: DuplicateFilter = request.app.state.duplicate_filter
+    fingerprint = submission_fingerprint(inquiry.email, inquiry.message)
+    if await duplicates.seen(fingerprint):
+        raise HTTPException(status_code=409, detail="Duplicate submission")
+    inbox: InquiryInbox = request.app.state.inbox
+    async with inbox.stamp(ContactInquiry(**inquiry.model_dump()).model_dump()) as inquiry_doc:
+        try:
+            # Stored with its notification; delivery happens in the background dispatcher
+            await request.app.state.outbox.add_inquiry(db.contact_inquiries, inquiry_doc)
+        except Exception:
+            await duplicates.forget(fingerprint)
+            raise
+    return ContactInquiry(**inquiry_doc)
+
+
+def _check_inquiry_status(status: Optional[str]) -> None:
+    if status is not None and status not in INQUIRY_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of: {', '.join(INQUIRY_STATUSES)}")
 
 
 @api_router.get("/contact/inquiries", response_model=List[ContactInquiry])
-async def get_contact_inquiries(request: Request):
-    db = _ensure_db(request)
-    inquiries = await db.contact_inquiries.find().sort("submittedAt", -1).to_list(1000)
-    return [ContactInquiry(**inquiry) for inquiry in inquiries]
+async def get_contact_inquiries(
+    request: Request,
+    status: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0),
+    wait: float = Query(0, ge=0, le=60),
+    limit: int = Query(1000, ge=1, le=1000),
+):
+    # Without `since`: newest first. With it: only inquiries written after that version, oldest change first,
+    # waiting up to `wait` seconds for one to arrive
+    _ensure_db(request)
+    _check_inquiry_status(status)
+    inbox: InquiryInbox = request.app.state.inbox
+    if since is None:
+        inquiries = await inbox.list(status, limit)
+    else:
+        inquiries = await inbox.changes(since, status, limit, wait)
+    return FastJSONResponse(inquiry_reader.read_all(inquiries))
+
+
+@api_router.get("/contact/inquiries/stream")
+async def stream_contact_inquiries(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    status: Optional[str] = None,
+):
+    # Server-sent events: one `inquiry` event per new or changed inquiry, with its version as the event id
+    _ensure_db(request)
+    _check_inquiry_status(status)
+    inbox: InquiryInbox = request.app.state.inbox
+    last_event_id = request.headers.get("last-event-id")
+    cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else since
+    if cursor is None:
+        # Start from now: only inquiries written after the stream opened
+        cursor = await inbox.current_version()
+    heartbeat = float(os.getenv("INQUIRY_STREAM_HEARTBEAT", "15"))
+    # Streams end after a while; EventSource reconnects and resumes from Last-Event-ID
+    deadline = time.monotonic() + float(os.getenv("INQUIRY_STREAM_SECONDS", "300"))
+
+    async def events():
+        nonlocal cursor
+        yield b"retry: 3000\n\n"
+        while not inbox.closing and not await request.is_disconnected():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            docs = await inbox.changes(cursor, status, limit=100, wait=min(heartbeat, remaining))
+            if not docs:
+                yield b": keepalive\n\n"
+                continue
+            for doc in inquiry_reader.read_all(docs):
+                cursor = doc["version"]
+                yield b"id: %d\nevent: inquiry\ndata: %s\n\n" % (cursor, dumps(doc))
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@api_router.put("/contact/inquiries/{inquiry_id}", response_model=ContactInquiry)
+async def update_contact_inquiry_status(inquiry_id: str, status_update: InquiryStatusUpdate, request: Request):
+    _ensure_db(request)
+    _check_inquiry_status(status_update.status)
+    inquiry = await request.app.state.inbox.set_status(inquiry_id, status_update.status)
+    if inquiry is None:
+        raise HTTPException(status_code=404, detail="Inquiry not found")
+    return FastJSONResponse(inquiry_reader.read(inquiry))
+
+
+@api_router.get("/admin/notifications", response_model=NotificationStats)
+async def get_notification_stats(request: Request):
+    _ensure_db(request)
+    return NotificationStats(**await request.app.state.outbox.stats())
 
 
 # About Endpoints
 @api_router.get("/about", response_model=AboutContent)
 async def get_about(request: Request):
     db = _ensure_db(request)
-    about = await db.about.find_one({"id": "about"})
 
-    if not about:
-        # Return default content if none exists
-        return AboutContent(
-            bioText="Professional photographer capturing moments that matter.",
-            photographerName="Your Name",
-            tagline="Capturing Life's Beautiful Moments",
-            portraitImage=""
-        )
+    async def build() -> bytes:
+        return dumps(await _load_public_content(db, "about"))
 
-    return AboutContent(**about)
+    return await request.app.state.response_cache.respond(request, "about", build)
 
 
 @api_router.put("/about", response_model=AboutContent)
@@ -433,11 +1379,14 @@ async def update_about(about_update: AboutContentUpdate, request: Request):
         return_document=True
     )
 
+    await _content_changed(request, "about")
     return AboutContent(**result)
 
 
 app.include_router(api_router)
 
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -0,0 +1,296 @@
+"""Static snapshot export of the public portfolio for CDN/edge serving.
+
+A snapshot renders what ``GET /api/photos`` (all photos and one file per
+category), ``GET /api/testimonials`` and ``GET /api/about`` return into plain
+JSON files. Embedded base64 images are written out as separate asset files and
+the JSON points at them. Every file name carries a hash of its content, so the
+files are immutable and can be cached forever::
+
+    <root>/files/photos.3f2a9c1b04de.json
+    <root>/files/photos/portrait.77c0e1d2a9b3.json
+    <root>/files/assets/9b1f0c2e5a7d4e11.jpg          (+ -480w/-1280w.webp with Pillow)
+    <root>/versions/<version>/manifest.json          route -> hashed file
+    <root>/latest.json                               pointer to the newest manifest
+
+Content writes mark their collection dirty; the next build re-renders only
+those sections, reuses the previous manifest for the rest and skips assets
+that already exist on disk. Pruning only deletes unreferenced files older than
+``prune_grace`` seconds: another worker may have written files for a manifest
+it has not published yet (files that are reused get their mtime refreshed).
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from placeholders import parse_data_uri
+from serialization import dumps
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("photos", "testimonials", "about")
+
+# Widths of the resized copies written next to each raster image (requires Pillow)
+VARIANT_WIDTHS = (480, 1280)
+
+_SAFE_NAME = re.compile(r"[^a-z0-9_-]+")
+
+# section -> async loader returning the section's response content
+Loader = Callable[[str], Awaitable[Any]]
+
+
+def _content_hash(data: bytes, length: int = 12) -> str:
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _ensure_file(path: Path, data: bytes) -> None:
+    # Content-addressed: an existing file is already right, but mark it as in use for pruning
+    if path.exists():
+        _touch(path)
+    else:
+        _write_atomic(path, data)
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+class SnapshotBuilder:
+    def __init__(
+        self,
+        load: Loader,
+        root: Path,
+        base_url: str = "",
+        keep_versions: int = 5,
+        debounce: float = 2.0,
+        prune_grace: float = 3600.0,
+    ):
+        self.load = load
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+        self.keep_versions = keep_versions
+        self.debounce = debounce
+        self.prune_grace = prune_grace
+        self._dirty: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self._pending: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, load: Loader) -> Optional["SnapshotBuilder"]:
+        root = os.getenv("SNAPSHOT_DIR")
+        if not root:
+            return None
+        return cls(
+            load,
+            Path(root),
+            base_url=os.getenv("SNAPSHOT_BASE_URL", ""),
+            keep_versions=int(os.getenv("SNAPSHOT_KEEP_VERSIONS", "5")),
+            debounce=float(os.getenv("SNAPSHOT_DEBOUNCE_SECONDS", "2.0")),
+            prune_grace=float(os.getenv("SNAPSHOT_PRUNE_GRACE_SECONDS", "3600")),
+        )
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        pointer = self.root / "latest.json"
+        if not pointer.exists():
+            return None
+        manifest_path = self.root / json.loads(pointer.read_bytes())["manifest"]
+        return json.loads(manifest_path.read_bytes())
+
+    def mark_dirty(self, *sections: str) -> None:
+        # Write hook: rebuild the changed sections shortly, coalescing bursts of writes
+        self._dirty.update(section for section in sections if section in SECTIONS)
+        if self._dirty and (self._pending is None or self._pending.done()):
+            self._pending = asyncio.create_task(self._rebuild_later())
+
+    async def _rebuild_later(self) -> None:
+        await asyncio.sleep(self.debounce)
+        try:
+            await self.build()
+        except Exception:
+            logger.exception("Incremental snapshot build failed")
+        # Writes that arrived while building found this task still running and scheduled nothing
+        if self._dirty:
+            self._pending = asyncio.create_task(self._rebuild_later())
+
+    async def stop(self) -> None:
+        if self._pending is not None and not self._pending.done():
+            self._pending.cancel()
+            await asyncio.gather(self._pending, return_exceptions=True)
+
+    async def build(self, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        # Re-render `sections` (default: whatever is dirty, or everything for the first build)
+        async with self._lock:
+            previous = await asyncio.to_thread(self.latest)
+            if previous is None:
+                todo = set(SECTIONS)
+            elif sections is not None:
+                todo = set(sections) & set(SECTIONS)
+            else:
+                todo = set(self._dirty)
+            self._dirty -= todo
+
+            routes: Dict[str, Dict[str, Any]] = {} if previous is None else {
+                section: files for section, files in previous["sections"].items() if section not in todo
+            }
+            try:
+                for section in SECTIONS:
+                    if section in todo:
+                        content = await self.load(section)
+                        routes[section] = await asyncio.to_thread(self._render_section, section, content)
+            except BaseException:
+                # Leave the sections dirty so the next build retries them
+                self._dirty |= todo
+                raise
+            # Reused sections are live again; keep their files out of other workers' prunes
+            await asyncio.to_thread(self._touch_sections, routes, todo)
+
+            if previous is not None and routes == previous["sections"]:
+                logger.info("Snapshot %s is current; nothing to write", previous["version"])
+                return previous
+            manifest = await asyncio.to_thread(self._publish, routes)
+            logger.info("Snapshot %s written (rebuilt: %s)", manifest["version"], ", ".join(sorted(todo)))
+            return manifest
+
+    def _touch_sections(self, sections: Dict[str, Dict[str, Any]], rendered: Set[str]) -> None:
+        for section, files in sections.items():
+            if section not in rendered:
+                for relative in (*files["routes"].values(), *files["assets"]):
+                    _touch(self.root / relative)
+
+    def _render_section(self, section: str, content: Any) -> Dict[str, Any]:
+        if section != "photos":
+            return {"routes": {f"{section}.json": self._write_json(section, content)}, "assets": []}
+
+        assets: List[str] = []
+        photos = [self._export_photo(photo, assets) for photo in content]
+        routes = {"photos.json": self._write_json("photos", photos)}
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for photo in photos:
+            by_category.setdefault(photo["category"], []).append(photo)
+        for category, items in sorted(by_category.items()):
+            name = _SAFE_NAME.sub("-", category.lower()) or "uncategorized"
+            routes[f"photos/{name}.json"] = self._write_json(f"photos/{name}", items)
+        return {"routes": routes, "assets": sorted(set(assets))}
+
+    def _write_json(self, stem: str, content: Any) -> str:
+        body = dumps(content)
+        relative = f"files/{stem}.{_content_hash(body)}.json"
+        _ensure_file(self.root / relative, body)
+        return relative
+
+    def _url(self, relative: str) -> str:
+        return f"{self.base_url}/{relative}"
+
+    def _export_photo(self, photo: Dict[str, Any], assets: List[str]) -> Dict[str, Any]:
+        try:
+            parsed = parse_data_uri(photo.get("imageData") or "")
+        except ValueError:
+            logger.warning("Photo %s has an undecodable data URI; leaving it inline", photo.get("id"))
+            return {**photo, "variants": {}}
+        if parsed is None:
+            # Already a URL; the CDN serves it as-is
+            return {**photo, "variants": {}}
+
+        mime, data = parsed
+        extension = mimetypes.guess_extension(mime) or ".bin"
+        digest = _content_hash(data, 16)
+        original = f"files/assets/{digest}{extension}"
+        _ensure_file(self.root / original, data)
+        assets.append(original)
+
+        variants = {}
+        for width, relative in self._variants(data, digest, mime).items():
+            assets.append(relative)
+            variants[f"{width}w"] = self._url(relative)
+        return {**photo, "imageData": self._url(original), "variants": variants}
+
+    def _variants(self, data: bytes, digest: str, mime: str) -> Dict[int, str]:
+        if Image is None or mime == "image/svg+xml":
+            return {}
+        wanted = {width: f"files/assets/{digest}-{width}w.webp" for width in VARIANT_WIDTHS}
+        missing = {}
+        for width, relative in wanted.items():
+            if (self.root / relative).exists():
+                _touch(self.root / relative)
+            else:
+                missing[width] = relative
+        if missing:
+            try:
+                with Image.open(io.BytesIO(data)) as image:
+                    image.load()
+                    for width, relative in missing.items():
+                        if width >= image.width:
+                            continue
+                        resized = image.copy()
+                        resized.thumbnail((width, image.height))
+                        buffer = io.BytesIO()
+                        resized.save(buffer, format="WEBP", quality=80)
+                        _write_atomic(self.root / relative, buffer.getvalue())
+            except Exception as exc:
+                logger.warning("Could not resize asset %s: %s", digest, exc)
+        return {width: relative for width, relative in wanted.items() if (self.root / relative).exists()}
+
+    def _publish(self, sections: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        created = datetime.now(timezone.utc)
+        routes = {route: self._url(relative) for files in sections.values() for route, relative in files["routes"].items()}
+        version = f"{created:%Y%m%dT%H%M%S%f}-{_content_hash(json.dumps(sections, sort_keys=True).encode(), 8)}"
+        manifest = {
+            "version": version,
+            "createdAt": created.isoformat(),
+            "routes": dict(sorted(routes.items())),
+            "sections": sections,
+        }
+        manifest_relative = f"versions/{version}/manifest.json"
+        _write_atomic(self.root / manifest_relative, json.dumps(manifest, indent=2).encode())
+        _write_atomic(self.root / "latest.json", json.dumps({"version": version, "manifest": manifest_relative}).encode())
+        self._prune()
+        return manifest
+
+    def _prune(self) -> None:
+        # Keep the newest versions and every file they reference; older files are unreachable
+        versions_dir = self.root / "versions"
+        versions = sorted(path for path in versions_dir.iterdir() if path.is_dir())
+        for stale in versions[: -self.keep_versions]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+        referenced: Set[str] = set()
+        for version in versions[-self.keep_versions:]:
+            manifest = json.loads((version / "manifest.json").read_bytes())
+            for files in manifest["sections"].values():
+                referenced.update(files["routes"].values())
+                referenced.update(files["assets"])
+        cutoff = time.time() - self.prune_grace
+        for path in (self.root / "files").rglob("*"):
+            if not path.is_file() or path.relative_to(self.root).as_posix() in referenced:
+                continue
+            try:
+                # Recent files may belong to a build another worker hasn't published yet
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,188 @@
+"""Bounded storage for status checks, with per-client rollups.
+
+Raw checks in ``status_checks`` are kept for a limited time: a TTL index on
+``timestamp`` removes them after ``STATUS_RETENTION_SECONDS``. Alternatively,
+``STATUS_CAPPED_BYTES`` (and optionally ``STATUS_CAPPED_MAX``) makes it a
+capped collection that keeps only the newest checks; this only applies when
+the collection is created, so an existing uncapped collection keeps the TTL.
+
+Every recorded check also upserts one document per client in
+``status_rollups`` (latest check, first/last seen and a running count), so
+the summary is answered from one small document per client instead of a
+scan over raw checks. Rollups take the earliest/latest timestamp whatever
+order checks arrive in, and keep the ids of the last ``ROLLUP_ID_WINDOW``
+checks they counted so a retried batch isn't counted twice.
+"""
+
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+TTL_INDEX_NAME = "status_checks_ttl"
+
+# Raised by createIndex when an index with the same keys has other options
+_INDEX_OPTIONS_CONFLICT = 85
+_DUPLICATE_KEY = 11000
+
+# Check ids remembered per rollup to skip re-applied checks; covers any retry of a recent batch
+ROLLUP_ID_WINDOW = 500
+
+
+class StatusStore:
+    def __init__(
+        self,
+        db,
+        retention_seconds: Optional[float] = 7 * 24 * 3600,
+        capped_bytes: Optional[int] = None,
+        capped_max: Optional[int] = None,
+    ):
+        self.db = db
+        self.checks = db.status_checks
+        self.rollups = db.status_rollups
+        self.retention_seconds = retention_seconds
+        self.capped_bytes = capped_bytes
+        self.capped_max = capped_max
+        self.capped = False
+
+    @classmethod
+    def from_env(cls, db) -> "StatusStore":
+        retention = float(os.getenv("STATUS_RETENTION_SECONDS", str(7 * 24 * 3600)))
+        capped_bytes = os.getenv("STATUS_CAPPED_BYTES")
+        capped_max = os.getenv("STATUS_CAPPED_MAX")
+        return cls(
+            db,
+            retention_seconds=retention if retention > 0 else None,
+            capped_bytes=int(capped_bytes) if capped_bytes else None,
+            capped_max=int(capped_max) if capped_max else None,
+        )
+
+    async def ensure_indexes(self) -> None:
+        if self.capped_bytes:
+            self.capped = await self._create_capped()
+        if self.capped:
+            await self.checks.create_index("timestamp")
+        elif self.retention_seconds:
+            await self._ensure_ttl()
+        else:
+            await self.checks.create_index("timestamp", name=TTL_INDEX_NAME)
+        # Makes a retried batch insert idempotent
+        await self.checks.create_index("id", unique=True)
+        await self.rollups.create_index("client_name", unique=True)
+        await self.rollups.create_index("lastSeen")
+
+    async def _create_capped(self) -> bool:
+        options = {"capped": True, "size": self.capped_bytes}
+        if self.capped_max:
+            options["max"] = self.capped_max
+        try:
+            await self.db.create_collection(self.checks.name, **options)
+            logger.info("Created capped status_checks (%s bytes)", self.capped_bytes)
+            return True
+        except CollectionInvalid:
+            # Already exists: capped or not, it stays as it is
+            existing = await self.checks.options()
+            if not existing.get("capped"):
+                logger.warning("status_checks exists and is not capped; using the TTL index instead")
+            return bool(existing.get("capped"))
+
+    async def _ensure_ttl(self) -> None:
+        seconds = int(self.retention_seconds)
+        try:
+            await self.checks.create_index("timestamp", name=TTL_INDEX_NAME, expireAfterSeconds=seconds)
+        except OperationFailure as exc:
+            if exc.code != _INDEX_OPTIONS_CONFLICT:
+                raise
+            # Retention changed since the index was built
+            await self.db.command(
+                "collMod", self.checks.name, index={"name": TTL_INDEX_NAME, "expireAfterSeconds": seconds}
+            )
+            logger.info("Status check retention changed to %ss", seconds)
+
+    async def record(self, check: Dict[str, Any]) -> None:
+        await self.record_many([check])
+
+    async def record_many(self, checks: Sequence[Dict[str, Any]]) -> None:
+        # Insert raw checks and fold them into the per-client rollups, one upsert per client
+        if not checks:
+            return
+        try:
+            await self.checks.insert_many([dict(check) for check in checks], ordered=False)
+        except BulkWriteError as exc:
+            # Checks already stored by an earlier attempt of the same batch are fine
+            if any(error.get("code") != _DUPLICATE_KEY for error in exc.details.get("writeErrors", [])):
+                raise
+        await self._roll_up(checks)
+
+    async def _roll_up(self, checks: Sequence[Dict[str, Any]]) -> None:
+        per_client: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        for check in checks:
+            per_client.setdefault(check["client_name"], []).append(check)
+        clients = list(per_client.items())
+        # One update per client; a client whose rollup already holds one of these ids is a retry
+        retried = await self._apply(
+            [self._rollup_update(client, client_checks) for client, client_checks in clients]
+        )
+        if retried:
+            # Apply what the earlier attempt didn't get to, one check at a time
+            await self._apply([
+                self._rollup_update(clients[index][0], [check]) for index in retried for check in clients[index][1]
+            ])
+        # The latest check id follows lastSeen: only set when this batch's newest check holds it
+        latest = [max(client_checks, key=lambda check: check["timestamp"]) for _, client_checks in clients]
+        await self.rollups.bulk_write([
+            UpdateOne(
+                {"client_name": check["client_name"], "lastSeen": check["timestamp"]},
+                {"$set": {"lastCheckId": check["id"]}},
+            )
+            for check in latest
+        ], ordered=False)
+
+    async def _apply(self, updates: List[UpdateOne]) -> List[int]:
+        # Run conditional upserts; returns the indexes skipped because the rollup already counted them
+        try:
+            await self.rollups.bulk_write(updates, ordered=False)
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            if any(error.get("code") != _DUPLICATE_KEY for error in errors):
+                raise
+            return [error["index"] for error in errors]
+        return []
+
+    @staticmethod
+    def _rollup_update(client: str, checks: Sequence[Dict[str, Any]]) -> UpdateOne:
+        # Matches only while none of the checks is counted; otherwise the upsert hits the unique client_name
+        ids = [check["id"] for check in checks]
+        timestamps = [check["timestamp"] for check in checks]
+        return UpdateOne(
+            {"client_name": client, "checkIds": {"$nin": ids}},
+            {
+                "$set": {"updatedAt": datetime.now(timezone.utc)},
+                "$inc": {"count": len(checks)},
+                "$min": {"firstSeen": min(timestamps)},
+                "$max": {"lastSeen": max(timestamps)},
+                "$push": {"checkIds": {"$each": ids, "$slice": -ROLLUP_ID_WINDOW}},
+            },
+            upsert=True,
+        )
+
+    async def recent(self, projection: Dict[str, Any], client_name: Optional[str] = None, limit: int = 1000):
+        # Newest raw checks first
+        query = {"client_name": client_name} if client_name else {}
+        return await self.checks.find(query, projection).sort("timestamp", -1).limit(limit).to_list(limit)
+
+    async def summary(self) -> Dict[str, Any]:
+        clients = await self.rollups.find({}, {"_id": 0, "updatedAt": 0, "checkIds": 0}).sort("lastSeen", -1).to_list(None)
+        return {
+            "clientCount": len(clients),
+            "totalChecks": sum(client.get("count", 0) for client in clients),
+            "retentionSeconds": None if self.capped else self.retention_seconds,
+            "capped": self.capped,
+            "clients": clients,
+        }
@@ -0,0 +1,41 @@
+"""Shared fixtures: the FastAPI app wired to an in-memory MongoDB and a fake LLM."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from fakes import FakeLLMServer
+
+
+@pytest.fixture
+def fake_llm():
+    with FakeLLMServer() as server:
+        yield server
+
+
+@pytest.fixture
+def api_client(monkeypatch, fake_llm):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from starlette.testclient import TestClient
+
+    import server
+    from ai_agents.lifecycle import agent_work
+    from ai_agents.resilience import upstreams
+
+    monkeypatch.setenv("MONGO_URL", "mongodb://in-memory")
+    monkeypatch.setenv("DB_NAME", "test_database")
+    monkeypatch.setenv("LITELLM_BASE_URL", fake_llm.url)
+    monkeypatch.setenv("LITELLM_AUTH_TOKEN", "sk-test")
+    monkeypatch.setenv("AI_MODEL_NAME", "fake")
+    monkeypatch.setattr(server, "AsyncIOMotorClient", lambda url, **kwargs: mongomock_motor.AsyncMongoMockClient())
+    upstreams.clear()
+
+    with TestClient(server.app) as client:
+        yield client
+    upstreams.clear()
+    agent_work.open()
@@ -0,0 +1,189 @@
+"""Local stand-ins for the LiteLLM proxy and CodexHub MCP servers.
+
+Both servers run in a background thread on a free localhost port so agents can
+be pointed at them through ``AgentConfig(api_base_url=...)`` and the
+``CODEXHUB_MCP_*_URL`` environment variables.
+"""
+
+import asyncio
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ThreadedServer:
+    """Run an ASGI app with uvicorn in a daemon thread."""
+
+    def __init__(self, app, port: Optional[int] = None):
+        self.app = app
+        self.port = port or _free_port()
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "ThreadedServer":
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Server on port {self.port} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class FakeLLMServer(ThreadedServer):
+    """Minimal OpenAI-compatible chat completions endpoint.
+
+    ``failures`` is a list of HTTP statuses returned (in order) before normal
+    answers resume; ``delay`` may be a float or a callable taking the request
+    index. When the request offers tools and no tool result is present yet,
+    the server calls the first tool with the last user message as its argument.
+    """
+
+    def __init__(
+        self,
+        failures: Optional[List[int]] = None,
+        delay: "float | Callable[[int], float]" = 0.0,
+        reply: Optional[Callable[[dict], str]] = None,
+        port: Optional[int] = None,
+    ):
+        self.failures = list(failures or [])
+        self.delay = delay
+        self.reply = reply or _default_reply
+        self.requests: List[dict] = []
+        app = Starlette(routes=[
+            Route("/chat/completions", self._chat, methods=["POST"]),
+            Route("/v1/chat/completions", self._chat, methods=["POST"]),
+        ])
+        super().__init__(app, port)
+
+    async def _chat(self, request: Request):
+        body = await request.json()
+        index = len(self.requests)
+        self.requests.append(body)
+
+        delay = self.delay(index) if callable(self.delay) else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failures:
+            status = self.failures.pop(0)
+            return JSONResponse({"error": {"message": f"fake failure {status}"}}, status_code=status)
+
+        message = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+        tools = body.get("tools") or []
+        last_role = body["messages"][-1]["role"] if body.get("messages") else None
+        if tools and last_role != "tool":
+            function = tools[0]["function"]
+            params = list((function.get("parameters") or {}).get("properties", {}))
+            arguments = {params[0]: _last_content(body, "user")} if params else {}
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:8]}",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+            }]
+            finish_reason = "tool_calls"
+        else:
+            message["content"] = self.reply(body)
+
+        return JSONResponse({
+            "id": f"chatcmpl-{index}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        })
+
+
+def _default_reply(body: dict) -> str:
+    # Echo the user, or summarize a tool result the way a chat model would
+    messages = body.get("messages") or []
+    if messages and messages[-1].get("role") == "tool":
+        tool_output = _last_content(body, "tool")
+        urls = re.findall(r"https?://[^\s\"')]+", tool_output)
+        if urls:
+            return f"Here is your image: ![{_last_content(body, 'user')}]({urls[0]})"
+        return f"Tool result: {tool_output}"
+    return f"echo: {_last_content(body, 'user')}"
+
+
+def _last_content(body: dict, role: str) -> str:
+    for message in reversed(body.get("messages", [])):
+        if message.get("role") == role:
+            content = message.get("content")
+            if isinstance(content, list):
+                return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+            return content or ""
+    return ""
+
+
+class FakeMCPServer(ThreadedServer):
+    """Streamable-HTTP MCP server exposing fake ``generate_image`` and ``web_search`` tools."""
+
+    def __init__(self, port: Optional[int] = None, tool_delay: float = 0.0):
+        from mcp.server.fastmcp import FastMCP
+
+        self.calls: List[dict] = []
+        mcp = FastMCP("fake-codexhub", stateless_http=True, json_response=True)
+
+        @mcp.tool()
+        async def generate_image(prompt: str) -> str:
+            """Generate an image from a text prompt."""
+            self.calls.append({"tool": "generate_image", "prompt": prompt})
+            if tool_delay:
+                await asyncio.sleep(tool_delay)
+            return json.dumps({
+                "image_url": f"https://storage.googleapis.com/fake-bucket/generated/{uuid.uuid4()}.webp",
+                "prompt": prompt,
+            })
+
+        @mcp.tool()
+        async def web_search(query: str) -> str:
+            """Search the web."""
+            self.calls.append({"tool": "web_search", "query": query})
+            if tool_delay:
+                await asyncio.sleep(tool_delay)
+            return f"Top result for {query}: https://example.com/{uuid.uuid4().hex[:8]}"
+
+        super().__init__(mcp.streamable_http_app(), port)
+
+    @property
+    def mcp_url(self) -> str:
+        return f"{self.url}/mcp"
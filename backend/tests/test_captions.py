@@ -0,0 +1,119 @@
+"""Photo captioning pipeline tests."""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from captions import COMPLETED, RUNNING, CaptionPipeline, content_hash
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class _Caption:
+    def __init__(self, image):
+        self.image = image
+
+    def model_dump(self):
+        return {"caption": f"About {self.image}", "alt_text": f"Alt {self.image}", "tags": ["auto", self.image]}
+
+
+class _FakeCaptionAgent:
+    def __init__(self, interrupt_after=None):
+        self.calls = []
+        self.interrupt_after = interrupt_after
+
+    async def caption_images(self, images):
+        if self.interrupt_after is not None and len(self.calls) >= self.interrupt_after:
+            # Like the process being stopped mid-run
+            raise asyncio.CancelledError()
+        self.calls.append(list(images))
+        return [_Caption(image) for image in images]
+
+
+async def _seed(db):
+    await db.photos.insert_many([
+        {"id": "p1", "imageData": "img-a", "description": "", "tags": ["mine"]},
+        {"id": "p2", "imageData": "img-b", "description": "Hand written", "tags": []},
+        {"id": "p3", "imageData": "img-a", "description": "", "tags": []},
+        {"id": "p4", "imageData": "img-c", "description": "", "tags": []},
+        {"id": "p5", "imageData": "img-d", "description": "", "tags": []},
+    ])
+
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_caches_and_skips_unchanged_images():
+    db = mongomock_motor.AsyncMongoMockClient()["captions"]
+    await _seed(db)
+    agent = _FakeCaptionAgent()
+    pipeline = CaptionPipeline(db, lambda: agent, batch_size=2, concurrency=2, page_size=5)
+    await pipeline.ensure_indexes()
+
+    run = await pipeline.run()
+    assert run["status"] == COMPLETED and run["captioned"] == 5 and run["failed"] == 0
+    # p1 and p3 share an image: four distinct images in batches of two
+    assert sorted(len(call) for call in agent.calls) == [2, 2]
+    p1 = await db.photos.find_one({"id": "p1"})
+    assert p1["description"] == "About img-a" and p1["altText"] == "Alt img-a"
+    assert p1["tags"] == ["mine", "auto", "img-a"] and p1["captionHash"] == content_hash("img-a")
+    assert (await db.photos.find_one({"id": "p2"}))["description"] == "Hand written"
+
+    agent.calls.clear()
+    assert (await pipeline.run())["captioned"] == 0 and agent.calls == []
+
+    # A re-uploaded image that was captioned before comes from the cache
+    await db.photos.update_one({"id": "p4"}, {"$set": {"imageData": "img-a", "captionHash": None}})
+    run = await pipeline.run()
+    assert run["cached"] == 1 and agent.calls == []
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_from_checkpoint():
+    db = mongomock_motor.AsyncMongoMockClient()["captions"]
+    await _seed(db)
+    agent = _FakeCaptionAgent(interrupt_after=1)
+    pipeline = CaptionPipeline(db, lambda: agent, batch_size=2, concurrency=1, page_size=2)
+
+    with pytest.raises(asyncio.CancelledError):
+        await pipeline.run(run_id="nightly")
+    checkpoint = await pipeline.get_run("nightly")
+    assert checkpoint["status"] == RUNNING and checkpoint["lastId"] == "p2" and checkpoint["captioned"] == 2
+
+    agent.interrupt_after = None
+    agent.calls.clear()
+    run = await pipeline.run(run_id="nightly")
+    # p3 was filled from the cache before the interruption; only p4 and p5 still needed the model
+    assert run["status"] == COMPLETED and run["captioned"] == 4
+    assert agent.calls == [["img-c", "img-d"]]
+    assert await db.photos.count_documents({"captionHash": None}) == 0
+
+
+def test_caption_job_uses_vision_model(monkeypatch, fake_llm, api_client):
+    def reply(body):
+        images = [part for part in body["messages"][-1]["content"] if part.get("type") == "image_url"]
+        return json.dumps([{"caption": "A quiet harbour", "alt_text": "Boats", "tags": ["Harbour", "boats"]}] * len(images))
+
+    fake_llm.reply = reply
+    monkeypatch.setenv("CAPTION_MODEL_NAME", "fake-vision")
+    created = api_client.post("/api/photos", json={"title": "Quay", "category": "landscape", "imageData": "data:image/png;base64,AAAA"}).json()
+
+    job = api_client.post("/api/photos/captions", json={}).json()
+    deadline = time.monotonic() + 5
+    while job["status"] not in ("succeeded", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = api_client.get(f"/api/jobs/{job['id']}").json()
+    assert job["status"] == "succeeded", job
+    assert job["result"]["captioned"] == 1
+    assert api_client.get(f"/api/photos/captions/{job['payload']['runId']}").json()["status"] == "completed"
+
+    photo = api_client.get("/api/photos").json()[0]
+    assert photo["id"] == created["id"]
+    assert (photo["description"], photo["altText"], photo["tags"]) == ("A quiet harbour", "Boats", ["harbour", "boats"])
+    assert fake_llm.requests[-1]["model"] == "fake-vision"
@@ -0,0 +1,133 @@
+"""Response compression and precompressed response cache tests."""
+
+import gzip
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from compression import CompressionMiddleware, available_codecs, negotiate
+
+zstandard = pytest.importorskip("zstandard")
+
+BIG = "data:image/svg+xml;base64," + "PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciLz4=" * 200
+
+
+def test_negotiate_respects_q_values_and_server_order():
+    supported = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate, br, zstd", supported) == "zstd"
+    assert negotiate("gzip;q=1.0, zstd;q=0.5", supported) == "gzip"
+    assert negotiate("*;q=0.1, zstd;q=0", supported) == "br"
+    assert negotiate("identity", supported) is None
+    assert negotiate("", supported) is None
+
+
+def _app():
+    async def big(request):
+        return PlainTextResponse(BIG)
+
+    async def small(request):
+        return PlainTextResponse("tiny")
+
+    async def encoded(request):
+        return Response(gzip.compress(b"already"), headers={"Content-Encoding": "gzip"}, media_type="text/plain")
+
+    async def stream(request):
+        async def chunks():
+            for index in range(5):
+                yield f"chunk-{index}:{BIG[:300]}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app = Starlette(routes=[Route(path, fn) for path, fn in
+                            (("/big", big), ("/small", small), ("/encoded", encoded), ("/stream", stream))])
+    return CompressionMiddleware(app, minimum_size=500, codecs=available_codecs())
+
+
+def test_middleware_compresses_negotiated_encoding():
+    client = TestClient(_app())
+
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(BIG) / 10
+    assert response.text == BIG
+
+    response = client.get("/big", headers={"Accept-Encoding": "zstd, gzip"})
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.text == BIG
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+    response = client.get("/encoded", headers={"Accept-Encoding": "zstd"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "already"
+
+
+def test_middleware_streams_compressed_chunks():
+    client = TestClient(_app())
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.count("chunk-") == 5
+
+
+def test_public_endpoints_serve_precompressed_cache(api_client):
+    from server import app
+
+    for index in range(3):
+        api_client.post("/api/photos", json={"title": f"P{index}", "category": "portrait", "imageData": BIG})
+
+    cache = app.state.response_cache
+    first = api_client.get("/api/photos", headers={"Accept-Encoding": "zstd"})
+    second = api_client.get("/api/photos", headers={"Accept-Encoding": "zstd"})
+    assert first.headers["content-encoding"] == "zstd"
+    assert first.content == second.content
+    assert cache.snapshot()["hits"] == 1
+    assert len(first.json()) == 3
+
+    not_modified = api_client.get("/api/photos", headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+
+    plain = api_client.get("/api/photos", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert json.loads(plain.content) == first.json()
+
+    api_client.post("/api/photos", json={"title": "P3", "category": "portrait", "imageData": BIG})
+    assert len(api_client.get("/api/photos").json()) == 4
+
+
+@pytest.mark.asyncio
+async def test_cached_variants_compress_once_off_the_loop():
+    import asyncio
+    import threading
+
+    from compression import Codec
+    from response_cache import CachedBody
+
+    calls = []
+
+    class RecordingCodec(Codec):
+        def compress(self, data, static=False):
+            calls.append((threading.current_thread() is threading.main_thread(), static))
+            return super().compress(data, static)
+
+    codecs = {"gzip": RecordingCodec("gzip", level=6, static_level=9)}
+    body = BIG.encode()
+    small = CachedBody(body, "application/json", codecs, minimum_size=0, static_max_bytes=len(body))
+    results = await asyncio.gather(*(small.variant("gzip") for _ in range(5)))
+    assert len({bytes(result) for result in results}) == 1
+    assert calls == [(False, True)]  # one compression, in a worker thread, at the static level
+
+    large = CachedBody(body, "application/json", codecs, minimum_size=0, static_max_bytes=len(body) - 1)
+    assert gzip.decompress(await large.variant("gzip")) == body
+    assert calls[-1] == (False, False)
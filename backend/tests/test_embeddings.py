@@ -0,0 +1,81 @@
+"""Embedding index tests (local hashing embedder, in-memory MongoDB)."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from embeddings import EmbeddingIndex, HashingEmbedder
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class _CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(256)
+        self.embedded = []
+
+    async def embed(self, texts):
+        self.embedded.extend(texts)
+        return await super().embed(texts)
+
+
+PHOTOS = [
+    {"id": "beach", "title": "Moody beach sunset", "description": "Dark clouds over the sea at dusk", "tags": ["beach", "sunset"]},
+    {"id": "coast", "title": "Stormy coast", "description": "Waves and dark clouds at sunset", "tags": ["sea"]},
+    {"id": "bride", "title": "Bride portrait", "description": "Studio portrait with soft light", "tags": ["wedding"]},
+    {"id": "city", "title": "Neon city", "description": "Rainy street at night", "tags": ["urban"]},
+]
+
+
+@pytest.mark.asyncio
+async def test_similar_and_search_update_incrementally():
+    db = mongomock_motor.AsyncMongoMockClient()["embeddings"]
+    await db.photos.insert_many([dict(photo) for photo in PHOTOS])
+    embedder = _CountingEmbedder()
+    index = EmbeddingIndex(db, embedder)
+
+    similar = await index.similar("beach", limit=2)
+    assert similar[0][0] == "coast" and all(photo_id != "beach" for photo_id, _ in similar)
+    assert (await index.search("sunset over the sea", limit=1))[0][0] in ("beach", "coast")
+    assert await index.similar("missing") is None
+    assert len(embedder.embedded) == 4 + 1
+
+    # Only the edited photo is embedded again; deleted photos leave the index
+    embedder.embedded.clear()
+    await db.photos.update_one({"id": "city"}, {"$set": {"description": "Bride and groom portrait at night"}})
+    await db.photos.delete_one({"id": "coast"})
+    index.mark_dirty()
+    assert (await index.similar("bride", limit=1))[0][0] == "city"
+    assert len(embedder.embedded) == 1
+    assert await db.photo_embeddings.count_documents({}) == 3
+
+    # Another worker reuses the stored vectors instead of embedding again
+    other = EmbeddingIndex(db, _CountingEmbedder())
+    assert await other.sync() == 0
+    assert [photo_id for photo_id, _ in await other.similar("bride", limit=3)] == [
+        photo_id for photo_id, _ in await index.similar("bride", limit=3)
+    ]
+
+
+def test_similar_and_semantic_endpoints(api_client):
+    ids = {}
+    for photo in PHOTOS:
+        body = {key: value for key, value in photo.items() if key != "id"}
+        ids[photo["id"]] = api_client.post("/api/photos", json={**body, "category": "misc", "imageData": "data:x"}).json()["id"]
+
+    similar = api_client.get(f"/api/photos/{ids['beach']}/similar", params={"limit": 2}).json()
+    assert similar[0]["id"] == ids["coast"] and "imageData" not in similar[0]
+    assert similar[0]["score"] >= similar[1]["score"]
+
+    hits = api_client.get("/api/photos/semantic", params={"q": "studio portrait of a bride"}).json()
+    assert hits[0]["id"] == ids["bride"]
+
+    api_client.put(f"/api/photos/{ids['city']}", json={"title": "Bride at night", "description": "Studio portrait of a bride"})
+    hits = api_client.get("/api/photos/semantic", params={"q": "studio portrait of a bride", "limit": 2}).json()
+    assert {hit["id"] for hit in hits} == {ids["bride"], ids["city"]}
+    assert api_client.get("/api/photos/missing/similar").status_code == 404
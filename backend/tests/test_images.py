@@ -0,0 +1,118 @@
+"""Image generation endpoint tests against fake LLM and MCP servers."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from langchain_core.messages import ToolMessage
+
+from ai_agents.agents import parse_image_tool_output
+from fakes import FakeMCPServer
+from images import normalize_prompt
+
+
+@pytest.fixture
+def fake_mcp(monkeypatch):
+    with FakeMCPServer() as server:
+        monkeypatch.setenv("CODEXHUB_MCP_AUTH_TOKEN", "sk-test")
+        monkeypatch.setenv("CODEXHUB_MCP_IMAGE_URL", server.mcp_url)
+        yield server
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  A Sunset   over\tMountains!! ") == "a sunset over mountains"
+    assert normalize_prompt("a sunset over mountains.") == normalize_prompt("A sunset over mountains")
+
+
+def test_parse_image_tool_output():
+    message = ToolMessage(
+        content='{"result": {"image_url": "https://cdn.example.com/a.png"}, "prompt": "a cat"}',
+        tool_call_id="call_1",
+    )
+    parsed = parse_image_tool_output(message, "a cat please")
+    assert parsed.success
+    assert parsed.image_url == "https://cdn.example.com/a.png"
+    assert parsed.description == "a cat"
+    assert parsed.source == "CodexHub Image MCP"
+
+    text = ToolMessage(content=[{"type": "text", "text": "Saved to https://storage.googleapis.com/b/c.webp."}], tool_call_id="call_2")
+    parsed = parse_image_tool_output(text, "a dog")
+    assert parsed.image_url == "https://storage.googleapis.com/b/c.webp"
+    assert parsed.source == "CodexHub Image MCP (Google Cloud Storage)"
+
+    assert parse_image_tool_output(ToolMessage(content="quota exceeded", tool_call_id="call_3"), "x") is None
+
+
+def test_generate_caches_by_normalized_prompt(fake_mcp, fake_llm, api_client):
+    first = api_client.post("/api/images/generate", json={"prompt": "A red fox in snow"}).json()
+    assert first["success"], first
+    assert first["image_url"].startswith("https://storage.googleapis.com/")
+    assert first["cached"] is False
+    # The tool result is parsed directly; no follow-up LLM call summarizes it
+    assert len(fake_llm.requests) == 1
+
+    second = api_client.post("/api/images/generate", json={"prompt": "a red fox   in snow."}).json()
+    assert second["cached"] is True
+    assert second["image_url"] == first["image_url"]
+    assert len(fake_mcp.calls) == 1
+
+    fresh = api_client.post("/api/images/generate", json={"prompt": "A red fox in snow", "use_cache": False}).json()
+    assert fresh["cached"] is False
+    assert len(fake_mcp.calls) == 2
+
+
+def test_generate_can_store_photo(fake_mcp, api_client):
+    missing_category = api_client.post("/api/images/generate", json={"prompt": "A lake", "store": True})
+    assert missing_category.status_code == 400
+
+    response = api_client.post(
+        "/api/images/generate",
+        json={"prompt": "A lake at dawn", "store": True, "title": "Dawn Lake", "category": "landscape"},
+    ).json()
+    assert response["photo"]["title"] == "Dawn Lake"
+    assert response["photo"]["imageData"] == response["image_url"]
+
+    photos = api_client.get("/api/photos", params={"category": "landscape"}).json()
+    assert [photo["id"] for photo in photos] == [response["photo"]["id"]]
+
+
+def test_batch_generates_concurrently_and_dedupes(fake_mcp, api_client):
+    items = [{"prompt": p} for p in ("City at night", "city at night!", "Forest trail", "Desert dunes")]
+    response = api_client.post("/api/images/generate/batch", json={"items": items, "concurrency": 3}).json()
+    assert response["succeeded"] == 4
+    assert response["results"][0]["image_url"] == response["results"][1]["image_url"]
+    assert len(fake_mcp.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_waiter_takes_over_when_leader_is_cancelled():
+    import asyncio
+
+    from ai_agents.agents import ImageGenerationResult
+    from images import ImageService
+
+    class SlowAgent:
+        calls = 0
+
+        async def generate_image_structured(self, prompt):
+            SlowAgent.calls += 1
+            if SlowAgent.calls == 1:
+                await asyncio.sleep(10)
+            return ImageGenerationResult(image_url="https://cdn.example.com/a.png", description=prompt, source="mcp", success=True)
+
+    service = ImageService(SlowAgent)
+    leader = asyncio.create_task(service.generate("a cat"))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(service.generate("A cat!"))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    result, cached = await asyncio.wait_for(follower, timeout=2)
+    assert leader.cancelled()
+    assert result["success"] and not cached
+    assert SlowAgent.calls == 2 and not service._inflight
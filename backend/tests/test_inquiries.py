@@ -0,0 +1,112 @@
+"""Inquiry inbox tests: status filter and updates, incremental fetch, out-of-order writes, long polling and SSE."""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from inquiries import InquiryInbox
+
+
+def _submit(api_client, index: int):
+    response = api_client.post(
+        "/api/contact", json={"name": f"Client {index}", "email": f"c{index}@example.com", "message": "Hello"}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_status_filter_update_and_since(api_client):
+    first, second, third = (_submit(api_client, index) for index in range(3))
+    assert first["status"] == "new" and first["version"] < second["version"] < third["version"]
+
+    updated = api_client.put(f"/api/contact/inquiries/{second['id']}", json={"status": "contacted"}).json()
+    assert updated["status"] == "contacted" and updated["version"] > third["version"]
+    assert api_client.put(f"/api/contact/inquiries/{second['id']}", json={"status": "spam"}).status_code == 400
+    assert api_client.put("/api/contact/inquiries/missing", json={"status": "closed"}).status_code == 404
+
+    assert [i["id"] for i in api_client.get("/api/contact/inquiries").json()] == [third["id"], second["id"], first["id"]]
+    contacted = api_client.get("/api/contact/inquiries", params={"status": "contacted"}).json()
+    assert [i["id"] for i in contacted] == [second["id"]]
+    assert api_client.get("/api/contact/inquiries", params={"status": "bogus"}).status_code == 400
+
+    # Only what changed after the cursor, oldest change first
+    changes = api_client.get("/api/contact/inquiries", params={"since": first["version"]}).json()
+    assert [i["id"] for i in changes] == [third["id"], second["id"]]
+    assert api_client.get("/api/contact/inquiries", params={"since": updated["version"]}).json() == []
+
+
+@pytest.mark.asyncio
+async def test_changes_wait_for_a_write_that_started_earlier():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["inbox"]
+    inbox = InquiryInbox(db)
+    await inbox.ensure_indexes()
+
+    # The first inquiry takes its version, then a second one is stamped and inserted before it lands
+    async with inbox.stamp({"id": "slow", "status": "new"}) as slow:
+        async with inbox.stamp({"id": "fast", "status": "new"}) as fast:
+            await db.contact_inquiries.insert_one(dict(fast))
+        assert slow["version"] < fast["version"]
+        # A client reading now must not get (and move its cursor to) the later version
+        assert await inbox.changes(0) == []
+        assert await inbox.current_version() == slow["version"] - 1
+        await db.contact_inquiries.insert_one(dict(slow))
+
+    assert [doc["id"] for doc in await inbox.changes(0)] == ["slow", "fast"]
+    assert await inbox.current_version() == fast["version"]
+
+    # A reservation left behind by a crashed writer stops holding readers back after the lease
+    inbox.lease = 0.05
+    async with inbox.stamp({"id": "lost", "status": "new"}):
+        await inbox.set_status("fast", "closed")
+        await asyncio.sleep(0.1)
+        assert [doc["id"] for doc in await inbox.changes(fast["version"])] == ["fast"]
+
+
+def test_long_poll_returns_when_an_inquiry_arrives(api_client):
+    cursor = _submit(api_client, 0)["version"]
+    result = {}
+
+    def poll():
+        started = time.monotonic()
+        result["body"] = api_client.get("/api/contact/inquiries", params={"since": cursor, "wait": 10}).json()
+        result["elapsed"] = time.monotonic() - started
+
+    waiter = threading.Thread(target=poll)
+    waiter.start()
+    time.sleep(0.3)
+    created = _submit(api_client, 1)
+    waiter.join(timeout=10)
+
+    assert [i["id"] for i in result["body"]] == [created["id"]]
+    assert result["elapsed"] < 5
+
+
+def test_stream_sends_changes_as_events(api_client, monkeypatch):
+    monkeypatch.setenv("INQUIRY_STREAM_HEARTBEAT", "0.2")
+    monkeypatch.setenv("INQUIRY_STREAM_SECONDS", "0.5")
+    first = _submit(api_client, 0)
+
+    with api_client.stream("GET", "/api/contact/inquiries/stream", params={"since": 0}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        lines = response.iter_lines()
+        event = {}
+        for line in lines:
+            if not line:
+                if "data" in event:
+                    break
+                continue
+            field, _, value = line.partition(": ")
+            event[field] = value
+
+    assert event["event"] == "inquiry" and event["id"] == str(first["version"])
+    assert json.loads(event["data"])["id"] == first["id"]
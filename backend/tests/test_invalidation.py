@@ -0,0 +1,114 @@
+"""Cross-worker cache invalidation tests (polling fallback and change streams)."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from invalidation import AUTO, CHANGE_STREAM, POLL, ContentWatcher
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class _FakeStream:
+    def __init__(self, events):
+        self._events = list(events)
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._events:
+            await asyncio.sleep(3600)
+        event = self._events.pop(0)
+        self.resume_token = {"_data": len(self._events)}
+        return event
+
+
+class _ReplicaSetDB:
+    # A database whose watch() works, wrapping mongomock for everything else
+    def __init__(self, db, events):
+        self._db = db
+        self.events = events
+        self.pipelines = []
+
+    def __getitem__(self, name):
+        return self._db[name]
+
+    def watch(self, pipeline, resume_after=None):
+        self.pipelines.append(pipeline)
+        return _FakeStream(self.events)
+
+
+@pytest.mark.asyncio
+async def test_polling_propagates_writes_between_workers():
+    db = mongomock_motor.AsyncMongoMockClient()["invalidation"]
+    seen_a, seen_b = [], []
+    worker_a = ContentWatcher(db, mode=POLL, poll_interval=0.02)
+    worker_b = ContentWatcher(db, mode=POLL, poll_interval=0.02)
+    worker_a.subscribe(seen_a.append)
+    worker_b.subscribe(seen_b.append)
+    await worker_a.start()
+    await worker_b.start()
+    try:
+        await worker_a.bump("photos")
+        await worker_a.bump("about")
+        await asyncio.sleep(0.15)
+        assert sorted(seen_b) == ["about", "photos"]
+        # The writer invalidated its own caches already
+        assert seen_a == []
+    finally:
+        await worker_a.stop()
+        await worker_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_auto_mode_falls_back_to_polling_without_change_streams():
+    db = mongomock_motor.AsyncMongoMockClient()["invalidation"]
+    watcher = ContentWatcher(db, mode=AUTO, poll_interval=0.02)
+    await watcher.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert watcher.active_mode == POLL
+    finally:
+        await watcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_change_stream_broadcasts_watched_collections():
+    db = _ReplicaSetDB(
+        mongomock_motor.AsyncMongoMockClient()["invalidation"],
+        [{"ns": {"db": "invalidation", "coll": "testimonials"}}, {"ns": {"db": "invalidation", "coll": "photos"}}],
+    )
+    seen = []
+    watcher = ContentWatcher(db, mode=AUTO)
+    watcher.subscribe(seen.append)
+    await watcher.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert watcher.active_mode == CHANGE_STREAM
+        assert seen == ["testimonials", "photos"]
+        assert db.pipelines[0] == [{"$match": {"ns.coll": {"$in": ["photos", "testimonials", "about"]}}}]
+    finally:
+        await watcher.stop()
+
+
+def test_api_write_invalidates_cached_response(api_client):
+    from server import app
+
+    api_client.get("/api/testimonials")
+    api_client.post("/api/testimonials", json={"clientName": "Sam", "testimonialText": "Great", "rating": 5})
+    assert app.state.response_cache.snapshot()["entries"] == 0
+    assert len(api_client.get("/api/testimonials").json()) == 1
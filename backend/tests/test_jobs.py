@@ -0,0 +1,138 @@
+"""Job queue tests against an in-memory MongoDB."""
+
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from jobs import CANCELLED, FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def _collection():
+    return mongomock_motor.AsyncMongoMockClient()["test"].jobs
+
+
+async def _wait_for(queue, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_and_stores_result():
+    async def echo(payload):
+        return {"echo": payload["value"]}
+
+    queue = JobQueue(_collection(), {"echo": echo}, workers=2, poll_interval=0.05)
+    await queue.start()
+    try:
+        job = await queue.enqueue("echo", {"value": 42})
+        done = await _wait_for(queue, job["id"], (SUCCEEDED,))
+    finally:
+        await queue.stop()
+    assert done["result"] == {"echo": 42}
+    assert done["attempts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_job_is_retried_then_failed():
+    calls = []
+
+    async def flaky(payload):
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    queue = JobQueue(_collection(), {"flaky": flaky}, workers=1, poll_interval=0.02, retry_base_delay=0.01)
+    await queue.start()
+    try:
+        job = await queue.enqueue("flaky", {}, max_attempts=3)
+        done = await _wait_for(queue, job["id"], (FAILED,))
+    finally:
+        await queue.stop()
+    assert len(calls) == 3
+    assert done["error"] == "upstream down"
+
+
+@pytest.mark.asyncio
+async def test_running_job_can_be_cancelled():
+    started = asyncio.Event()
+
+    async def slow(payload):
+        started.set()
+        await asyncio.sleep(30)
+
+    queue = JobQueue(_collection(), {"slow": slow}, workers=1, poll_interval=0.02)
+    await queue.start()
+    try:
+        job = await queue.enqueue("slow", {})
+        await asyncio.wait_for(started.wait(), 5)
+        cancelled = await queue.cancel(job["id"])
+        assert cancelled["status"] == CANCELLED
+        await asyncio.sleep(0.05)
+        assert not queue._running
+    finally:
+        await queue.stop()
+    assert (await queue.get(job["id"]))["status"] == CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed_after_restart():
+    collection = _collection()
+
+    async def work(payload):
+        return "done"
+
+    # A previous server claimed the job and died without finishing it
+    crashed = JobQueue(collection, {"work": work}, workers=0)
+    job = await crashed.enqueue("work", {})
+    past = datetime.now(timezone.utc) - timedelta(seconds=5)
+    await collection.update_one(
+        {"id": job["id"]},
+        {"$set": {"status": RUNNING, "workerId": "dead-worker", "leaseExpiresAt": past, "attempts": 1}},
+    )
+
+    queue = JobQueue(collection, {"work": work}, workers=1, poll_interval=0.02)
+    await queue.start()
+    try:
+        done = await _wait_for(queue, job["id"], (SUCCEEDED,))
+    finally:
+        await queue.stop()
+    assert done["workerId"] == queue.worker_id
+    assert done["attempts"] == 2
+
+
+def test_jobs_api_round_trip(api_client):
+    response = api_client.post("/api/jobs", json={"kind": "chat", "payload": {"message": "hi"}})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == QUEUED
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = api_client.get(f"/api/jobs/{job['id']}").json()
+        if job["status"] == SUCCEEDED:
+            break
+        time.sleep(0.05)
+    assert job["status"] == SUCCEEDED
+    assert job["result"]["content"] == "echo: hi"
+
+    assert api_client.post("/api/jobs", json={"kind": "nope"}).status_code == 400
+    assert api_client.post("/api/jobs", json={"kind": "captions", "payload": {"runId": "r1"}}).status_code == 400
+    missing = api_client.post("/api/jobs", json={"kind": "search", "payload": {"q": "cats"}})
+    assert missing.status_code == 400 and "query" in missing.json()["detail"]
+    bad_attempts = {"kind": "chat", "payload": {"message": "hi"}, "maxAttempts": 0}
+    assert api_client.post("/api/jobs", json=bad_attempts).status_code == 422
+    assert api_client.get("/api/jobs/missing").status_code == 404
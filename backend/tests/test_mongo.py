@@ -0,0 +1,63 @@
+"""MongoDB client settings, public read preference and pool metrics."""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pymongo import ReadPreference
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from metrics import Metrics
+from mongo import MongoSettings, PoolMetrics, client_options, public_database
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("MONGO_MAX_POOL_SIZE", "50")
+    monkeypatch.setenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "3000")
+    monkeypatch.setenv("MONGO_COMPRESSORS", "zstd,zlib")
+    monkeypatch.setenv("MONGO_PUBLIC_READ_PREFERENCE", "secondaryPreferred")
+    monkeypatch.setenv("MONGO_PUBLIC_MAX_STALENESS_SECONDS", "120")
+    settings = MongoSettings.from_env()
+
+    assert settings.client_kwargs() == {
+        "maxPoolSize": 50,
+        "serverSelectionTimeoutMS": 3000,
+        "compressors": "zstd,zlib",
+    }
+    read_pref = settings.public_read_pref()
+    assert read_pref.mongos_mode == "secondaryPreferred" and read_pref.max_staleness == 120
+    assert isinstance(client_options(settings)["event_listeners"][0], PoolMetrics)
+
+    with pytest.raises(ValueError):
+        MongoSettings(public_read_preference="closest").public_read_pref()
+
+
+def test_public_database_routes_reads():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient()["public"]
+    assert public_database(db, MongoSettings()) is db
+    public = public_database(db, MongoSettings(public_read_preference="secondaryPreferred"))
+    assert public.read_preference == ReadPreference.SECONDARY_PREFERRED
+
+
+def test_pool_metrics_track_checkouts():
+    registry = Metrics()
+    listener = PoolMetrics(registry, max_pool_size=10)
+    event = SimpleNamespace(reason="timeout")
+    for _ in range(2):
+        listener.connection_created(event)
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+    listener.connection_checked_in(event)
+    listener.connection_check_out_started(event)
+    listener.connection_check_out_failed(event)
+
+    gauges = registry.snapshot()["gauges"]
+    assert gauges == {"mongo.pool.in_use": 1, "mongo.pool.max_size": 10, "mongo.pool.open": 2}
+    assert registry.counter("mongo.pool.checkouts") == 2
+    assert registry.counter("mongo.pool.checkout_failures.timeout") == 1
+    assert registry.histogram("mongo.pool.checkout_seconds").count == 3
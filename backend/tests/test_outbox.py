@@ -0,0 +1,97 @@
+"""Notification outbox tests: enqueue with the inquiry, batched delivery, retries."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from outbox import DELIVERED, FAILED, PENDING, FileSink, NotificationOutbox, SmtpSink
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class FlakySink:
+    name = "flaky"
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.batches = []
+
+    async def send(self, notifications):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sink down")
+        self.batches.append([notification["payload"]["id"] for notification in notifications])
+
+
+def _inquiry(index: int):
+    return {"id": f"inq-{index}", "name": f"Client {index}", "email": f"c{index}@example.com", "message": "Hi"}
+
+
+@pytest.mark.asyncio
+async def test_outbox_batches_and_retries():
+    db = mongomock_motor.AsyncMongoMockClient()["outbox"]
+    sink = FlakySink(failures=1)
+    outbox = NotificationOutbox(db, sink, batch_size=2, retry_base_delay=0, max_attempts=2)
+    await outbox.ensure_indexes()
+
+    for index in range(3):
+        await outbox.add_inquiry(db.contact_inquiries, _inquiry(index))
+    assert outbox.transactions is False
+    assert await db.contact_inquiries.count_documents({}) == 3
+    assert await db.notification_outbox.count_documents({"status": PENDING}) == 3
+
+    assert await outbox.dispatch_once() == 2  # first batch fails and goes back to pending
+    assert sink.batches == []
+    while await outbox.dispatch_once():
+        pass
+    assert sorted(sum(sink.batches, [])) == ["inq-0", "inq-1", "inq-2"]
+    assert all(len(batch) <= 2 for batch in sink.batches)
+    stats = await outbox.stats()
+    assert stats["counts"][DELIVERED] == 3 and stats["lastError"] is None
+
+    # A sink that stays down marks records failed after max_attempts
+    outbox.sink = FlakySink(failures=10)
+    await outbox.add_inquiry(db.contact_inquiries, _inquiry(9))
+    while await outbox.dispatch_once():
+        pass
+    assert (await outbox.stats())["counts"][FAILED] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_inquiry_insert_leaves_no_notification():
+    db = mongomock_motor.AsyncMongoMockClient()["outbox"]
+    outbox = NotificationOutbox(db, FlakySink(0))
+    await db.contact_inquiries.create_index("id", unique=True)
+    await outbox.add_inquiry(db.contact_inquiries, _inquiry(1))
+    with pytest.raises(Exception):
+        await outbox.add_inquiry(db.contact_inquiries, _inquiry(1))
+    assert await db.notification_outbox.count_documents({}) == 1
+
+
+def test_smtp_digest_message():
+    sink = SmtpSink("localhost", 25, sender="site@example.com", recipients=["me@example.com"])
+    single = sink._message([{"payload": {**_inquiry(1), "phone": "555"}}])
+    assert single["Subject"] == "New inquiry from Client 1" and single["Reply-To"] == "c1@example.com"
+    assert "Phone: 555" in single.get_content()
+    assert sink._message([{"payload": _inquiry(1)}, {"payload": _inquiry(2)}])["Subject"] == "2 new inquiries"
+
+
+def test_contact_inquiry_is_delivered_to_file_sink(api_client, tmp_path):
+    path = tmp_path / "notifications.jsonl"
+    outbox = api_client.app.state.outbox
+    outbox.sink = FileSink(str(path))
+
+    response = api_client.post("/api/contact", json={"name": "Ana", "email": "ana@example.com", "message": "Hello"})
+    assert response.status_code == 200
+    api_client.portal.call(outbox.dispatch_once)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["payload"]["id"] for line in lines] == [response.json()["id"]]
+    stats = api_client.get("/api/admin/notifications").json()
+    assert stats["sink"] == "file" and stats["counts"]["delivered"] == 1
@@ -0,0 +1,93 @@
+"""Photo search query construction tests."""
+
+import sys
+from pathlib import Path
+
+import pytest
+from pymongo.errors import OperationFailure
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from photo_search import PhotoSearch
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class _TextCursor:
+    def __init__(self, calls, hits):
+        self.calls, self.hits = calls, hits
+
+    def sort(self, keys):
+        self.calls["sort"] = keys
+        return self
+
+    def skip(self, count):
+        self.calls["skip"] = count
+        return self
+
+    def limit(self, count):
+        self.calls["limit"] = count
+        return self
+
+    async def to_list(self, length):
+        return self.hits
+
+
+class _TextCollection:
+    # Records the $text query a real server would run
+    def __init__(self, hits):
+        self.calls, self.hits = {}, hits
+
+    def find(self, query, projection):
+        self.calls.update(query=query, projection=projection)
+        return _TextCursor(self.calls, self.hits)
+
+    async def count_documents(self, query):
+        return 42
+
+
+@pytest.mark.asyncio
+async def test_text_search_sorts_by_score_and_projects_light_fields():
+    collection = _TextCollection([{"id": "a", "score": 3.5}])
+    search = PhotoSearch(collection, {"_id": 0, "id": 1, "title": 1})
+    total, hits = await search.search("harbour fog", category="landscape", skip=20, limit=10)
+
+    assert (total, hits) == (42, [{"id": "a", "score": 3.5}])
+    assert collection.calls["query"] == {"$text": {"$search": "harbour fog"}, "category": "landscape"}
+    assert collection.calls["projection"] == {"_id": 0, "id": 1, "title": 1, "score": {"$meta": "textScore"}}
+    assert collection.calls["sort"][0] == ("score", {"$meta": "textScore"})
+    assert (collection.calls["skip"], collection.calls["limit"]) == (20, 10)
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_scoring_when_text_search_is_rejected():
+    collection = mongomock_motor.AsyncMongoMockClient()["search"]["photos"]
+    await collection.insert_many([
+        {"id": "a", "title": "Pier", "description": "harbour lights", "tags": []},
+        {"id": "b", "title": "Harbour", "description": "", "tags": ["night"]},
+    ])
+    search = PhotoSearch(collection, {"_id": 0, "id": 1, "title": 1, "description": 1, "tags": 1})
+
+    async def rejected(*args):
+        raise OperationFailure("text index required for $text query", code=27)
+
+    search._text_search = rejected
+    total, hits = await search.search("HARBOUR")
+    assert not search.text_supported
+    assert total == 2 and [hit["id"] for hit in hits] == ["b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_do_not_switch_to_scanning():
+    collection = mongomock_motor.AsyncMongoMockClient()["search"]["photos"]
+    search = PhotoSearch(collection, {"_id": 0, "id": 1})
+
+    async def failover(*args):
+        raise OperationFailure("not primary", code=10107)
+
+    search._text_search = failover
+    with pytest.raises(OperationFailure):
+        await search.search("harbour")
+    assert search.text_supported
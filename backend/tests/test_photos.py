@@ -0,0 +1,101 @@
+"""Photo gallery endpoint tests."""
+
+import base64
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+def _photo(title, category, featured=False, order=0):
+    return {"title": title, "category": category, "imageData": "data:x", "featured": featured, "order": order}
+
+
+def test_photo_facets_are_cached_until_photos_change(api_client):
+    empty = api_client.get("/api/photos/facets").json()
+    assert empty == {"total": 0, "featured": 0, "categories": [], "featuredIds": []}
+
+    late = api_client.post("/api/photos", json=_photo("Dusk", "landscape", featured=True, order=5)).json()
+    early = api_client.post("/api/photos", json=_photo("Dawn", "landscape", featured=True, order=1)).json()
+    api_client.post("/api/photos", json=_photo("Vows", "wedding"))
+    api_client.post("/api/photos", json=_photo("Peak", "landscape"))
+
+    facets = api_client.get("/api/photos/facets").json()
+    assert facets["total"] == 4 and facets["featured"] == 2
+    assert facets["categories"] == [
+        {"category": "landscape", "count": 3, "featured": 2},
+        {"category": "wedding", "count": 1, "featured": 0},
+    ]
+    assert facets["featuredIds"] == [early["id"], late["id"]]
+
+    cache = api_client.app.state.response_cache
+    hits = cache.hits
+    assert api_client.get("/api/photos/facets").json() == facets
+    assert cache.hits == hits + 1
+
+    api_client.put(f"/api/photos/{late['id']}", json={"featured": False})
+    facets = api_client.get("/api/photos/facets").json()
+    assert facets["featuredIds"] == [early["id"]]
+    assert facets["categories"][0] == {"category": "landscape", "count": 3, "featured": 1}
+
+
+def test_featured_facets_follow_the_gallery_order_on_ties(api_client):
+    db = api_client.app.state.db
+    # Same order and rank, inserted out of id order: only the id tie-breaker decides
+    photos = [{**_photo(name, "portrait", featured=True), "id": name, "rank": "m"} for name in "CAB"]
+    api_client.portal.call(db.photos.insert_many, photos)
+
+    gallery = [photo["id"] for photo in api_client.get("/api/photos").json()]
+    assert gallery == ["A", "B", "C"]
+    assert api_client.get("/api/photos/facets").json()["featuredIds"] == gallery
+
+
+def test_move_photo_places_it_between_neighbours(api_client):
+    ids = [api_client.post("/api/photos", json=_photo(name, "portrait")).json()["id"] for name in "ABCD"]
+
+    moved = api_client.post(f"/api/photos/{ids[3]}/move", json={"afterId": ids[0]})
+    assert moved.status_code == 200 and moved.json()["id"] == ids[3]
+    assert [photo["title"] for photo in api_client.get("/api/photos").json()] == ["A", "D", "B", "C"]
+
+    api_client.post(f"/api/photos/{ids[2]}/move", json={"beforeId": ids[0]})
+    assert [photo["title"] for photo in api_client.get("/api/photos").json()] == ["C", "A", "D", "B"]
+
+    assert api_client.post(f"/api/photos/{ids[0]}/move", json={}).status_code == 400
+    assert api_client.post(f"/api/photos/{ids[0]}/move", json={"afterId": "missing"}).status_code == 404
+    assert api_client.post("/api/photos/missing/move", json={"afterId": ids[0]}).status_code == 404
+
+
+def test_photo_size_is_computed_at_ingest(api_client):
+    from test_placeholders import _jpeg, _png
+
+    created = api_client.post("/api/photos", json=_photo("Wide", "landscape") | {
+        "imageData": "data:image/png;base64," + base64.b64encode(_png(1200, 800)).decode(),
+    }).json()
+    assert (created["width"], created["height"]) == (1200, 800)
+
+    updated = api_client.put(f"/api/photos/{created['id']}", json={
+        "imageData": "data:image/jpeg;base64," + base64.b64encode(_jpeg(600, 900)).decode(),
+    }).json()
+    assert (updated["width"], updated["height"]) == (600, 900)
+    listed = api_client.get("/api/photos").json()[0]
+    assert (listed["width"], listed["height"], listed["placeholder"]) == (600, 900, updated["placeholder"])
+
+
+def test_search_ranks_by_weighted_fields_and_paginates(api_client):
+    api_client.post("/api/photos", json=_photo("Harbour at dawn", "landscape") | {"description": "Boats and fog"})
+    api_client.post("/api/photos", json=_photo("Morning walk", "portrait") | {"tags": ["harbour", "fog"]})
+    api_client.post("/api/photos", json=_photo("Quay", "landscape") | {"description": "Old harbour wall"})
+    api_client.post("/api/photos", json=_photo("Vows", "wedding"))
+
+    body = api_client.get("/api/photos/search", params={"q": "harbour"}).json()
+    assert body["total"] == 3
+    assert [hit["title"] for hit in body["results"]] == ["Harbour at dawn", "Morning walk", "Quay"]
+    assert "imageData" not in body["results"][0] and body["results"][0]["score"] > body["results"][1]["score"]
+
+    page = api_client.get("/api/photos/search", params={"q": "harbour", "limit": 2, "page": 2}).json()
+    assert page["total"] == 3 and [hit["title"] for hit in page["results"]] == ["Quay"]
+    filtered = api_client.get("/api/photos/search", params={"q": "harbour fog", "category": "portrait"}).json()
+    assert [hit["title"] for hit in filtered["results"]] == ["Morning walk"]
+    assert api_client.get("/api/photos/search", params={"q": "  "}).status_code == 400
@@ -0,0 +1,60 @@
+"""Image size and placeholder tests."""
+
+import base64
+import io
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from placeholders import PLACEHOLDER_SIZE, describe_image, image_size, parse_data_uri
+
+
+def _png(width, height):
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + header + struct.pack(">I", zlib.crc32(b"IHDR" + header))
+
+
+def _jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + bytes(9)
+    sof2 = b"\xff\xc2" + struct.pack(">HBHH", 11, 8, height, width) + bytes(6)
+    return b"\xff\xd8" + app0 + sof2 + b"\xff\xd9"
+
+
+def test_image_size_reads_common_headers():
+    assert image_size(_png(640, 480)) == (640, 480)
+    assert image_size(_jpeg(1920, 1080)) == (1920, 1080)
+    assert image_size(b"GIF89a" + struct.pack("<HH", 32, 16)) == (32, 16)
+    vp8x = b"RIFF" + bytes(4) + b"WEBPVP8X" + bytes(8) + (2999).to_bytes(3, "little") + (1999).to_bytes(3, "little")
+    assert image_size(vp8x) == (3000, 2000)
+    assert image_size(b"\x89PNG\r\n\x1a\n") is None
+    assert image_size(b"not an image") is None
+
+
+def test_describe_image_only_handles_data_uris():
+    uri = "data:image/png;base64," + base64.b64encode(_png(800, 600)).decode()
+    assert parse_data_uri(uri)[0] == "image/png"
+    fields = describe_image(uri)
+    assert (fields["width"], fields["height"]) == (800, 600)
+    assert describe_image("https://cdn.example.com/a.jpg") == {"width": None, "height": None, "placeholder": ""}
+    assert describe_image("data:image/png;base64,@@@")["width"] is None
+
+
+def test_describe_image_builds_jpeg_placeholder():
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 200), (200, 40, 40)).save(buffer, format="PNG")
+    fields = describe_image("data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode())
+
+    assert (fields["width"], fields["height"]) == (300, 200)
+    mime, data = parse_data_uri(fields["placeholder"])
+    assert mime == "image/jpeg"
+    with Image.open(io.BytesIO(data)) as preview:
+        assert preview.format == "JPEG"
+        assert max(preview.size) == PLACEHOLDER_SIZE
@@ -0,0 +1,84 @@
+"""Fractional rank key tests."""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ranking import RANK_SORT, RankedCollection, key_between, spread_keys
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_keys_stay_ordered_under_random_inserts():
+    rng = random.Random(7)
+    keys = spread_keys(10)
+    assert keys == sorted(keys) and len(set(keys)) == 10 and max(map(len, keys)) == 1
+    for _ in range(2000):
+        position = rng.randrange(len(keys) + 1)
+        low = keys[position - 1] if position else None
+        high = keys[position] if position < len(keys) else None
+        keys.insert(position, key_between(low, high))
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+    assert not any(key.endswith("0") for key in keys)
+    with pytest.raises(ValueError):
+        key_between("b", "a")
+
+
+@pytest.mark.asyncio
+async def test_move_rewrites_one_document_and_rebalances_long_keys():
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["photos"]
+    # Legacy documents without rank keys
+    await collection.insert_many([{"id": str(i), "order": 0, "createdAt": i} for i in range(5)])
+    rebalanced = []
+
+    async def on_rebalance():
+        rebalanced.append(True)
+
+    ranks = RankedCollection(collection, max_length=3, on_rebalance=on_rebalance)
+    await ranks.ensure_indexes()
+    assert rebalanced
+
+    async def sequence():
+        return [doc["id"] async for doc in collection.find({}, {"id": 1}).sort(RANK_SORT)]
+
+    assert await sequence() == ["0", "1", "2", "3", "4"]
+    before = {doc["id"]: doc["rank"] async for doc in collection.find()}
+    await ranks.move("4", before_id="0")
+    after = {doc["id"]: doc["rank"] async for doc in collection.find()}
+    assert await sequence() == ["4", "0", "1", "2", "3"]
+    assert [key for key in after if after[key] != before[key]] == ["4"]
+
+    # Keep squeezing into the same gap until a key passes max_length
+    rebalanced.clear()
+    for _ in range(15):
+        await ranks.move("2", after_id="4")
+        await ranks.move("3", after_id="4")
+    await ranks.stop()
+    assert rebalanced
+    assert max([len(doc["rank"]) async for doc in collection.find()]) <= 3
+    assert await sequence() == ["4", "3", "2", "0", "1"]
+
+
+@pytest.mark.asyncio
+async def test_startup_assigns_missing_keys_without_rewriting_and_ties_break_by_id():
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["photos"]
+    await collection.insert_many([
+        {"id": "b", "order": 0, "rank": "V", "createdAt": 5},
+        {"id": "a", "order": 0, "rank": "V", "createdAt": 6},  # same key from a concurrent append
+        {"id": "old2", "order": 0, "createdAt": 2},
+        {"id": "old1", "order": 0, "createdAt": 1},
+    ])
+    ranks = RankedCollection(collection)
+    await ranks.ensure_indexes()
+    await ranks.ensure_indexes()  # a second worker starting up changes nothing
+
+    docs = {doc["id"]: doc["rank"] async for doc in collection.find()}
+    assert docs["a"] == docs["b"] == "V"
+    sequence = [doc["id"] async for doc in collection.find({}, {"id": 1}).sort(RANK_SORT)]
+    assert sequence == ["old1", "old2", "a", "b"]
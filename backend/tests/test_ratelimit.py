@@ -0,0 +1,117 @@
+"""Rate limiter and duplicate filter tests (memory and in-memory MongoDB backends)."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from datetime import datetime, timezone
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ratelimit import DuplicateFilter, Limit, MemoryBuckets, MongoBuckets, submission_fingerprint
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "mongo"])
+async def test_bucket_allows_burst_then_refills(backend):
+    if backend == "mongo":
+        buckets = MongoBuckets(mongomock_motor.AsyncMongoMockClient()["limits"]["rate_limits"])
+        await buckets.ensure_indexes()
+    else:
+        buckets = MemoryBuckets()
+    limit = Limit(3, 30)  # one token every 10 seconds
+    # A real epoch time, since the in-memory database honours the TTL index
+    now = time.time()
+
+    results = [await buckets.take("chat:1.2.3.4", limit, now) for _ in range(4)]
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == pytest.approx(10.0)
+    assert (await buckets.take("chat:5.6.7.8", limit, now))[0]
+
+    assert not (await buckets.take("chat:1.2.3.4", limit, now + 5))[0]
+    assert (await buckets.take("chat:1.2.3.4", limit, now + 10))[0]
+    assert not (await buckets.take("chat:1.2.3.4", limit, now + 10))[0]
+
+
+@pytest.mark.asyncio
+async def test_shared_bucket_never_overspends_under_concurrency():
+    collection = mongomock_motor.AsyncMongoMockClient()["limits"]["rate_limits"]
+    workers = [MongoBuckets(collection) for _ in range(4)]
+    limit = Limit(5, 60)
+
+    now = time.time()
+    results = await asyncio.gather(*(workers[i % 4].take("contact:ip", limit, now) for i in range(12)))
+    assert sum(allowed for allowed, _ in results) == 5
+
+
+@pytest.mark.asyncio
+async def test_duplicate_filter_window():
+    db = mongomock_motor.AsyncMongoMockClient()["limits"]
+    fingerprint = submission_fingerprint(" Ana@Example.com", "Hello,\n  do you shoot weddings?")
+    assert fingerprint == submission_fingerprint("ana@example.com", "hello, do you shoot   weddings?")
+
+    for duplicates in (DuplicateFilter(window=60), DuplicateFilter(window=60, collection=db.fingerprints)):
+        await duplicates.ensure_indexes()
+        assert not await duplicates.seen(fingerprint)
+        assert await duplicates.seen(fingerprint)
+        await duplicates.forget(fingerprint)
+        assert not await duplicates.seen(fingerprint)
+
+    # An expired entry the TTL monitor hasn't removed yet doesn't count
+    await db.fingerprints.update_one({"_id": fingerprint}, {"$set": {"expiresAt": datetime(2000, 1, 1, tzinfo=timezone.utc)}})
+    assert not await DuplicateFilter(window=60, collection=db.fingerprints).seen(fingerprint)
+
+
+def test_contact_rejects_duplicates_and_floods(api_client):
+    inquiry = {"name": "Ana", "email": "ana@example.com", "message": "Do you shoot weddings?"}
+    assert api_client.post("/api/contact", json=inquiry).status_code == 200
+    assert api_client.post("/api/contact", json={**inquiry, "message": "do you shoot  weddings?"}).status_code == 409
+
+    statuses = [
+        api_client.post("/api/contact", json={**inquiry, "message": f"Question {index}"}).status_code
+        for index in range(5)
+    ]
+    assert statuses == [200, 200, 200, 429, 429]
+    response = api_client.post("/api/contact", json={**inquiry, "message": "one more"})
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) > 0
+    assert len(api_client.get("/api/contact/inquiries").json()) == 4
+
+
+def test_chat_is_rate_limited_per_client(api_client):
+    limiter = api_client.app.state.rate_limiter
+    limiter.limits["chat"] = Limit(2, 60)
+
+    assert [api_client.post("/api/chat", json={"message": "hi"}).status_code for _ in range(3)] == [200, 200, 429]
+    limiter.trusted_proxies = 1
+    other = api_client.post("/api/chat", json={"message": "hi"}, headers={"X-Forwarded-For": "198.51.100.7, 203.0.113.9"})
+    assert other.status_code == 200
+    assert limiter.rejected == {"chat": 1}
+    # The proxy appends the real peer; a rotated leftmost value doesn't buy a fresh bucket
+    for spoofed in ("192.0.2.1", "192.0.2.2"):
+        again = api_client.post("/api/chat", json={"message": "hi"}, headers={"X-Forwarded-For": f"{spoofed}, 203.0.113.9"})
+        assert again.status_code == (200 if spoofed == "192.0.2.1" else 429)
+
+
+def test_jobs_and_image_batches_spend_route_buckets(api_client):
+    limiter = api_client.app.state.rate_limiter
+    limiter.limits["search"] = Limit(1, 60)
+    limiter.limits["image"] = Limit(3, 60)
+
+    job = {"kind": "search", "payload": {"query": "cats"}}
+    assert [api_client.post("/api/jobs", json=job).status_code for _ in range(2)] == [202, 429]
+
+    items = [{"prompt": f"cat {index}", "use_cache": False} for index in range(3)]
+    assert api_client.post("/api/images/generate", json={"prompt": "dog", "use_cache": False}).status_code == 200
+    assert api_client.post("/api/images/generate/batch", json={"items": items}).status_code == 429
+
+    # Larger than the bucket: rejected outright instead of spending a capped cost
+    items.append({"prompt": "cat 3", "use_cache": False})
+    assert api_client.post("/api/images/generate/batch", json={"items": items}).status_code == 413
+    items = [{"prompt": f"cat {index}"} for index in range(11)]
+    assert api_client.post("/api/images/generate/batch", json={"items": items}).status_code == 422
@@ -0,0 +1,173 @@
+"""Resilience layer tests against local fake LLM and MCP servers."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ai_agents import AgentConfig, ChatAgent, SearchAgent
+from ai_agents.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgePolicy,
+    ResilienceSettings,
+    RetryPolicy,
+    Upstream,
+    upstreams,
+)
+from fakes import FakeLLMServer, FakeMCPServer, _free_port
+
+
+FAST_SETTINGS = ResilienceSettings(
+    retry_attempts=3,
+    retry_base_delay=0.01,
+    retry_max_delay=0.05,
+    breaker_failure_threshold=2,
+    breaker_recovery_timeout=60,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registry():
+    upstreams.clear()
+    yield
+    upstreams.clear()
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.1, max_delay=0.5)
+    for retry_number in range(6):
+        delays = {policy.backoff(retry_number) for _ in range(50)}
+        assert all(0 <= d <= min(0.5, 0.1 * 2 ** retry_number) for d in delays)
+        assert len(delays) > 1
+
+
+def test_breaker_opens_then_half_opens_and_closes():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10, clock=lambda: now[0])
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    # Only one probe at a time while half-open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_upstream_retries_connect_errors_only():
+    upstream = Upstream("unit", CircuitBreaker("unit", failure_threshold=10), RetryPolicy(3, 0.001, 0.002))
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise httpx.ConnectError("refused")
+        return "ok"
+
+    assert await upstream.call(flaky) == "ok"
+    assert len(calls) == 3
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    async def rejected():
+        calls.append(1)
+        raise BadRequest()
+
+    calls.clear()
+    with pytest.raises(BadRequest):
+        await upstream.call(rejected)
+    assert len(calls) == 1
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_primary():
+    upstream = Upstream(
+        "hedge",
+        CircuitBreaker("hedge"),
+        RetryPolicy(1),
+        HedgePolicy(percentile=95, min_samples=5, min_delay=0.01),
+    )
+    for _ in range(10):
+        upstream.latency.record(0.01)
+
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        await asyncio.sleep(5 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+
+    started = time.monotonic()
+    assert await upstream.call(operation) == 2
+    assert time.monotonic() - started < 1
+    assert upstream.hedges == 1
+
+
+@pytest.mark.asyncio
+async def test_agent_retries_through_fake_llm_failures():
+    settings = ResilienceSettings(retry_attempts=3, retry_base_delay=0.01, retry_max_delay=0.05)
+    with FakeLLMServer(failures=[503, 502]) as llm:
+        agent = ChatAgent(AgentConfig(api_base_url=llm.url, api_key="sk-test", model_name="fake", resilience=settings))
+        response = await agent.execute("hello", use_tools=False)
+
+    assert response.success, response.error
+    assert response.content == "echo: hello"
+    assert len(llm.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_when_llm_is_down():
+    base_url = f"http://127.0.0.1:{_free_port()}"
+    agent = ChatAgent(AgentConfig(api_base_url=base_url, api_key="sk-test", model_name="fake", resilience=FAST_SETTINGS))
+
+    first = await agent.execute("hello", use_tools=False)
+    assert not first.success
+
+    started = time.monotonic()
+    second = await agent.execute("hello again", use_tools=False)
+    assert not second.success
+    assert second.metadata["circuit_open"] == f"llm:{base_url}"
+    assert time.monotonic() - started < 0.1
+
+
+@pytest.mark.asyncio
+async def test_mcp_tools_load_and_breaker_guards_unreachable_server(monkeypatch):
+    monkeypatch.setenv("CODEXHUB_MCP_AUTH_TOKEN", "sk-test")
+    with FakeLLMServer() as llm, FakeMCPServer() as mcp:
+        monkeypatch.setenv("CODEXHUB_MCP_WEB_URL", mcp.mcp_url)
+        config = AgentConfig(api_base_url=llm.url, api_key="sk-test", model_name="fake", resilience=FAST_SETTINGS)
+        agent = SearchAgent(config)
+        response = await agent.execute("weather in Tokyo")
+
+    assert response.success, response.error
+    assert response.metadata["tools_used"]
+    assert mcp.calls
+
+    # Same server name, now unreachable: setup degrades to no tools and the breaker opens
+    upstreams.clear()
+    monkeypatch.setenv("CODEXHUB_MCP_WEB_URL", f"http://127.0.0.1:{_free_port()}/mcp")
+    down = SearchAgent(config)
+    await down.setup_web_search_mcp()
+    await down.setup_web_search_mcp()
+    assert down.mcp_tools == []
+    assert upstreams.snapshot()["mcp:web-search"]["state"] == CircuitBreaker.OPEN
@@ -0,0 +1,85 @@
+"""Model ladder routing: heuristics, escalation and metadata, against the fake LLM."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ai_agents import AgentConfig, ChatAgent, ModelRouter, ResilienceSettings, RoutingSettings, upstreams
+from fakes import FakeLLMServer
+
+LADDER = ["lite", "flash", "pro"]
+SETTINGS = ResilienceSettings(retry_attempts=1)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_upstreams():
+    upstreams.clear()
+    yield
+    upstreams.clear()
+
+
+def test_router_picks_rung_from_prompt_and_history():
+    router = ModelRouter(LADDER, RoutingSettings(simple_chars=40, complex_chars=200))
+
+    assert router.route("hi there!").tier == 0
+    assert router.route("x" * 100).tier == 1
+    assert router.route("x" * 300).tier == 2
+    decision = router.route("Compare these two lenses step by step")
+    assert decision.tier == 1 and decision.reason == "complex request"
+    history = [{"role": "user", "content": "q"}, {"role": "assistant", "content": "a"}] * 4
+    assert router.route("and then?", history).tier == 1
+
+    assert router.assess("Sure, here you go.") == (True, None)
+    assert router.assess("  ") == (False, "empty answer")
+    assert router.assess("I'm not sure, it depends.") == (False, "hedged answer")
+    assert router.assess("Half an answ", "length") == (False, "answer truncated")
+
+
+@pytest.mark.asyncio
+async def test_chat_agent_routes_cheap_and_escalates_on_doubt():
+    def reply(body):
+        if body["model"] == "lite" and "price" in body["messages"][-1]["content"]:
+            return "I'm not sure about that."
+        return f"{body['model']} says hi"
+
+    with FakeLLMServer(reply=reply) as llm:
+        config = AgentConfig(
+            api_base_url=llm.url, api_key="sk-test", model_name="pro", resilience=SETTINGS,
+            model_ladder=["lite", "flash"], routing=RoutingSettings(baseline_latency_ms=5000),
+        )
+        agent = ChatAgent(config)
+
+        simple = await agent.execute("hello!")
+        assert simple.content == "lite says hi"
+        routing = simple.metadata["routing"]
+        assert routing["model"] == "lite" and not routing["escalated"]
+        assert routing["estimated_savings_ms"] > 0
+
+        doubtful = await agent.execute("what is the price of a session?")
+        assert doubtful.content == "flash says hi"
+        routing = doubtful.metadata["routing"]
+        assert routing["escalated"] and [a["model"] for a in routing["attempts"]] == ["lite", "flash"]
+        assert routing["attempts"][0]["doubt"] == "hedged answer"
+
+        complex_turn = await agent.execute("Explain why this works, step by step: " + "x" * 400)
+        assert complex_turn.metadata["model"] == "pro"
+        assert complex_turn.metadata["routing"]["estimated_savings_ms"] == 0.0
+
+    assert [body["model"] for body in llm.requests] == ["lite", "lite", "flash", "pro"]
+
+
+@pytest.mark.asyncio
+async def test_chat_agent_without_ladder_uses_one_model():
+    with FakeLLMServer() as llm:
+        agent = ChatAgent(AgentConfig(
+            api_base_url=llm.url, api_key="sk-test", model_name="pro", resilience=SETTINGS, model_ladder=[],
+        ))
+        response = await agent.execute("hello", use_tools=False)
+
+    assert agent.router is None
+    assert response.metadata["model"] == "pro" and "routing" not in response.metadata
@@ -0,0 +1,58 @@
+"""Fast read-path serialization tests."""
+
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from serialization import FastJSONResponse, ModelReader
+
+
+def test_fast_response_matches_validated_encoding():
+    from server import Photo
+
+    docs = [
+        {"id": "a", "title": "Naive", "category": "portrait", "imageData": "data:x", "createdAt": datetime(2024, 5, 1, 12, 30)},
+        # Older documents may lack fields that gained defaults later
+        {"id": "b", "title": "Aware", "category": "wedding", "imageData": "https://x/y.jpg",
+         "createdAt": datetime(2024, 5, 2, 8, 0, 0, 123000, tzinfo=timezone.utc)},
+    ]
+    legacy = [json.loads(Photo(**doc).model_dump_json()) for doc in docs]
+    fast = json.loads(FastJSONResponse(ModelReader(Photo).read_all(docs)).body)
+    assert fast == legacy
+    assert fast[1]["createdAt"].endswith("Z")
+
+
+def test_reader_projection_and_defaults():
+    from server import Photo
+
+    reader = ModelReader(Photo)
+    assert reader.projection["_id"] == 0
+    assert set(reader.projection) - {"_id"} == set(Photo.model_fields)
+    doc = reader.read({"title": "Old", "category": "portrait", "imageData": "x"})
+    assert doc["description"] == "" and doc["featured"] is False and doc["order"] == 0
+    assert doc["id"] and doc["createdAt"]
+
+
+def test_list_endpoints_use_fast_path(api_client):
+    created = api_client.post(
+        "/api/photos", json={"title": "Pier", "category": "landscape", "imageData": "data:x", "order": 2}
+    ).json()
+    api_client.post("/api/photos", json={"title": "First", "category": "landscape", "imageData": "data:y", "order": 1})
+
+    response = api_client.get("/api/photos", params={"category": "landscape"})
+    assert response.headers["content-type"] == "application/json"
+    photos = response.json()
+    assert [photo["title"] for photo in photos] == ["First", "Pier"]
+    # Mongo round-trips datetimes as naive UTC with millisecond precision
+    assert {k: v for k, v in photos[1].items() if k != "createdAt"} == {k: v for k, v in created.items() if k != "createdAt"}
+    assert "_id" not in photos[0]
+
+    about = api_client.get("/api/about").json()
+    assert about["id"] == "about"
+    api_client.put("/api/about", json={"bioText": "Bio", "photographerName": "Ada", "tagline": "Light and shadow"})
+    assert api_client.get("/api/about").json()["tagline"] == "Light and shadow"
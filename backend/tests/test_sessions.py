@@ -0,0 +1,113 @@
+"""Conversation session store, trimming and /api/chat session tests."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ai_agents.sessions import (
+    InMemorySessionStore,
+    MongoSessionStore,
+    SessionManager,
+    message_tokens,
+    trim_to_budget,
+)
+
+
+def _turns(count, size=40):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{i}:" + "x" * size} for i in range(count)]
+
+
+def test_trim_keeps_newest_messages_within_budget():
+    messages = _turns(10)
+    budget = sum(message_tokens(m) for m in messages[-3:])
+    kept, dropped = trim_to_budget(messages, budget)
+    assert kept == messages[-3:]
+    assert dropped == messages[:-3]
+
+    # The newest message is kept even when it alone exceeds the budget
+    kept, _ = trim_to_budget(messages, 1)
+    assert kept == messages[-1:]
+
+
+@pytest.mark.asyncio
+async def test_in_memory_store_is_lru_bounded():
+    store = InMemorySessionStore(max_sessions=2)
+    await store.append("a", _turns(1))
+    await store.append("b", _turns(1))
+    await store.get("a")
+    await store.append("c", _turns(1))
+    assert await store.get("b") is None
+    assert await store.get("a") is not None
+    assert await store.get("c") is not None
+
+
+@pytest.mark.asyncio
+async def test_compaction_summarizes_overflow_and_bounds_history():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    store = MongoSessionStore(mongomock_motor.AsyncMongoMockClient()["test"].chat_sessions)
+    manager = SessionManager(store, token_budget=100)
+    summaries = []
+
+    async def summarizer(previous, turns):
+        summaries.append(turns)
+        return f"{previous} +{len(turns)}".strip()
+
+    needs_compaction = False
+    for i in range(10):
+        needs_compaction = await manager.record_turn("s1", f"question {i} " + "q" * 40, f"answer {i} " + "a" * 40)
+    assert needs_compaction
+
+    assert await manager.compact("s1", summarizer)
+    session = await manager.get("s1")
+    assert session.summary
+    assert sum(message_tokens(m) for m in session.messages) <= 75
+    assert session.messages[-1]["content"].startswith("answer 9")
+
+    history = await manager.history("s1")
+    assert history[0]["role"] == "system" and session.summary in history[0]["content"]
+    assert sum(message_tokens(m) for m in history) <= 100
+
+
+@pytest.mark.asyncio
+async def test_compaction_skips_when_session_changed_concurrently():
+    store = InMemorySessionStore()
+    manager = SessionManager(store, token_budget=50)
+    for i in range(6):
+        await manager.record_turn("s1", "q" * 40, "a" * 40)
+
+    async def slow_summarizer(previous, turns):
+        # A new turn lands while the summary is being produced
+        await manager.record_turn("s1", "late question", "late answer")
+        return "summary"
+
+    assert not await manager.compact("s1", slow_summarizer)
+    session = await manager.get("s1")
+    assert session.messages[-1]["content"] == "late answer"
+    assert session.summary == ""
+
+
+def test_chat_endpoint_replays_session_history(api_client, fake_llm):
+    first = api_client.post("/api/chat", json={"message": "my name is Ada", "session_id": "abc"})
+    assert first.status_code == 200
+    assert first.json()["success"], first.json()
+    assert first.json()["session_id"] == "abc"
+
+    api_client.post("/api/chat", json={"message": "what is my name?", "session_id": "abc"})
+    sent = fake_llm.requests[-1]["messages"]
+    assert [m["role"] for m in sent] == ["system", "user", "assistant", "user"]
+    assert sent[1]["content"] == "my name is Ada"
+
+    session = api_client.get("/api/sessions/abc").json()
+    assert len(session["messages"]) == 4
+
+    # Without a session id the request stays stateless
+    api_client.post("/api/chat", json={"message": "hello"})
+    assert [m["role"] for m in fake_llm.requests[-1]["messages"]] == ["system", "user"]
+
+    assert api_client.delete("/api/sessions/abc").status_code == 200
+    assert api_client.get("/api/sessions/abc").status_code == 404
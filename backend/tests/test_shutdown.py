@@ -0,0 +1,153 @@
+"""Graceful shutdown: agent calls and buffered writes drain before pools close."""
+
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ai_agents.lifecycle import AgentShuttingDown, AgentWork
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_then_cancels_stragglers():
+    work = AgentWork()
+
+    async def call(kind, seconds):
+        async with work.track(kind):
+            async with work.track("nested"):
+                await asyncio.sleep(seconds)
+
+    quick = asyncio.create_task(call("ChatAgent.execute", 0.05))
+    slow = asyncio.create_task(call("SearchAgent.execute", 10))
+    await asyncio.sleep(0)
+    assert work.in_flight() == {"ChatAgent.execute": 1, "SearchAgent.execute": 1}
+
+    report = await work.drain(timeout=0.2)
+    assert report["completed"] == 1
+    assert report["cancelled"] == {"SearchAgent.execute": 1}
+    assert quick.done() and slow.cancelled()
+    with pytest.raises(AgentShuttingDown):
+        await call("ChatAgent.execute", 0)
+
+    work.open()
+    await call("ChatAgent.execute", 0)
+    assert work.completed == 1
+
+
+def test_lifespan_drains_agent_calls_and_buffered_writes(monkeypatch, fake_llm):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from fastapi import HTTPException
+    from starlette.testclient import TestClient
+
+    import server
+    from ai_agents.lifecycle import agent_work
+    from ai_agents.resilience import upstreams
+
+    monkeypatch.setenv("MONGO_URL", "mongodb://in-memory")
+    monkeypatch.setenv("DB_NAME", "test_database")
+    monkeypatch.setenv("LITELLM_BASE_URL", fake_llm.url)
+    monkeypatch.setenv("LITELLM_AUTH_TOKEN", "sk-test")
+    monkeypatch.setenv("AI_MODEL_NAME", "fake")
+    monkeypatch.setenv("STATUS_BUFFER_MAX_DELAY", "60")
+    mongo = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server, "AsyncIOMotorClient", lambda url, **kwargs: mongo)
+    upstreams.clear()
+    fake_llm.delay = 0.5
+
+    try:
+        with TestClient(server.app) as client:
+            for name in ["web", "cron"]:
+                assert client.post("/api/status", json={"client_name": name}).status_code == 200
+            agent = server._agent_from_state(server.app, "chat")
+            pending = client.portal.start_task_soon(agent.execute, "hello")
+            while not agent_work.in_flight():
+                time.sleep(0.01)
+
+        assert pending.result(timeout=5).success
+        report = server.app.state.shutdown_report
+        assert report["clean"] and report["agent_calls"]["completed"] == 1
+        assert report["status_checks_dropped"] == 0
+        assert agent._http_client.is_closed
+        assert asyncio.run(mongo["test_database"].status_checks.count_documents({})) == 2
+        with pytest.raises(HTTPException) as excinfo:
+            server._agent_from_state(server.app, "chat")
+        assert excinfo.value.status_code == 503
+    finally:
+        upstreams.clear()
+        agent_work.open()
+
+
+# Child process: the real app under uvicorn, with mongomock standing in for mongod
+_SERVE = """
+import sys
+import uvicorn
+from mongomock_motor import AsyncMongoMockClient
+import server
+client = AsyncMongoMockClient()
+server.AsyncIOMotorClient = lambda url, **kwargs: client
+uvicorn.run(server.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def test_sigterm_ends_open_streams_under_uvicorn():
+    # TestClient runs lifespan shutdown right away; uvicorn first waits for open connections
+    pytest.importorskip("mongomock_motor")
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {
+        **os.environ,
+        "MONGO_URL": "mongodb://in-memory",
+        "DB_NAME": "test_database",
+        "INQUIRY_STREAM_SECONDS": "60",
+        "INQUIRY_STREAM_HEARTBEAT": "1",
+    }
+    process = subprocess.Popen([sys.executable, "-c", _SERVE, str(port)], cwd=ROOT_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{base_url}/api/", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            assert time.monotonic() < deadline and process.poll() is None, "server did not start"
+            time.sleep(0.1)
+
+        opened = threading.Event()
+        stream = {}
+
+        def listen():
+            with httpx.stream("GET", f"{base_url}/api/contact/inquiries/stream", timeout=90) as response:
+                for line in response.iter_lines():
+                    opened.set()
+            stream["ended"] = time.monotonic()
+
+        listener = threading.Thread(target=listen, daemon=True)
+        listener.start()
+        assert opened.wait(10)
+
+        started = time.monotonic()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=20)
+        listener.join(timeout=5)
+        assert time.monotonic() - started < 10
+        assert stream["ended"] - started < 10
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
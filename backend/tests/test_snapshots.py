@@ -0,0 +1,137 @@
+"""Static snapshot export tests."""
+
+import asyncio
+import base64
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from snapshots import SnapshotBuilder
+
+PIXEL = base64.b64encode(b"\x89PNG fake image bytes").decode()
+
+
+def _content():
+    return {
+        "photos": [
+            {"id": "1", "title": "A", "category": "Wedding", "imageData": f"data:image/png;base64,{PIXEL}", "order": 0},
+            {"id": "2", "title": "B", "category": "landscape", "imageData": "https://example.com/b.jpg", "order": 1},
+        ],
+        "testimonials": [{"id": "t1", "clientName": "Sam", "testimonialText": "Great", "rating": 5}],
+        "about": {"id": "about", "bioText": "Bio", "photographerName": "Ada", "tagline": "Light"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_build_writes_hashed_files_and_rebuilds_incrementally(tmp_path):
+    content = _content()
+    loaded = []
+
+    async def load(section):
+        loaded.append(section)
+        return content[section]
+
+    builder = SnapshotBuilder(load, tmp_path, base_url="https://cdn.test", keep_versions=2, prune_grace=0)
+    first = await builder.build()
+    assert sorted(loaded) == ["about", "photos", "testimonials"]
+    assert set(first["routes"]) == {"photos.json", "photos/wedding.json", "photos/landscape.json",
+                                    "testimonials.json", "about.json"}
+
+    photos_file = first["sections"]["photos"]["routes"]["photos.json"]
+    photos = json.loads((tmp_path / photos_file).read_bytes())
+    asset_url = photos[0]["imageData"]
+    assert asset_url.startswith("https://cdn.test/files/assets/") and asset_url.endswith(".png")
+    assert (tmp_path / asset_url.removeprefix("https://cdn.test/")).read_bytes() == base64.b64decode(PIXEL)
+    assert photos[1]["imageData"] == "https://example.com/b.jpg"
+    assert builder.latest()["version"] == first["version"]
+
+    # Nothing dirty: no new version
+    loaded.clear()
+    assert (await builder.build())["version"] == first["version"]
+    assert loaded == []
+
+    content["testimonials"].append({"id": "t2", "clientName": "Lee", "testimonialText": "Lovely", "rating": 4})
+    builder._dirty.add("testimonials")
+    second = await builder.build()
+    assert loaded == ["testimonials"]
+    assert second["version"] != first["version"]
+    assert second["sections"]["photos"] == first["sections"]["photos"]
+    assert second["routes"]["testimonials.json"] != first["routes"]["testimonials.json"]
+
+    content["about"] = {**content["about"], "tagline": "Shadow"}
+    third = await builder.build(sections=["about"])
+    # keep_versions=2: the first manifest and its now-unreferenced testimonials file are pruned
+    assert len(list((tmp_path / "versions").iterdir())) == 2
+    assert not (tmp_path / first["sections"]["testimonials"]["routes"]["testimonials.json"]).exists()
+    assert (tmp_path / third["sections"]["photos"]["routes"]["photos.json"]).exists()
+
+
+@pytest.mark.asyncio
+async def test_write_during_build_is_rebuilt_and_recent_files_survive_pruning(tmp_path):
+    content = _content()
+    loaded = []
+    gate = asyncio.Event()
+    gate.set()
+
+    async def load(section):
+        loaded.append(section)
+        await gate.wait()
+        return content[section]
+
+    builder = SnapshotBuilder(load, tmp_path, keep_versions=1, debounce=0)
+    first = await builder.build()
+    # Another worker's file, written but not yet in a published manifest
+    foreign = tmp_path / "files" / "testimonials.0123456789ab.json"
+    foreign.write_bytes(b"[]")
+
+    loaded.clear()
+    gate.clear()
+    builder.mark_dirty("about")
+    while "about" not in loaded:
+        await asyncio.sleep(0.01)
+    content["testimonials"] = []
+    builder.mark_dirty("testimonials")  # arrives while "about" is being built
+    gate.set()
+
+    for _ in range(200):
+        if "testimonials" in loaded and not builder._dirty and builder._pending.done():
+            break
+        await asyncio.sleep(0.01)
+    latest = builder.latest()
+    assert json.loads((tmp_path / latest["sections"]["testimonials"]["routes"]["testimonials.json"]).read_bytes()) == []
+    assert latest["version"] != first["version"]
+    assert foreign.exists()
+    await builder.stop()
+
+
+def test_admin_endpoint_requires_snapshot_dir(monkeypatch, api_client):
+    assert api_client.post("/api/admin/snapshots", json={}).status_code == 503
+
+
+@pytest.fixture
+def snapshot_env(tmp_path, monkeypatch):
+    # Must be set before api_client runs the app lifespan
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setenv("SNAPSHOT_DEBOUNCE_SECONDS", "0")
+
+
+def test_write_hook_rebuilds_changed_section(snapshot_env, api_client):
+    built = api_client.post("/api/admin/snapshots", json={"full": True}).json()
+    assert "about.json" in built["routes"]
+
+    api_client.post("/api/photos", json={"title": "Pier", "category": "landscape",
+                                         "imageData": f"data:image/png;base64,{PIXEL}"})
+    deadline = time.monotonic() + 5
+    latest = built
+    while latest["version"] == built["version"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+        latest = api_client.get("/api/admin/snapshots/latest").json()
+    assert "photos/landscape.json" in latest["routes"]
+    assert latest["routes"]["about.json"] == built["routes"]["about.json"]
@@ -0,0 +1,24 @@
+"""Startup must not import the agent stack; agents load on first use."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("langchain_openai", "langchain_core", "langchain_mcp_adapters", "langgraph", "openai", "mcp")
+
+
+def _loaded_after(code: str) -> set:
+    script = f"{code}\nimport sys\nprint(' '.join(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def test_server_import_skips_agent_stack():
+    assert _loaded_after("import server") & set(HEAVY_MODULES) == set()
+
+
+def test_package_exports_resolve_lazily():
+    assert "langchain_openai" not in _loaded_after("import ai_agents\nfrom ai_agents.sessions import SessionManager")
+    assert "langchain_openai" in _loaded_after("from ai_agents import ChatAgent")
@@ -0,0 +1,76 @@
+"""Status check storage: TTL retention, per-client rollups and the summary endpoint."""
+
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from status_checks import TTL_INDEX_NAME, StatusStore
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.mark.asyncio
+async def test_retention_index_and_rollups():
+    db = mongomock_motor.AsyncMongoMockClient()["status"]
+    store = StatusStore(db, retention_seconds=3600)
+    await store.ensure_indexes()
+    indexes = await db.status_checks.index_information()
+    assert indexes[TTL_INDEX_NAME]["expireAfterSeconds"] == 3600
+
+    now = datetime.now(timezone.utc)
+    checks = [
+        {"id": f"c{index}", "client_name": name, "timestamp": now + timedelta(seconds=index)}
+        for index, name in enumerate(["web", "web", "cron", "web"])
+    ]
+    await store.record_many(checks[:3])
+    await store.record(checks[3])
+
+    summary = await store.summary()
+    assert summary["clientCount"] == 2 and summary["totalChecks"] == 4
+    web = next(client for client in summary["clients"] if client["client_name"] == "web")
+    assert web["count"] == 3 and web["lastCheckId"] == "c3"
+    assert web["firstSeen"] <= web["lastSeen"]
+    assert summary["clients"][0]["client_name"] == "web"  # most recently seen first
+
+    recent = await store.recent({"_id": 0}, client_name="web", limit=2)
+    assert [check["id"] for check in recent] == ["c3", "c1"]
+
+
+@pytest.mark.asyncio
+async def test_rollups_ignore_arrival_order_and_retries():
+    db = mongomock_motor.AsyncMongoMockClient()["status"]
+    store = StatusStore(db, retention_seconds=3600)
+    await store.ensure_indexes()
+
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    newer = {"id": "new", "client_name": "web", "timestamp": now}
+    older = {"id": "old", "client_name": "web", "timestamp": now - timedelta(minutes=5)}
+    # The newer check lands first; the older one must not move lastSeen or lastCheckId back
+    await store.record(newer)
+    await store.record(older)
+    # A retried batch that was already applied, and a retry that picked up one more check
+    await store.record_many([older])
+    later = {"id": "later", "client_name": "web", "timestamp": now + timedelta(minutes=1)}
+    await store.record_many([older, newer, later])
+
+    web = (await store.summary())["clients"][0]
+    assert web["count"] == 3 and web["lastCheckId"] == "later"
+    assert web["lastSeen"] == later["timestamp"].replace(tzinfo=None)
+    assert web["firstSeen"] == older["timestamp"].replace(tzinfo=None) and "checkIds" not in web
+
+
+def test_status_endpoints_use_rollups(api_client):
+    for name in ["web", "web", "cron"]:
+        assert api_client.post("/api/status", json={"client_name": name}).status_code == 200
+
+    checks = api_client.get("/api/status", params={"limit": 2}).json()
+    assert len(checks) == 2 and checks[0]["timestamp"] >= checks[1]["timestamp"]
+    summary = api_client.get("/api/status/summary").json()
+    assert summary["totalChecks"] == 3 and summary["retentionSeconds"] == 7 * 24 * 3600
+    assert {client["client_name"]: client["count"] for client in summary["clients"]} == {"web": 2, "cron": 1}
@@ -0,0 +1,103 @@
+"""Write-behind buffer: batching triggers, back-pressure, retries and shutdown flush."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from metrics import Metrics
+from write_buffer import BufferClosed, BufferFull, WriteBehindBuffer
+
+
+class RecordingSink:
+    def __init__(self, fail_times: int = 0, block: bool = False):
+        self.batches = []
+        self.fail_times = fail_times
+        self.release = asyncio.Event()
+        if not block:
+            self.release.set()
+
+    async def __call__(self, docs):
+        await self.release.wait()
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("database unavailable")
+        self.batches.append([doc["n"] for doc in docs])
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_size_and_time():
+    sink, registry = RecordingSink(), Metrics()
+    buffer = WriteBehindBuffer("test", sink, max_batch=3, max_delay=0.05, metrics=registry)
+    await buffer.start()
+    for n in range(4):
+        await buffer.put({"n": n})
+    await asyncio.sleep(0.01)
+    assert sink.batches == [[0, 1, 2]]  # full batch goes out without waiting for the timer
+    await asyncio.sleep(0.1)
+    assert sink.batches == [[0, 1, 2], [3]]
+    assert registry.counter("test.flushed") == 4
+    assert registry.histogram("test.batch_size").snapshot()["max"] == 3
+    assert registry.snapshot()["gauges"]["test.pending"] == 0
+    assert await buffer.close() == 0
+
+
+@pytest.mark.asyncio
+async def test_backpressure_rejects_when_full():
+    sink, registry = RecordingSink(block=True), Metrics()
+    buffer = WriteBehindBuffer("test", sink, max_batch=2, max_pending=2, put_timeout=0.05, metrics=registry)
+    await buffer.start()
+    await buffer.put({"n": 0})
+    await buffer.put({"n": 1})
+    with pytest.raises(BufferFull):
+        await buffer.put({"n": 2})
+    assert registry.counter("test.rejected") == 1
+
+    sink.release.set()
+    assert await buffer.flush_pending(timeout=1)
+    await buffer.put({"n": 3})
+    assert await buffer.close() == 0
+    assert sink.batches == [[0, 1], [3]]
+    with pytest.raises(BufferClosed):
+        await buffer.put({"n": 4})
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried_in_order():
+    sink, registry = RecordingSink(fail_times=2), Metrics()
+    buffer = WriteBehindBuffer("test", sink, max_batch=10, max_delay=0.01, retry_delay=0.01, metrics=registry)
+    await buffer.start()
+    for n in range(3):
+        await buffer.put({"n": n})
+    assert await buffer.flush_pending(timeout=1)
+    assert sink.batches == [[0, 1, 2]]
+    assert registry.counter("test.flush_failures") == 2
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_close_reports_dropped_documents():
+    sink, registry = RecordingSink(block=True), Metrics()
+    buffer = WriteBehindBuffer("test", sink, max_batch=10, metrics=registry)
+    await buffer.start()
+    for n in range(5):
+        await buffer.put({"n": n})
+    assert await buffer.close(timeout=0.05) == 5
+    assert registry.counter("test.dropped") == 5
+
+
+def test_status_writes_are_batched(api_client):
+    for name in ["web", "web", "cron"]:
+        assert api_client.post("/api/status", json={"client_name": name}).status_code == 200
+
+    # Reads flush first, so accepted checks are visible right away
+    assert len(api_client.get("/api/status").json()) == 3
+    snapshot = api_client.get("/api/metrics").json()
+    assert snapshot["counters"]["status_buffer.flushed"] >= 3
+    assert snapshot["histograms"]["status_buffer.batch_size"]["count"] >= 1
+    assert snapshot["gauges"]["status_buffer.pending"] == 0
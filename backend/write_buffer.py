@@ -0,0 +1,220 @@
+"""Write-behind buffer that turns many small inserts into a few batched ones.
+
+``WriteBehindBuffer.put`` queues a document and returns at once; a background
+task hands queued documents to ``flush`` (for status checks,
+``StatusStore.record_many``: one ``insert_many`` plus one rollup bulk write)
+when ``max_batch`` documents are waiting or the oldest has waited
+``max_delay`` seconds. A failed flush keeps its documents at the head of the
+queue and is retried with backoff.
+
+When ``max_pending`` documents are queued, ``put`` waits up to
+``put_timeout`` seconds for room and then raises ``BufferFull``, so a slow
+database pushes back on callers instead of growing memory without bound.
+``close`` stops intake and flushes what is left before a deadline, returning
+how many documents could not be written.
+
+Batch sizes, flush latency, flushed/failed/rejected counts and the queue
+depth are recorded in ``metrics`` under ``<name>.*``.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+FlushFunction = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class BufferFull(Exception):
+    # Raised by `put` when the buffer stayed full for `put_timeout` seconds
+
+    def __init__(self, retry_after: float):
+        super().__init__("Write buffer is full")
+        self.retry_after = retry_after
+
+
+class BufferClosed(Exception):
+    pass
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        name: str,
+        flush: FlushFunction,
+        max_batch: int = 500,
+        max_delay: float = 0.25,
+        max_pending: int = 10_000,
+        put_timeout: float = 1.0,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 10.0,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.name = name
+        self._flush = flush
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.max_pending = max(self.max_batch, max_pending)
+        self.put_timeout = put_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.metrics = metrics or default_metrics
+        self._pending: deque = deque()
+        self._oldest: Optional[float] = None
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._drained = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.metrics.gauge(f"{name}.pending", lambda: len(self._pending) + self._in_flight)
+
+    @classmethod
+    def from_env(cls, name: str, flush: FlushFunction, prefix: str) -> "WriteBehindBuffer":
+        # `prefix` selects the settings, e.g. STATUS_BUFFER -> STATUS_BUFFER_MAX_BATCH
+        return cls(
+            name,
+            flush,
+            max_batch=int(os.getenv(f"{prefix}_MAX_BATCH", "500")),
+            max_delay=float(os.getenv(f"{prefix}_MAX_DELAY", "0.25")),
+            max_pending=int(os.getenv(f"{prefix}_MAX_PENDING", "10000")),
+            put_timeout=float(os.getenv(f"{prefix}_PUT_TIMEOUT", "1.0")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._pending) + self._in_flight
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, doc: Dict[str, Any]) -> None:
+        if self._closed:
+            raise BufferClosed(f"{self.name} is closed")
+        if len(self) >= self.max_pending:
+            started = time.monotonic()
+            self.metrics.inc(f"{self.name}.backpressure_waits")
+            try:
+                async with self._space:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: len(self) < self.max_pending or self._closed),
+                        timeout=self.put_timeout,
+                    )
+            except asyncio.TimeoutError:
+                self.metrics.inc(f"{self.name}.rejected")
+                raise BufferFull(retry_after=max(1.0, self.max_delay * 4)) from None
+            finally:
+                self.metrics.observe(f"{self.name}.backpressure_wait_seconds", time.monotonic() - started)
+            if self._closed:
+                raise BufferClosed(f"{self.name} is closed")
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append(doc)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def flush_pending(self, timeout: float = 5.0) -> bool:
+        # Write everything queued so far (read-your-writes on this worker); False if it didn't finish in time
+        if not self:
+            return True
+        try:
+            if self._task is None:
+                await asyncio.wait_for(self._flush_all(), timeout=timeout)
+                return True
+            async with self._drained:
+                self._wakeup.set()
+                await asyncio.wait_for(self._drained.wait_for(lambda: not self), timeout=timeout)
+            return True
+        except (asyncio.TimeoutError, RuntimeError):
+            return False
+
+    async def close(self, timeout: float = 10.0) -> int:
+        # Stop intake and flush the remainder within `timeout`; returns the number of documents dropped
+        self._closed = True
+        async with self._space:
+            self._space.notify_all()
+        if self._task is not None:
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        else:
+            try:
+                await asyncio.wait_for(self._flush_all(), timeout=timeout)
+            except (asyncio.TimeoutError, RuntimeError):
+                pass
+        dropped = len(self)
+        if dropped:
+            logger.error("%s: dropped %d buffered documents at shutdown", self.name, dropped)
+            self.metrics.inc(f"{self.name}.dropped", dropped)
+        self._pending.clear()
+        self._in_flight = 0
+        return dropped
+
+    async def _run(self) -> None:
+        failures = 0
+        while True:
+            if not self._pending:
+                if self._closed:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            due = self._oldest + self.max_delay - time.monotonic()
+            if due > 0 and len(self._pending) < self.max_batch and not self._closed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=due)
+                except asyncio.TimeoutError:
+                    pass
+                # A caller waiting in flush_pending shouldn't wait for the timer
+                if not self._wakeup.is_set() and time.monotonic() < self._oldest + self.max_delay:
+                    continue
+            if await self._flush_batch():
+                failures = 0
+                continue
+            failures += 1
+            delay = min(self.max_retry_delay, self.retry_delay * (2 ** (failures - 1)))
+            if self._closed and failures > 3:
+                return
+            await asyncio.sleep(delay)
+
+    async def _flush_all(self) -> None:
+        while self._pending:
+            if not await self._flush_batch():
+                raise RuntimeError(f"{self.name}: flush failed")
+
+    async def _flush_batch(self) -> bool:
+        batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+        self._in_flight = len(batch)
+        started = time.monotonic()
+        try:
+            await self._flush(batch)
+        except Exception:
+            logger.exception("%s: flushing %d documents failed; will retry", self.name, len(batch))
+            self.metrics.inc(f"{self.name}.flush_failures")
+            self._pending.extendleft(reversed(batch))
+            self._in_flight = 0
+            return False
+        finally:
+            self.metrics.observe(f"{self.name}.flush_seconds", time.monotonic() - started)
+        self._in_flight = 0
+        self._oldest = time.monotonic() if self._pending else None
+        self.metrics.inc(f"{self.name}.flushed", len(batch))
+        self.metrics.inc(f"{self.name}.batches")
+        self.metrics.observe(f"{self.name}.batch_size", len(batch))
+        async with self._space:
+            self._space.notify_all()
+        async with self._drained:
+            self._drained.notify_all()
+        return True
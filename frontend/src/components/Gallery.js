@@ -77,6 +77,9 @@ const Gallery = ({ photos }) => {
                 alt={photo.title}
                 className="photo-image"
                 loading="lazy"
+                width={photo.width || undefined}
+                height={photo.height || undefined}
+                style={photo.placeholder ? { backgroundImage: `url(${photo.placeholder})`, backgroundSize: 'cover' } : undefined}
               />
               <div className="photo-overlay">
                 <h3 className="photo-title">{photo.title}</h3>